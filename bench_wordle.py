@@ -0,0 +1,402 @@
+"""
+Micro-benchmarks for the Wordle bot.
+
+Run:
+    python bench_wordle.py                 # parse throughput and entry decoding
+    python bench_wordle.py --messages 50000
+    python bench_wordle.py --commands --sizes 10x3,30x12 --baseline bench_baseline.json
+    python bench_wordle.py --commands --compare bench_baseline.json
+
+--commands loads a synthetic history (players x months) into FirestoreStore
+over the in-memory Firestore stand-in and times each tracker command with
+the reply cache off, along with the documents, bytes, writes and round trips
+one call costs. --baseline writes the results as JSON; --compare diffs a run
+against such a file and exits 1 on a regression.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from wordle_firebase import WordleParser, WordleTracker, ScoreCommand, VALID_MONTHS, WORDLE_LAUNCH_DATE
+from wordle_firestore_memory import MemoryFirestore
+from wordle_grid import parse_grid
+from wordle_storage import Entry, FirestoreStore, COMPARE_FIELDS, SUMMARY_FIELDS, rollup_totals
+from wordle_stats import ScoreColumns, aggregate
+
+PLAYERS = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy"]
+
+TILES = "⬛🟨🟩"
+
+# Relative frequency of 1/6 .. 6/6 and X/6 in a typical group
+SCORE_WEIGHTS = [1, 6, 24, 33, 22, 10, 4]
+
+# Share of days a player posts a score
+PLAY_RATE = 0.85
+
+# Command timings may grow by this fraction over the baseline before --compare
+# fails, and differences below TIME_FLOOR_MS are noise. Document and write
+# counts are deterministic and compared exactly.
+TIME_TOLERANCE = 0.5
+TIME_FLOOR_MS = 0.5
+
+
+# ──────────────────────────────────────────────
+#  Synthetic group chat
+# ──────────────────────────────────────────────
+
+def make_grid(rng, score, max_tries=6):
+    """Emoji grid ending in a solved row, or max_tries unsolved rows for X."""
+    rows = []
+    guesses = score if score <= max_tries else max_tries
+    for _ in range(guesses - 1 if score <= max_tries else guesses):
+        rows.append("".join(rng.choice(TILES) for _ in range(5)))
+    if score <= max_tries:
+        rows.append("🟩" * 5)
+    return "\n".join(rows)
+
+
+def make_chat_corpus(count, seed=0):
+    """Messages bot.js would forward (all start with "Wordle"), mixed like a real group.
+
+    Roughly 75% score posts, 15% commands and 10% chatter that matches nothing.
+    """
+    rng = random.Random(seed)
+    commands = [
+        "Wordle Leaderboard Current",
+        "Wordle Leaderboard {month} 2026",
+        "Wordle Stats {player} {month} 2026",
+        "Wordle Compare {player} vs {other} {month} 2026",
+        "Wordle Compare All {month} 2026 Common",
+        "Wordle List",
+    ]
+    chatter = [
+        "Wordle was brutal today",
+        "Wordle streak broken 😭",
+        "Wordle 1,700 was the worst one yet",
+        "Wordle anyone?",
+    ]
+
+    corpus = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.75:
+            puzzle = rng.randint(1500, 1738)
+            score = rng.choices(range(1, 8), weights=SCORE_WEIGHTS)[0]
+            shown = "X" if score == 7 else str(score)
+            corpus.append((rng.choice(PLAYERS), f"Wordle {puzzle:,} {shown}/6\n\n{make_grid(rng, score)}"))
+        elif roll < 0.90:
+            template = rng.choice(commands)
+            player, other = rng.sample(PLAYERS, 2)
+            corpus.append(("Bot", template.format(player=player, other=other, month=rng.choice(VALID_MONTHS))))
+        else:
+            corpus.append((rng.choice(PLAYERS), rng.choice(chatter)))
+    return corpus
+
+
+def make_history(players, months, seed=0, end=None):
+    """ScoreCommands for players posting daily over the months ending at end (default today).
+
+    Each player has a fixed skill that nudges their scores up or down, and
+    skips about one day in seven. Every score comes with a grid.
+    """
+    rng = random.Random(seed)
+    end = end or datetime.date.today()
+    start = end.replace(day=1)
+    for _ in range(months - 1):
+        start = (start - datetime.timedelta(days=1)).replace(day=1)
+
+    names = [PLAYERS[i % len(PLAYERS)] + (str(i // len(PLAYERS)) if i >= len(PLAYERS) else "")
+             for i in range(players)]
+    skill = {name: rng.choice((-1, 0, 0, 1)) for name in names}
+
+    history = []
+    for day in range((end - start).days + 1):
+        date = start + datetime.timedelta(days=day)
+        puzzle = (date - WORDLE_LAUNCH_DATE).days
+        for name in names:
+            if rng.random() > PLAY_RATE:
+                continue
+            score = rng.choices(range(1, 8), weights=SCORE_WEIGHTS)[0]
+            if rng.random() < 0.3:
+                score = min(7, max(1, score + skill[name]))
+            history.append(ScoreCommand(puzzle, name, score, 6, date.isoformat(), date.strftime("%B"),
+                                        str(date.year), parse_grid(make_grid(rng, score))))
+    return history
+
+
+# ──────────────────────────────────────────────
+#  Benchmarks
+# ──────────────────────────────────────────────
+
+def bench_parse(corpus, repeat=5):
+    """Best-of-repeat parse throughput over the whole corpus, in messages per second."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for player, message in corpus:
+            WordleParser.parse(player, message)
+        best = min(best, time.perf_counter() - start)
+
+    per_kind = {}
+    for player, message in corpus:
+        command = WordleParser.parse(player, message)
+        kind = type(command).__name__ if command is not None else "Ignored"
+        per_kind[kind] = per_kind.get(kind, 0) + 1
+
+    return {
+        "messages": len(corpus),
+        "seconds": best,
+        "messages_per_second": len(corpus) / best,
+        "us_per_message": best / len(corpus) * 1e6,
+        "mix": per_kind,
+    }
+
+
+def make_month_documents(players=30, days=31, seed=0):
+    """Full wordle_entries documents for one month, as Firestore returns them."""
+    rng = random.Random(seed)
+    return [
+        {"puzzle": 1730 + day, "player": f"Player{p:02d}", "score": rng.randint(2, 7), "max_tries": 6,
+         "date": f"2026-03-{day + 1:02d}", "month": "March", "year": "2026"}
+        for day in range(days) for p in range(players)
+    ]
+
+
+def _retained_bytes(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def bench_entry_decoding(documents):
+    """Wire size and resident memory of a month scan: full dicts vs projected slim entries.
+
+    Wire size is approximated by the JSON encoding of the fields transferred.
+    """
+    def wire(fields):
+        return sum(len(json.dumps({f: doc[f] for f in fields})) for doc in documents)
+
+    full_fields = tuple(documents[0])
+    result = {
+        "documents": len(documents),
+        "wire_bytes": {
+            "full": wire(full_fields),
+            "compare": wire(COMPARE_FIELDS),
+            "summary": wire(SUMMARY_FIELDS),
+        },
+        "memory_bytes": {
+            "dicts": _retained_bytes(lambda: [dict(doc) for doc in documents]),
+            "entries": _retained_bytes(lambda: [Entry.from_dict(doc) for doc in documents]),
+            "projected_entries": _retained_bytes(
+                lambda: [Entry.from_dict({f: doc[f] for f in COMPARE_FIELDS}) for doc in documents]
+            ),
+        },
+    }
+    return result
+
+
+def _loop_totals(entries):
+    """Per-entry dict loop, as the replies computed totals before the stats engine."""
+    players = {}
+    for entry in entries:
+        totals = rollup_totals(entry.score, entry.max_tries)
+        current = players.setdefault(entry.player, {"points": 0, "games": 0, "failures": 0,
+                                                    "score_sum": 0, "scores": {}})
+        for field in ("points", "games", "failures", "score_sum"):
+            current[field] += totals[field]
+        for score, count in totals["scores"].items():
+            current["scores"][score] = current["scores"].get(score, 0) + count
+    return players
+
+
+def bench_stats(documents, repeat=5):
+    """Best-of-repeat time for per-player totals: per-entry loop vs grouped columns."""
+    entries = [Entry.from_dict(doc) for doc in documents]
+
+    def best_of(run):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    columns = ScoreColumns.from_entries(entries)
+    assert aggregate(columns) == _loop_totals(entries)
+    return {
+        "entries": len(entries),
+        "loop_seconds": best_of(lambda: _loop_totals(entries)),
+        "load_seconds": best_of(lambda: ScoreColumns.from_entries(entries)),
+        "aggregate_seconds": best_of(lambda: aggregate(columns)),
+    }
+
+
+def _command_calls(tracker, history):
+    """{name: zero-argument call} for the commands benchmarked, reads before writes."""
+    latest = history[-1]
+    month, year = latest.month, latest.year
+    names = sorted({command.player for command in history})
+    first, second, third = names[0], names[1 % len(names)], names[2 % len(names)]
+    today = datetime.date.today()
+
+    # Writes need a new (puzzle, player) every call: guests posting on the latest puzzle
+    guests = (latest._replace(player=f"Guest{i}") for i in range(1_000_000))
+    missing = latest._replace(player="Nobody")
+
+    return {
+        "duplicate_check.hit": lambda: tracker.duplicate_check(latest),
+        "duplicate_check.miss": lambda: tracker.duplicate_check(missing),
+        "monthly_totals": lambda: tracker.monthly_totals(month, year),
+        "current_leaderboard": lambda: tracker.current_leaderboard(),
+        "player_stats": lambda: tracker.player_stats(first, month, year),
+        "yearly_stats": lambda: tracker.yearly_stats(first, None),
+        "compare_all": lambda: tracker.compare_all(month, year, False),
+        "compare_all.common": lambda: tracker.compare_all(month, year, True),
+        "head_to_head": lambda: tracker.head_to_head([first, second], month, year, False),
+        "head_to_head.common": lambda: tracker.head_to_head([first, second], month, year, True),
+        "head_to_head.common3": lambda: tracker.head_to_head([first, second, third], month, year, True),
+        "matrix": lambda: tracker.matrix(month, year),
+        "insert_score": lambda: tracker.insert_score(next(guests)),
+        "save": lambda: tracker.save(next(guests)),
+    } if month == today.strftime("%B") else {}
+
+
+def bench_commands(players, months, repeat=5, seed=0):
+    """Per-command best time and per-call Firestore cost over a synthetic history."""
+    db = MemoryFirestore()
+    tracker = WordleTracker(store=FirestoreStore(db=db), cache_size=0)
+    history = make_history(players, months, seed)
+
+    start = time.perf_counter()
+    tracker.import_scores(history)
+    load_seconds = time.perf_counter() - start
+
+    results = {}
+    for name, call in _command_calls(tracker, history).items():
+        db.reset_counters()
+        call()
+        cost = db.counters()
+
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            call()
+            best = min(best, time.perf_counter() - start)
+        results[name] = {"ms": best * 1000, **cost}
+
+    tracker.close()
+    return {"players": players, "months": months, "entries": len(history),
+            "load_seconds": load_seconds, "commands": results}
+
+
+def run_command_suite(sizes, repeat=5):
+    """{"meta": ..., "sizes": {"<players>x<months>": bench_commands(...)}} for a JSON baseline."""
+    return {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "date": datetime.date.today().isoformat(), "repeat": repeat},
+        "sizes": {f"{players}x{months}": bench_commands(players, months, repeat) for players, months in sizes},
+    }
+
+
+def compare_results(current, baseline, tolerance=TIME_TOLERANCE):
+    """Regressions of current against baseline, as readable lines.
+
+    Documents, bytes, writes and round trips are compared exactly, but only
+    for sizes whose history has the same number of entries (a history ends
+    today, so a month boundary changes it). Times may grow by tolerance.
+    """
+    regressions = []
+    for size, result in current["sizes"].items():
+        before = baseline["sizes"].get(size)
+        if before is None:
+            continue
+        same_history = before["entries"] == result["entries"]
+        for name, cost in result["commands"].items():
+            old = before["commands"].get(name)
+            if old is None:
+                continue
+            if same_history:
+                for field in ("reads", "bytes_read", "writes", "round_trips"):
+                    if cost[field] > old[field]:
+                        regressions.append(f"{size} {name}: {field} {old[field]} -> {cost[field]}")
+            if cost["ms"] > old["ms"] * (1 + tolerance) and cost["ms"] - old["ms"] > TIME_FLOOR_MS:
+                regressions.append(f"{size} {name}: {old['ms']:.2f} ms -> {cost['ms']:.2f} ms")
+    return regressions
+
+
+def print_command_suite(results):
+    for size, result in results["sizes"].items():
+        print(f"commands {size} ({result['entries']} entries, loaded in {result['load_seconds']:.1f} s):")
+        for name, cost in result["commands"].items():
+            print(f"  {name:<22} {cost['ms']:8.2f} ms | {cost['reads']:5} reads {cost['bytes_read']:8,} B "
+                  f"| {cost['writes']:3} writes | {cost['round_trips']} round trips")
+
+
+def parse_sizes(text):
+    """"10x3,30x12" -> [(10, 3), (30, 12)]."""
+    return [tuple(int(n) for n in size.split("x")) for size in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000, help="size of the synthetic chat corpus")
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes; the best is reported")
+    parser.add_argument("--commands", action="store_true", help="run the tracker command suite instead")
+    parser.add_argument("--sizes", type=parse_sizes, default=[(10, 3), (30, 12)],
+                        help="players x months histories for --commands, e.g. 10x3,30x12")
+    parser.add_argument("--baseline", help="write --commands results to this JSON file")
+    parser.add_argument("--compare", help="diff --commands results against this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=TIME_TOLERANCE,
+                        help="allowed fractional slowdown for --compare")
+    args = parser.parse_args()
+
+    # Keep log formatting out of the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.commands:
+        results = run_command_suite(args.sizes, args.repeat)
+        print_command_suite(results)
+        if args.baseline:
+            with open(args.baseline, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"baseline written to {args.baseline}")
+        if args.compare:
+            with open(args.compare) as f:
+                regressions = compare_results(results, json.load(f), args.tolerance)
+            for line in regressions:
+                print(f"REGRESSION {line}")
+            print(f"{len(regressions)} regressions against {args.compare}")
+            if regressions:
+                sys.exit(1)
+        return
+
+    result = bench_parse(make_chat_corpus(args.messages), args.repeat)
+    print(f"parse: {result['messages']} messages in {result['seconds'] * 1000:.1f} ms "
+          f"({result['messages_per_second']:,.0f} msg/s, {result['us_per_message']:.2f} µs/msg)")
+    print("mix  : " + ", ".join(f"{kind}={n}" for kind, n in sorted(result["mix"].items())))
+
+    result = bench_entry_decoding(make_month_documents())
+    wire, memory = result["wire_bytes"], result["memory_bytes"]
+    print(f"month scan ({result['documents']} docs):")
+    print(f"  wire   : full {wire['full']:,} B | compare projection {wire['compare']:,} B "
+          f"| summary projection {wire['summary']:,} B")
+    print(f"  memory : dicts {memory['dicts']:,} B | entries {memory['entries']:,} B "
+          f"| projected entries {memory['projected_entries']:,} B")
+
+    result = bench_stats(make_month_documents(players=30, days=365), args.repeat)
+    print(f"totals ({result['entries']} entries): loop {result['loop_seconds'] * 1000:.1f} ms | "
+          f"columns load {result['load_seconds'] * 1000:.1f} ms + aggregate {result['aggregate_seconds'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Load generator: replays a burst of group messages through the real entry point.
+
+Every message is run the way bot.js runs it, as
+    python wordle_firebase.py <sender> <base64 message>
+against a throwaway local store, with messages arriving on an open-loop
+schedule (Poisson at --rate per second, or all at once with --rate 0) and at
+most --concurrency processes in flight. Latency is measured from each
+message's scheduled arrival, so time spent waiting for a free slot counts.
+
+Two execution models can be compared:
+    process   - every invocation opens the store and answers by itself
+    resident  - a --serve daemon is started first and invocations forward to it
+
+Run:
+    python load_wordle.py                                  # synthetic morning rush, both models
+    python load_wordle.py --players 60 --rate 20 --concurrency 16
+    python load_wordle.py --messages recorded.jsonl --model resident --json
+
+--messages takes the --batch format ({"sender": ..., "message": ...} per line,
+optionally with "at": seconds from the start, which overrides --rate).
+The synthetic rush posts today's puzzle for --players players, resubmits
+--duplicates of them moments later (racing the original), and mixes in
+leaderboard and stats requests. Scores are checked afterwards: each
+(puzzle, player) must have been accepted exactly once and stored once.
+"""
+
+import argparse
+import base64
+import datetime
+import json
+import logging
+import os
+import random
+import signal
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_wordle import PLAYERS, SCORE_WEIGHTS, make_grid
+from wordle_firebase import WordleParser, ScoreCommand, WORDLE_LAUNCH_DATE
+from wordle_perf import PerfRecorder
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordle_firebase.py")
+
+# Invocations used to measure process start cost before each run
+START_PROBES = 5
+
+# Seconds to wait for the daemon's socket to appear
+DAEMON_START_TIMEOUT = 15
+
+# Message that parses to nothing: measures interpreter start, imports and main()
+PROBE_MESSAGE = "Wordle anyone?"
+
+
+# ──────────────────────────────────────────────
+#  Message streams
+# ──────────────────────────────────────────────
+
+def make_rush(players=30, duplicates=0.2, commands=0.1, seed=0):
+    """[(sender, message)] for a morning rush on today's puzzle.
+
+    A duplicates share of the players post again straight after their first
+    post (a resubmission racing the original), and commands adds leaderboard
+    and stats requests relative to the number of players.
+    """
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    puzzle = (today - WORDLE_LAUNCH_DATE).days
+    month, year = today.strftime("%B"), today.year
+    names = [PLAYERS[i % len(PLAYERS)] + (str(i // len(PLAYERS)) if i >= len(PLAYERS) else "")
+             for i in range(players)]
+
+    stream = []
+    for name in names:
+        score = rng.choices(range(1, 8), weights=SCORE_WEIGHTS)[0]
+        post = f"Wordle {puzzle:,} {'X' if score == 7 else score}/6\n\n{make_grid(rng, score)}"
+        stream.append((name, post))
+        if rng.random() < duplicates:
+            stream.append((name, post))
+        if rng.random() < commands:
+            stream.append((rng.choice(names), rng.choice([
+                "Wordle Leaderboard Current",
+                f"Wordle Leaderboard {month} {year}",
+                f"Wordle Stats {name} {month} {year}",
+                f"Wordle Compare All {month} {year}",
+            ])))
+    return stream
+
+
+def read_messages(path):
+    """[(sender, message, at or None)] from a --batch style JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        return [(request["sender"], request["message"], request.get("at"))
+                for request in map(json.loads, filter(str.strip, f))]
+
+
+def schedule(stream, rate, seed=0):
+    """[(arrival seconds, sender, message)]: Poisson arrivals at rate/s, or all at 0 for rate 0.
+
+    A resubmission arrives within 50 ms of the post before it so the two race.
+    Entries that already carry an arrival time keep it.
+    """
+    rng = random.Random(seed)
+    arrivals, clock, previous = [], 0.0, None
+    for item in stream:
+        sender, message, at = item if len(item) == 3 else (*item, None)
+        if at is None:
+            if (sender, message) == previous:
+                at = clock + rng.uniform(0, 0.05)
+            else:
+                clock += rng.expovariate(rate) if rate else 0.0
+                at = clock
+        arrivals.append((at, sender, message))
+        previous = (sender, message)
+    return sorted(arrivals, key=lambda arrival: arrival[0])
+
+
+# ──────────────────────────────────────────────
+#  Running invocations
+# ──────────────────────────────────────────────
+
+def invoke(sender, message, env):
+    """Run one message through wordle_firebase.py; returns (seconds, returncode, stdout, last stderr line)."""
+    encoded = base64.b64encode(message.encode("utf-8")).decode("ascii")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, SCRIPT, sender, encoded], env=env,
+                            capture_output=True, text=True)
+    last_error = result.stderr.strip().rsplit("\n", 1)[-1] if result.returncode else ""
+    return time.perf_counter() - start, result.returncode, result.stdout, last_error
+
+
+def outcome(returncode, stdout):
+    if returncode != 0:
+        return "error"
+    if "---Reaction---" in stdout:
+        return "accepted"
+    if "already" in stdout:
+        return "duplicate"
+    if stdout.strip():
+        return "reply"
+    return "ignored"
+
+
+def start_daemon(env):
+    process = subprocess.Popen([sys.executable, SCRIPT, "--serve"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + DAEMON_START_TIMEOUT
+    while not os.path.exists(env["WORDLE_SOCKET"]):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError("Daemon did not start")
+        time.sleep(0.05)
+    return process
+
+
+def stop_daemon(process):
+    # SIGINT lets serve() close the server and remove its socket
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+
+def score_keys(arrivals):
+    """{(puzzle, player): number of submissions} for the score posts in a schedule."""
+    keys = {}
+    for _, sender, message in arrivals:
+        command = WordleParser.parse(sender.split()[0], message)
+        if isinstance(command, ScoreCommand):
+            keys[(command.puzzle, command.player)] = keys.get((command.puzzle, command.player), 0) + 1
+    return keys
+
+
+def run_load(arrivals, model="process", concurrency=8, workdir=None, queue=False, seen=False):
+    """Replay arrivals through main() under one execution model and summarise the run.
+
+    queue runs the bot with WORDLE_QUEUE=1 (scores acknowledged from a journal)
+    and seen with WORDLE_SEEN=1 (duplicate checks against a local index, used
+    only together with queue).
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="wordle-load-")
+    db_path = os.path.join(workdir, f"{model}.db")
+    env = dict(os.environ,
+               WORDLE_STORE=f"sqlite:{db_path}",
+               WORDLE_SOCKET=os.path.join(workdir, f"{model}.sock"),
+               WORDLE_CALENDAR=os.path.join(workdir, "calendar.dat"),
+               WORDLE_PERF_FILE=os.path.join(workdir, f"{model}-perf.json"),
+               WORDLE_CHANGES=os.path.join(workdir, f"{model}-changes"),
+               WORDLE_QUEUE="1" if queue else "0",
+               WORDLE_JOURNAL=os.path.join(workdir, f"{model}-journal.jsonl"),
+               WORDLE_SEEN="1" if seen else "0",
+               WORDLE_SEEN_FILE=os.path.join(workdir, f"{model}-seen.idx"))
+
+    daemon = start_daemon(env) if model == "resident" else None
+    try:
+        # Probes stay out of the run's stage timings
+        probe_env = dict(env, WORDLE_PERF="0")
+        start_cost = [invoke("Probe", PROBE_MESSAGE, probe_env)[0] for _ in range(START_PROBES)]
+
+        results = [None] * len(arrivals)
+
+        def run(index, arrival, sender, message):
+            seconds, returncode, stdout, error = invoke(sender, message, env)
+            results[index] = (time.perf_counter() - t0 - arrival, seconds, outcome(returncode, stdout),
+                              sender, message, error)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            t0 = time.perf_counter()
+            for index, (arrival, sender, message) in enumerate(arrivals):
+                delay = arrival - (time.perf_counter() - t0)
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(run, index, arrival, sender, message)
+        elapsed = time.perf_counter() - t0
+    finally:
+        if daemon is not None:
+            stop_daemon(daemon)
+
+    outcomes, errors = {}, {}
+    for _, _, kind, _, _, error in results:
+        outcomes[kind] = outcomes.get(kind, 0) + 1
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+
+    # Every score key must be accepted exactly once and stored exactly once
+    accepted = {}
+    for _, _, kind, sender, message, _ in results:
+        if kind == "accepted":
+            command = WordleParser.parse(sender.split()[0], message)
+            accepted[(command.puzzle, command.player)] = accepted.get((command.puzzle, command.player), 0) + 1
+    keys = score_keys(arrivals)
+    with sqlite3.connect(db_path) as conn:
+        stored = dict(((puzzle, player), n) for puzzle, player, n in conn.execute(
+            "SELECT puzzle, player, COUNT(*) FROM wordle_entries GROUP BY puzzle, player"))
+
+    return {
+        "model": model,
+        "queue": queue,
+        "seen": seen,
+        "messages": len(arrivals),
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "throughput": len(arrivals) / elapsed,
+        "latency": percentiles([r[0] for r in results]),
+        "service": percentiles([r[1] for r in results]),
+        "start_cost": statistics.median(start_cost),
+        "outcomes": outcomes,
+        "errors": errors,
+        "races": {
+            "keys": len(keys),
+            "resubmitted": sum(1 for n in keys.values() if n > 1),
+            "accepted_twice": sorted(f"{p}_{n}" for (p, n), count in accepted.items() if count > 1),
+            "never_accepted": sorted(f"{p}_{n}" for (p, n) in keys if (p, n) not in accepted),
+            "stored_wrong": sorted(f"{p}_{n}" for (p, n) in keys if stored.get((p, n)) != 1),
+        },
+        "stages": PerfRecorder(enabled=False).combined(env["WORDLE_PERF_FILE"]).report(),
+    }
+
+
+def print_result(result):
+    ms = lambda stats, key: f"{stats[key] * 1000:.0f}"
+    latency, service, races = result["latency"], result["service"], result["races"]
+    print(f"{result['model']}{' + queue' if result['queue'] else ''}{' + seen' if result['seen'] else ''}: {result['messages']} messages in {result['seconds']:.2f} s "
+          f"({result['throughput']:.1f} msg/s, concurrency {result['concurrency']})")
+    print(f"  latency   p50 {ms(latency, 'p50')} / p95 {ms(latency, 'p95')} / p99 {ms(latency, 'p99')} "
+          f"/ max {ms(latency, 'max')} ms")
+    print(f"  service   p50 {ms(service, 'p50')} / p95 {ms(service, 'p95')} ms | "
+          f"process start {result['start_cost'] * 1000:.0f} ms")
+    print("  outcomes  " + ", ".join(f"{kind}={n}" for kind, n in sorted(result["outcomes"].items())))
+    for error, n in result["errors"].items():
+        print(f"  error x{n}: {error}")
+    problems = races["accepted_twice"] + races["never_accepted"] + races["stored_wrong"]
+    print(f"  races     {races['resubmitted']} of {races['keys']} scores resubmitted, "
+          f"{'no problems' if not problems else 'PROBLEMS: ' + ', '.join(sorted(set(problems)))}")
+    main_stage = result["stages"].get("main", {}).get("ms")
+    if main_stage:
+        print(f"  main()    p50 {main_stage['p50']:.1f} / p95 {main_stage['p95']:.1f} ms inside the process")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", help="JSONL file of messages to replay instead of a synthetic rush")
+    parser.add_argument("--players", type=int, default=30, help="players in the synthetic rush")
+    parser.add_argument("--duplicates", type=float, default=0.2, help="share of players resubmitting")
+    parser.add_argument("--rate", type=float, default=10, help="arrivals per second (0: all at once)")
+    parser.add_argument("--concurrency", type=int, default=8, help="processes in flight at most")
+    parser.add_argument("--model", choices=("process", "resident", "both"), default="both")
+    parser.add_argument("--queue", action="store_true", help="acknowledge scores from the write-behind journal")
+    parser.add_argument("--seen", action="store_true", help="check duplicates against the local seen index (with --queue)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    # Parsing the stream to check races would otherwise log every message
+    logging.getLogger().setLevel(logging.WARNING)
+
+    stream = read_messages(args.messages) if args.messages else make_rush(args.players, args.duplicates,
+                                                                          seed=args.seed)
+    arrivals = schedule(stream, args.rate, args.seed)
+    models = ("process", "resident") if args.model == "both" else (args.model,)
+
+    with tempfile.TemporaryDirectory(prefix="wordle-load-") as workdir:
+        results = [run_load(arrivals, model, args.concurrency, workdir, args.queue, args.seen)
+                   for model in models]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print_result(result)
+
+    if any(r["races"]["accepted_twice"] or r["races"]["never_accepted"] or r["races"]["stored_wrong"]
+           for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,42 @@ Run a single test:
     python -m unittest test_wordle.TestWordleTracker.test_duplicate_check_detects_existing_entry
 """
 
+import io
+import os
+import json
+import time
+import socket
+import threading
 import unittest
 import datetime
+import tempfile
 from unittest.mock import MagicMock, patch
 
-from wordle_firebase import WordleParser, WordleTracker
+import sys
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from google.api_core.exceptions import AlreadyExists
+
+import wordle_firebase
+import wordle_storage
+from wordle_firebase import (
+    WordleParser, WordleTracker, PuzzleCalendar, ResultCache,
+    ScoreCommand, StatsCommand, CurrentLeaderboardCommand, LeaderboardCommand,
+    CompareAllCommand, CompareCommand, YearlyStatsCommand, YearlyLeaderboardCommand,
+    StreakCommand, RatingsCommand, MatrixCommand, GreensCommand, OpenersCommand,
+)
+from wordle_storage import SQLiteStore, Entry, rollup_totals
+from wordle_stats import ScoreColumns, aggregate, average, best, ranking, pairs_from_entries, pair_view
+from wordle_nyt import NYTClient
+from wordle_perf import PERF, PerfRecorder, Histogram
+from wordle_firestore_memory import MemoryFirestore
+from wordle_queue import SubmissionQueue
+from wordle_seen import SeenIndex, BloomFilter
+import bench_wordle
+import load_wordle
+from wordle_grid import parse_grid, render_row, pack_bytes, unpack_bytes, greens_by_guess, opener_luck
+from wordle_ratings import apply_entry, replay, INITIAL_RATING
 
 
 # ──────────────────────────────────────────────
@@ -21,14 +52,14 @@ from wordle_firebase import WordleParser, WordleTracker
 
 def make_nyt_response(puzzle_id):
     """Fake a successful NYT API response for a given puzzle ID."""
-    mock = MagicMock()
+    mock = MagicMock(status_code=200, headers={})
     mock.json.return_value = {"days_since_launch": puzzle_id, "solution": "CRANE"}
     return mock
 
 
 def make_nyt_empty_response():
     """Fake an NYT API response with no puzzle data (future/very old puzzle)."""
-    mock = MagicMock()
+    mock = MagicMock(status_code=200, headers={})
     mock.json.return_value = {}
     return mock
 
@@ -60,74 +91,73 @@ class TestWordleParser(unittest.TestCase):
 
     # 1. Normal score submission
     # Message: "Wordle 1,738 4/6\n\n⬛⬛🟨🟨⬛\n..."
-    # Expected: parsed as option_1, score=4, player=Terence, puzzle=1738
-    @patch("requests.get")
+    # Expected: ScoreCommand, score=4, player=Terence, puzzle=1738
+    @patch("requests.Session.get")
     def test_normal_score_submission(self, mock_get):
         mock_get.return_value = make_nyt_response(1738)
         message = "Wordle 1,738 4/6" + SAMPLE_GRID
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Terence", message)
+        command = WordleParser.parse("Terence", message)
 
-        self.assertEqual(option, "option_1")
-        puzzle, player, score, max_tries, _, month, year = parsed
+        self.assertIsInstance(command, ScoreCommand)
+        puzzle, player, score, max_tries, _, month, year, grid = command
         self.assertEqual(puzzle, 1738)
         self.assertEqual(player, "Terence")
         self.assertEqual(score, 4)
         self.assertEqual(max_tries, 6)
         self.assertEqual(month, "March")
         self.assertEqual(year, "2026")
+        self.assertEqual([render_row(row) for row in grid], SAMPLE_GRID.split())
 
     # 4. X score (failed attempt — player did not solve the puzzle)
     # Message: "Wordle 1,738 X/6\n\n⬛⬛⬛⬛⬛\n..."
     # Expected: score stored as max_tries + 1 (i.e. 7 for /6)
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_x_score_parsed_as_max_plus_one(self, mock_get):
         mock_get.return_value = make_nyt_response(1738)
         message = "Wordle 1,738 X/6" + FAILED_GRID
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Terence", message)
+        command = WordleParser.parse("Terence", message)
 
-        self.assertEqual(option, "option_1")
-        _, _, score, max_tries, _, _, _ = parsed
+        self.assertIsInstance(command, ScoreCommand)
+        _, _, score, max_tries, _, _, _, grid = command
         self.assertEqual(score, max_tries + 1)  # X stored as 7 for /6
+        self.assertEqual(grid, (0,) * 6)
 
     # 3. Monthly leaderboard request
     # Message: "Wordle Leaderboard March 2026"
-    # Expected: parsed as option_2 with key "March 2026"
+    # Expected: LeaderboardCommand("March", "2026")
     def test_monthly_leaderboard_request(self):
         message = "Wordle Leaderboard March 2026"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Terence", message)
-        self.assertEqual(option, "option_4")
-        self.assertEqual(parsed, "March 2026")
+        command = WordleParser.parse("Terence", message)
+        self.assertEqual(command, LeaderboardCommand("March", "2026"))
 
     # Leaderboard request with lowercase — should still be accepted
     # Message: "wordle leaderboard march 2026"
-    # Expected: parsed as option_2 with key "March 2026"
+    # Expected: LeaderboardCommand("March", "2026")
     def test_monthly_leaderboard_case_insensitive(self):
         message = "wordle leaderboard march 2026"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Terence", message)
-        self.assertEqual(option, "option_4")
-        self.assertEqual(parsed, "March 2026")
+        command = WordleParser.parse("Terence", message)
+        self.assertEqual(command, LeaderboardCommand("March", "2026"))
 
     # 5. Altered message — player added text after the score
     # Message: "Wordle 1,738 4/6 I did so well today!\n\n⬛⬛🟨🟨⬛\n..."
-    # Expected: rejected, returns (None, None)
-    @patch("requests.get")
+    # Expected: rejected, returns None
+    @patch("requests.Session.get")
     def test_altered_message_with_extra_text_is_ignored(self, mock_get):
         mock_get.return_value = make_nyt_response(1738)
         message = "Wordle 1,738 4/6 I did so well today!" + SAMPLE_GRID
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Terence", message)
+        command = WordleParser.parse("Terence", message)
 
-        self.assertIsNone(parsed)
-        self.assertIsNone(option)
+        self.assertIsNone(command)
 
     # 6. Puzzle ID not found in NYT API (future or very old puzzle)
     # Message: "Wordle 99999 4/6\n\n⬛⬛🟨🟨⬛\n..."
     # Expected: RuntimeError raised during NYT API lookup
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_invalid_puzzle_id_raises_error(self, mock_get):
         mock_get.return_value = make_nyt_empty_response()
         message = "Wordle 99999 4/6" + SAMPLE_GRID
@@ -136,25 +166,233 @@ class TestWordleParser(unittest.TestCase):
         with self.assertRaises(RuntimeError):
             WordleParser.parse("Terence", message)
 
+    # Puzzle date is computed offline from the launch anchor
+    # Puzzle: 1738
+    # Expected: 2026-03-23 with no NYT request made
+    @patch("requests.Session.get")
+    def test_puzzle_date_resolved_without_network(self, mock_get):
+        mock_get.side_effect = ConnectionError("NYT unreachable")
+        date = WordleParser.get_wordle_by_id(1738)
+        self.assertEqual(date, datetime.date(2026, 3, 23))
+        mock_get.assert_not_called()
+
+    # Verification asks NYT exactly once for the computed date
+    # Puzzle: 1738, NYT agrees
+    # Expected: single request for 2026-03-23
+    @patch("requests.Session.get")
+    def test_puzzle_date_verify_makes_one_request(self, mock_get):
+        mock_get.return_value = make_nyt_response(1738)
+        with tempfile.TemporaryDirectory() as tmp:
+            calendar = PuzzleCalendar(os.path.join(tmp, "calendar.dat"))
+            date = WordleParser.get_wordle_by_id(1738, verify=True, calendar=calendar)
+        self.assertEqual(date, datetime.date(2026, 3, 23))
+        mock_get.assert_called_once()
+        self.assertIn("2026-03-23", mock_get.call_args[0][0])
+
+    # Verification fails when NYT reports a different puzzle for that date
+    # Puzzle: 1738, NYT says 1737
+    # Expected: RuntimeError
+    @patch("requests.Session.get")
+    def test_puzzle_date_verify_mismatch_raises_error(self, mock_get):
+        mock_get.return_value = make_nyt_response(1737)
+        with self.assertRaises(RuntimeError):
+            WordleParser.get_wordle_by_id(1738, verify=True)
+
+    # A puzzle number far past today is rejected before any date arithmetic
+    # Puzzle: 5,000,000 (beyond the last representable date)
+    # Expected: RuntimeError, not OverflowError
+    def test_huge_puzzle_number_raises_runtime_error(self):
+        with self.assertRaises(RuntimeError):
+            WordleParser.get_wordle_by_id(5_000_000)
+
     # Leaderboard request with a made-up month name
     # Message: "Wordle Leaderboard Octember 2026"
-    # Expected: rejected, returns (None, None)
+    # Expected: rejected, returns None
     def test_invalid_month_in_leaderboard_request(self):
         message = "Wordle Leaderboard Octember 2026"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Terence", message)
-        self.assertIsNone(parsed)
-        self.assertIsNone(option)
+        command = WordleParser.parse("Terence", message)
+        self.assertIsNone(command)
 
     # Completely unrelated message sent in the group
     # Message: "Hey everyone, good morning!"
-    # Expected: ignored, returns (None, None)
+    # Expected: ignored, returns None
     def test_unrelated_message_is_ignored(self):
         message = "Hey everyone, good morning!"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Terence", message)
-        self.assertIsNone(parsed)
-        self.assertIsNone(option)
+        command = WordleParser.parse("Terence", message)
+        self.assertIsNone(command)
+
+
+# ──────────────────────────────────────────────
+#  PuzzleCalendar tests  (temporary calendar file)
+# ──────────────────────────────────────────────
+
+class TestPuzzleCalendar(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "calendar.dat")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    # Added puzzles survive a reload from disk
+    # Data: puzzle 1738 -> 2026-03-23
+    # Expected: a fresh calendar returns the date, month and year
+    def test_added_puzzle_persists_across_instances(self):
+        PuzzleCalendar(self.path).add(1738, datetime.date(2026, 3, 23))
+        calendar = PuzzleCalendar(self.path)
+        self.assertEqual(calendar.lookup(1738), ("2026-03-23", "March", "2026"))
+        self.assertIsNone(calendar.lookup(1737))
+        self.assertEqual(len(calendar), 1)
+
+    # Known puzzles are answered from the calendar before any network call
+    # Data: puzzle 1738 cached, NYT unreachable
+    # Expected: cached date returned even with verify=True
+    @patch("requests.Session.get")
+    def test_cached_puzzle_skips_network(self, mock_get):
+        mock_get.side_effect = ConnectionError("NYT unreachable")
+        calendar = PuzzleCalendar(self.path)
+        calendar.add(1738, datetime.date(2026, 3, 23))
+        date = WordleParser.get_wordle_by_id(1738, verify=True, calendar=calendar)
+        self.assertEqual(date, datetime.date(2026, 3, 23))
+        mock_get.assert_not_called()
+
+    # Prefetch backfills a date range and skips puzzles already known
+    # Data: 2026-03-22 to 2026-03-24, with 1738 already cached
+    # Expected: two NYT requests, three puzzles in the calendar
+    @patch("requests.Session.get")
+    def test_prefetch_backfills_range(self, mock_get):
+        # Fetched concurrently, so answer by the date in the URL
+        responses = {"2026-03-22": make_nyt_response(1737), "2026-03-24": make_nyt_response(1739)}
+        mock_get.side_effect = lambda url, **kwargs: responses[url[-15:-5]]
+        calendar = PuzzleCalendar(self.path)
+        calendar.add(1738, datetime.date(2026, 3, 23))
+        added = calendar.prefetch(datetime.date(2026, 3, 22), datetime.date(2026, 3, 24))
+        self.assertEqual(added, 2)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(PuzzleCalendar(self.path).get(1739), datetime.date(2026, 3, 24))
+
+
+# ──────────────────────────────────────────────
+#  NYTClient tests  (local stub server)
+# ──────────────────────────────────────────────
+
+class StubNYTHandler(BaseHTTPRequestHandler):
+    """Serves {"days_since_launch": n} for /<date>.json with an ETag, over keep-alive."""
+
+    protocol_version = "HTTP/1.1"
+    ETAG = '"v1"'
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.client_address[1], self.headers.get("If-None-Match")))
+        if server.delay:
+            time.sleep(server.delay)
+
+        if server.failures > 0:
+            server.failures -= 1
+            return self._reply(503, b"")
+        if self.headers.get("If-None-Match") == self.ETAG:
+            return self._reply(304, b"")
+
+        date = datetime.date.fromisoformat(self.path.strip("/")[:10])
+        body = json.dumps({"days_since_launch": (date - wordle_firebase.WORDLE_LAUNCH_DATE).days}).encode()
+        self._reply(200, body, {"Content-Type": "application/json", "ETag": self.ETAG})
+
+    def _reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestNYTClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubNYTHandler)
+        self.server.daemon_threads = True
+        self.server.requests, self.server.failures, self.server.delay = [], 0, 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = NYTClient(f"http://127.0.0.1:{self.server.server_port}", backoff=0)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    # Sequential lookups reuse one keep-alive connection
+    # Data: three different dates
+    # Expected: correct puzzle numbers, every request from the same client port
+    def test_connection_reused(self):
+        for day in (22, 23, 24):
+            self.assertEqual(self.client.fetch(datetime.date(2026, 3, day))["days_since_launch"], 1715 + day)
+        self.assertEqual(len({port for _, port, _ in self.server.requests}), 1)
+
+    # 503s are retried with backoff until the request succeeds
+    # Data: server fails twice
+    # Expected: data returned after three requests
+    def test_retries_transient_errors(self):
+        self.server.failures = 2
+        self.assertEqual(self.client.fetch(datetime.date(2026, 3, 23))["days_since_launch"], 1738)
+        self.assertEqual(len(self.server.requests), 3)
+
+    # Retries are bounded and end in RuntimeError
+    # Data: server always fails, client allows 3 retries
+    # Expected: RuntimeError after exactly 4 requests
+    def test_retries_are_bounded(self):
+        self.server.failures = 100
+        with self.assertRaises(RuntimeError):
+            self.client.fetch(datetime.date(2026, 3, 23))
+        self.assertEqual(len(self.server.requests), 4)
+
+    # A repeat fetch revalidates with If-None-Match and reuses the body on 304
+    # Data: the same date fetched twice
+    # Expected: second request carries the ETag, same data returned
+    def test_conditional_refetch(self):
+        date = datetime.date(2026, 3, 23)
+        first = self.client.fetch(date)
+        second = self.client.fetch(date)
+        self.assertEqual(first, second)
+        self.assertIsNone(self.server.requests[0][2])
+        self.assertEqual(self.server.requests[1][2], StubNYTHandler.ETAG)
+
+    # A hung endpoint fails fast on the read timeout
+    # Data: server stalls 1s, read timeout 0.2s, no retries
+    # Expected: RuntimeError well under the stall
+    def test_read_timeout(self):
+        self.server.delay = 1
+        client = NYTClient(self.client.base_url, timeout=(1, 0.2), retries=0)
+        start = time.perf_counter()
+        with self.assertRaises(RuntimeError):
+            client.fetch(datetime.date(2026, 3, 23))
+        self.assertLess(time.perf_counter() - start, 0.9)
+        client.close()
+
+    # Range fetch answers every date, concurrently
+    # Data: 2026-03-01 .. 2026-03-14
+    # Expected: 14 results keyed by date with matching puzzle numbers
+    def test_fetch_range(self):
+        dates = [datetime.date(2026, 3, 1) + datetime.timedelta(days=i) for i in range(14)]
+        results = self.client.fetch_range(dates)
+        self.assertEqual(list(results), dates)
+        self.assertEqual([r["days_since_launch"] for r in results.values()], list(range(1716, 1730)))
+
+    # Calendar prefetch goes through the client
+    # Data: 2026-03-22 .. 2026-03-24 from the stub
+    # Expected: three puzzles added
+    def test_calendar_prefetch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            calendar = PuzzleCalendar(os.path.join(tmp, "calendar.dat"))
+            added = calendar.prefetch(datetime.date(2026, 3, 22), datetime.date(2026, 3, 24), client=self.client)
+        self.assertEqual(added, 3)
+        self.assertEqual(calendar.get(1739), datetime.date(2026, 3, 24))
 
 
 # ──────────────────────────────────────────────
@@ -171,14 +409,17 @@ class TestWordleTracker(unittest.TestCase):
             self.mock_db = MagicMock()
             mock_firestore.return_value = self.mock_db
             self.tracker = WordleTracker()
-            self.tracker.db = self.mock_db
+            self.tracker.store.db = self.mock_db
+        # No rollup documents unless a test provides one
+        self.mock_db.collection.return_value.document.return_value.get.return_value.exists = False
+        # Writes find the rollups they touch complete and increment them
+        self.tracker.store._complete.update({("February", "2026"), ("March", "2026")})
 
     def _query_mock(self, docs):
-        """Wire up the Firestore query chain to return the given list of docs."""
-        self.mock_db.collection.return_value \
-            .where.return_value \
-            .where.return_value \
-            .stream.return_value = docs
+        """Wire up the Firestore query chain (with or without a projection) to return docs."""
+        query = self.mock_db.collection.return_value.where.return_value.where.return_value
+        query.stream.return_value = docs
+        query.select.return_value.stream.return_value = docs
 
     def _single_where_mock(self, docs):
         """Wire up a single .where() chain (used by leaderboard)."""
@@ -186,11 +427,18 @@ class TestWordleTracker(unittest.TestCase):
             .where.return_value \
             .stream.return_value = docs
 
+    def _entry_mock(self, doc):
+        """Wire up a direct document lookup (used by duplicate_check)."""
+        snapshot = self.mock_db.collection.return_value.document.return_value.get.return_value
+        snapshot.exists = doc is not None
+        if doc is not None:
+            snapshot.to_dict.return_value = doc.to_dict.return_value
+
     # 2. Player submits a score they've already submitted
     # Data: Terence already has a score of 4/6 for puzzle 1738 in the database
     # Expected: duplicate detected, message contains player name and puzzle number
     def test_duplicate_check_detects_existing_entry(self):
-        self._query_mock([make_firestore_doc("Terence", 4, 6)])
+        self._entry_mock(make_firestore_doc("Terence", 4, 6))
         parsed = (1738, "Terence", 4, 6, "2026-03-23", "March", "2026")
         print(f"\n[Test data] Player=Terence, Puzzle=1738, Score=4/6 (already in DB)")
         is_duplicate, message = self.tracker.duplicate_check(parsed)
@@ -203,7 +451,7 @@ class TestWordleTracker(unittest.TestCase):
     # Data: no existing entry for Alice on puzzle 1738
     # Expected: not a duplicate
     def test_duplicate_check_passes_for_new_entry(self):
-        self._query_mock([])
+        self._entry_mock(None)
         parsed = (1738, "Alice", 3, 6, "2026-03-23", "March", "2026")
         print(f"\n[Test data] Player=Alice, Puzzle=1738 (no existing entry in DB)")
         is_duplicate, _ = self.tracker.duplicate_check(parsed)
@@ -214,13 +462,45 @@ class TestWordleTracker(unittest.TestCase):
     # Data: Terence has score=7 (X) stored for puzzle 1738
     # Expected: duplicate message shows "X/6" not a number
     def test_duplicate_check_shows_x_when_original_was_failed(self):
-        self._query_mock([make_firestore_doc("Terence", 7, 6)])
+        self._entry_mock(make_firestore_doc("Terence", 7, 6))
         parsed = (1738, "Terence", 3, 6, "2026-03-23", "March", "2026")
         print(f"\n[Test data] Player=Terence, Puzzle=1738, Original score=X/6 (score=7 in DB)")
         _, message = self.tracker.duplicate_check(parsed)
 
         self.assertIn("X/6", message)
 
+    # Insert-if-absent creates the entry in a single call with no query
+    # Data: no entry for Alice on puzzle 1738
+    # Expected: created, create() called once, no where() query
+    def test_insert_score_creates_new_entry(self):
+        parsed = (1738, "Alice", 3, 6, "2026-03-23", "March", "2026")
+        print(f"\n[Test data] Player=Alice, Puzzle=1738 (no existing entry in DB)")
+        created, existing_score = self.tracker.insert_score(parsed)
+
+        self.assertTrue(created)
+        self.assertIsNone(existing_score)
+        self.mock_db.collection.return_value.document.assert_any_call("1738_Alice")
+        self.mock_db.transaction.return_value.create.assert_called_once()
+        self.mock_db.transaction.return_value._commit.assert_called_once()
+        # The only query is the one for other players on the same puzzle (ratings)
+        self.mock_db.collection.return_value.where.assert_called_once()
+        self.mock_db.collection.assert_any_call("wordle_players")
+
+    # Insert-if-absent reports the stored score when the entry already exists
+    # Data: Terence already has 7 (X/6) stored for puzzle 1738
+    # Expected: not created, existing score 7, duplicate message shows X/6, nothing written
+    def test_insert_score_returns_existing_score(self):
+        where = self.mock_db.collection.return_value.where.return_value
+        where.select.return_value.stream.return_value = [make_firestore_doc("Terence", 7, 6)]
+        parsed = (1738, "Terence", 3, 6, "2026-03-23", "March", "2026")
+        print(f"\n[Test data] Player=Terence, Puzzle=1738, Original score=X/6 (score=7 in DB)")
+        created, existing_score = self.tracker.insert_score(parsed)
+
+        self.assertFalse(created)
+        self.assertEqual(existing_score, 7)
+        self.assertIn("X/6", WordleTracker.duplicate_message(parsed, existing_score))
+        self.mock_db.transaction.return_value.create.assert_not_called()
+
     # Monthly totals — points accumulate across multiple puzzles
     # Data: Alice scores 2/6 and 3/6 = 9 pts, Bob scores 4/6 = 3 pts
     # Expected: Alice ranked first
@@ -237,6 +517,42 @@ class TestWordleTracker(unittest.TestCase):
         self.assertIn("Alice", lines[1])
         self.assertIn("Bob", lines[2])
 
+    # Monthly totals are read from the month's rollup document when it is complete
+    # Data: complete rollup with Alice=9pts, Bob=3pts
+    # Expected: Alice first, no entry scan
+    def test_monthly_totals_read_from_rollup(self):
+        snapshot = self.mock_db.collection.return_value.document.return_value.get.return_value
+        snapshot.exists = True
+        snapshot.to_dict.return_value = {"complete": True, "players": {
+            "Bob": {"points": 3, "games": 1, "failures": 0, "score_sum": 4, "scores": {"4": 1}},
+            "Alice": {"points": 9, "games": 2, "failures": 0, "score_sum": 5, "scores": {"2": 1, "3": 1}},
+        }}
+        print(f"\n[Test data] Rollup: Alice=9pts, Bob=3pts — expected: Alice first")
+        result = self.tracker.monthly_totals("March", "2026")
+        lines = result.split("\n")
+
+        self.assertIn("Alice — 9 pts", lines[1])
+        self.assertIn("Bob — 3 pts", lines[2])
+        self.mock_db.collection.return_value.where.assert_not_called()
+
+    # Rebuild recomputes rollups from raw entries and reports drift
+    # Data: entries Alice 2/6 + X/6, stored rollup missing Alice
+    # Expected: Alice reported, monthly totals rewritten from entries
+    def test_rebuild_rollups_from_entries(self):
+        self._query_mock([
+            make_firestore_doc("Alice", 2, 6, puzzle=1738),
+            make_firestore_doc("Alice", 7, 6, puzzle=1739),
+        ])
+        print(f"\n[Test data] Alice: 2/6, X/6 — rollup document missing")
+        mismatched = self.tracker.rebuild_rollups("March", "2026")
+
+        self.assertEqual(mismatched, ["Alice"])
+        monthly = self.mock_db.batch.return_value.set.call_args_list[0][0][1]
+        self.assertEqual(monthly["players"]["Alice"], {
+            "points": 5, "games": 2, "failures": 1, "score_sum": 2, "scores": {"2": 1},
+        })
+        self.mock_db.batch.return_value.commit.assert_called_once()
+
     # Monthly totals with no submissions for that month
     # Data: empty database for January 2026
     # Expected: only the header line is returned
@@ -257,89 +573,86 @@ class TestWordleParserNewCommands(unittest.TestCase):
 
     # Stats command — single-word name
     # Message: "Wordle Stats Alice March 2026"
-    # Expected: option_2, player="Alice", month="March", year="2026"
+    # Expected: StatsCommand, player="Alice", month="March", year="2026"
     def test_stats_single_name(self):
         message = "Wordle Stats Alice March 2026"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Bot", message)
-        self.assertEqual(option, "option_2")
-        player, month, year = parsed
+        command = WordleParser.parse("Bot", message)
+        self.assertIsInstance(command, StatsCommand)
+        player, month, year = command
         self.assertEqual(player, "Alice")
         self.assertEqual(month, "March")
         self.assertEqual(year, "2026")
 
     # Stats command — multi-word name is rejected (only single word accepted)
     # Message: "Wordle Stats John Doe March 2026"
-    # Expected: not matched, returns (None, None)
+    # Expected: not matched, returns None
     def test_stats_name_with_spaces(self):
         message = "Wordle Stats John Doe March 2026"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Bot", message)
-        self.assertIsNone(parsed)
-        self.assertIsNone(option)
+        command = WordleParser.parse("Bot", message)
+        self.assertIsNone(command)
 
     # Stats command — invalid month
     # Message: "Wordle Stats Alice Octember 2026"
-    # Expected: rejected, returns (None, None)
+    # Expected: rejected, returns None
     def test_stats_invalid_month(self):
         message = "Wordle Stats Alice Octember 2026"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Bot", message)
-        self.assertIsNone(parsed)
-        self.assertIsNone(option)
+        command = WordleParser.parse("Bot", message)
+        self.assertIsNone(command)
 
     # Current month leaderboard — exact match
     # Message: "Wordle Leaderboard Current"
-    # Expected: option_3
+    # Expected: CurrentLeaderboardCommand
     def test_current_leaderboard_command(self):
         message = "Wordle Leaderboard Current"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Bot", message)
-        self.assertEqual(option, "option_3")
-        self.assertIsNone(parsed)
+        command = WordleParser.parse("Bot", message)
+        self.assertEqual(command, CurrentLeaderboardCommand())
 
     # Current month leaderboard — case insensitive
     # Message: "wordle leaderboard current"
-    # Expected: option_3
+    # Expected: CurrentLeaderboardCommand
     def test_current_leaderboard_case_insensitive(self):
         message = "wordle leaderboard current"
         print(f"\n[Test message] {repr(message)}")
-        _, option = WordleParser.parse("Bot", message)
-        self.assertEqual(option, "option_3")
+        command = WordleParser.parse("Bot", message)
+        self.assertIsInstance(command, CurrentLeaderboardCommand)
 
     # Compare All — basic
     # Message: "Wordle Compare All March 2026"
-    # Expected: option_5, month="March", year="2026", common=False
+    # Expected: CompareAllCommand, month="March", year="2026", common=False
     def test_compare_all_basic(self):
         message = "Wordle Compare All March 2026"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Bot", message)
-        self.assertEqual(option, "option_5")
-        month, year, common = parsed
+        command = WordleParser.parse("Bot", message)
+        self.assertIsInstance(command, CompareAllCommand)
+        month, year, common = command
         self.assertEqual(month, "March")
         self.assertEqual(year, "2026")
         self.assertFalse(common)
 
     # Compare All — with Common
     # Message: "Wordle Compare All March 2026 Common"
-    # Expected: option_5, common=True
+    # Expected: CompareAllCommand, common=True
     def test_compare_all_common(self):
         message = "Wordle Compare All March 2026 Common"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Bot", message)
-        self.assertEqual(option, "option_5")
-        _, _, common = parsed
+        command = WordleParser.parse("Bot", message)
+        self.assertIsInstance(command, CompareAllCommand)
+        _, _, common = command
         self.assertTrue(common)
 
     # Compare — two single-word names
     # Message: "Wordle Compare Alice vs Bob March 2026"
-    # Expected: option_6, players=["Alice","Bob"], common=False
+    # Expected: CompareCommand, players=["Alice","Bob"], common=False
     def test_h2h_two_players(self):
         message = "Wordle Compare Alice vs Bob March 2026"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Bot", message)
-        self.assertEqual(option, "option_6")
-        players, month, year, common = parsed
+        command = WordleParser.parse("Bot", message)
+        self.assertIsInstance(command, CompareCommand)
+        players, month, year, common = command
         self.assertEqual(players, ["Alice", "Bob"])
         self.assertEqual(month, "March")
         self.assertEqual(year, "2026")
@@ -347,46 +660,133 @@ class TestWordleParserNewCommands(unittest.TestCase):
 
     # Compare — first word taken when multi-word names used + common mode
     # Message: "Wordle Compare John Doe vs Alice Smith March 2026 common"
-    # Expected: option_6, players=["John","Alice"], common=True
+    # Expected: CompareCommand, players=["John","Alice"], common=True
     def test_h2h_names_with_spaces_and_common(self):
         message = "Wordle Compare John Doe vs Alice Smith March 2026 common"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Bot", message)
-        self.assertEqual(option, "option_6")
-        players, month, year, common = parsed
+        command = WordleParser.parse("Bot", message)
+        self.assertIsInstance(command, CompareCommand)
+        players, month, year, common = command
         self.assertEqual(players, ["John", "Alice"])
         self.assertTrue(common)
 
     # Compare — three players
     # Message: "Wordle Compare Alice vs Bob vs Carol March 2026"
-    # Expected: option_6, players=["Alice","Bob","Carol"]
+    # Expected: CompareCommand, players=["Alice","Bob","Carol"]
     def test_h2h_three_players(self):
         message = "Wordle Compare Alice vs Bob vs Carol March 2026"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Bot", message)
-        self.assertEqual(option, "option_6")
-        players, _, _, _ = parsed
+        command = WordleParser.parse("Bot", message)
+        self.assertIsInstance(command, CompareCommand)
+        players, _, _, _ = command
         self.assertEqual(players, ["Alice", "Bob", "Carol"])
 
     # Compare — single player (no "vs") should be rejected
     # Message: "Wordle Compare Alice March 2026"
-    # Expected: rejected, returns (None, None)
+    # Expected: rejected, returns None
     def test_h2h_single_player_rejected(self):
         message = "Wordle Compare Alice March 2026"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Bot", message)
-        self.assertIsNone(parsed)
-        self.assertIsNone(option)
+        command = WordleParser.parse("Bot", message)
+        self.assertIsNone(command)
 
     # Compare — invalid month
     # Message: "Wordle Compare Alice vs Bob Octember 2026"
-    # Expected: rejected, returns (None, None)
+    # Expected: rejected, returns None
     def test_h2h_invalid_month(self):
         message = "Wordle Compare Alice vs Bob Octember 2026"
         print(f"\n[Test message] {repr(message)}")
-        parsed, option = WordleParser.parse("Bot", message)
-        self.assertIsNone(parsed)
-        self.assertIsNone(option)
+        command = WordleParser.parse("Bot", message)
+        self.assertIsNone(command)
+
+    # Compare with a player literally named "All" falls through to the player list
+    # Message: "Wordle Compare All vs Bob March 2026"
+    # Expected: CompareCommand, players=["All","Bob"]
+    def test_compare_player_named_all(self):
+        message = "Wordle Compare All vs Bob March 2026"
+        print(f"\n[Test message] {repr(message)}")
+        command = WordleParser.parse("Bot", message)
+        self.assertEqual(command, CompareCommand(["All", "Bob"], "March", "2026", False))
+
+    # A player named twice is compared once
+    # Message: "Wordle Compare Alice vs Bob vs Alice March 2026 Common"
+    # Expected: players=["Alice","Bob"], answered from the pairwise totals
+    def test_compare_repeated_player(self):
+        message = "Wordle Compare Alice vs Bob vs Alice March 2026 Common"
+        print(f"\n[Test message] {repr(message)}")
+        command = WordleParser.parse("Bot", message)
+        self.assertEqual(command, CompareCommand(["Alice", "Bob"], "March", "2026", True))
+
+        tracker = WordleTracker(store=wordle_storage.FirestoreStore(db=MemoryFirestore()), cache_size=0)
+        tracker.insert_score((1738, "Alice", 3, 6, "2026-03-23", "March", "2026"))
+        tracker.insert_score((1738, "Bob", 4, 6, "2026-03-23", "March", "2026"))
+        self.assertIn("1 shared", tracker.head_to_head(command.players, "March", "2026", True))
+
+    # Score posts are case-sensitive, unlike the other commands
+    # Message: "wordle 1,738 4/6"
+    # Expected: returns None
+    def test_lowercase_score_post_ignored(self):
+        message = "wordle 1,738 4/6" + SAMPLE_GRID
+        print(f"\n[Test message] {repr(message)}")
+        self.assertIsNone(WordleParser.parse("Bot", message))
+
+    # Unknown keyword after "Wordle" is rejected without trying any pattern
+    # Message: "Wordle Streaks March 2026"
+    # Expected: returns None
+    def test_unknown_keyword_ignored(self):
+        message = "Wordle Streaks March 2026"
+        print(f"\n[Test message] {repr(message)}")
+        self.assertIsNone(WordleParser.parse("Bot", message))
+
+    # Stats over a whole year or all time
+    # Message: "Wordle Stats Alice 2026", "wordle stats Alice all"
+    # Expected: YearlyStatsCommand with year "2026", then year None
+    def test_yearly_and_all_time_stats(self):
+        print(f"\n[Test message] 'Wordle Stats Alice 2026' / 'wordle stats Alice all'")
+        self.assertEqual(WordleParser.parse("Bot", "Wordle Stats Alice 2026"), YearlyStatsCommand("Alice", "2026"))
+        self.assertEqual(WordleParser.parse("Bot", "wordle stats Alice all"), YearlyStatsCommand("Alice", None))
+        self.assertEqual(WordleParser.parse("Bot", "Wordle Stats Alice March 2026"),
+                         StatsCommand("Alice", "March", "2026"))
+
+    # Leaderboard for a whole year
+    # Message: "Wordle Leaderboard 2026"
+    # Expected: YearlyLeaderboardCommand("2026")
+    def test_yearly_leaderboard(self):
+        message = "Wordle Leaderboard 2026"
+        print(f"\n[Test message] {repr(message)}")
+        self.assertEqual(WordleParser.parse("Bot", message), YearlyLeaderboardCommand("2026"))
+
+    # Streak and ratings commands
+    # Message: "Wordle Streak Alice", "wordle ratings"
+    # Expected: StreakCommand("Alice"), RatingsCommand()
+    def test_streak_and_ratings(self):
+        print(f"\n[Test message] 'Wordle Streak Alice' / 'wordle ratings'")
+        self.assertEqual(WordleParser.parse("Bot", "Wordle Streak Alice"), StreakCommand("Alice"))
+        self.assertEqual(WordleParser.parse("Bot", "wordle ratings"), RatingsCommand())
+        self.assertIsNone(WordleParser.parse("Bot", "Wordle Streak"))
+
+    # Pairwise matrix for a month
+    # Message: "Wordle Matrix march 2026", "Wordle Matrix Smarch 2026"
+    # Expected: MatrixCommand("March", "2026"), then None for the bad month
+    def test_matrix(self):
+        print(f"\n[Test message] 'Wordle Matrix march 2026'")
+        self.assertEqual(WordleParser.parse("Bot", "Wordle Matrix march 2026"), MatrixCommand("March", "2026"))
+        self.assertIsNone(WordleParser.parse("Bot", "Wordle Matrix Smarch 2026"))
+
+    # Grid analytics commands
+    # Message: "Wordle Greens March 2026", "wordle openers march 2026"
+    # Expected: GreensCommand and OpenersCommand for March 2026
+    def test_grid_analytics_commands(self):
+        print(f"\n[Test message] 'Wordle Greens March 2026' / 'wordle openers march 2026'")
+        self.assertEqual(WordleParser.parse("Bot", "Wordle Greens March 2026"), GreensCommand("March", "2026"))
+        self.assertEqual(WordleParser.parse("Bot", "wordle openers march 2026"), OpenersCommand("March", "2026"))
+
+    # Score posted without its grid still parses
+    # Message: "Wordle 1,738 3/6"
+    # Expected: ScoreCommand with grid None
+    def test_score_without_grid(self):
+        print(f"\n[Test message] 'Wordle 1,738 3/6'")
+        self.assertIsNone(WordleParser.parse("Bot", "Wordle 1,738 3/6").grid)
 
 
 # ──────────────────────────────────────────────
@@ -402,14 +802,17 @@ class TestWordleTrackerNewFeatures(unittest.TestCase):
             self.mock_db = MagicMock()
             mock_firestore.return_value = self.mock_db
             self.tracker = WordleTracker()
-            self.tracker.db = self.mock_db
+            self.tracker.store.db = self.mock_db
+        # No rollup documents unless a test provides one
+        self.mock_db.collection.return_value.document.return_value.get.return_value.exists = False
+        # Writes find the rollups they touch complete and increment them
+        self.tracker.store._complete.update({("February", "2026"), ("March", "2026")})
 
     def _query_mock(self, docs):
-        """Two chained .where() calls (e.g. duplicate_check, monthly_totals, weekly_leaderboard)."""
-        self.mock_db.collection.return_value \
-            .where.return_value \
-            .where.return_value \
-            .stream.return_value = docs
+        """Two chained .where() calls (e.g. monthly_totals, compare), with or without a projection."""
+        query = self.mock_db.collection.return_value.where.return_value.where.return_value
+        query.stream.return_value = docs
+        query.select.return_value.stream.return_value = docs
 
     def _single_where_mock(self, docs):
         """Single .where() call (e.g. leaderboard)."""
@@ -418,21 +821,35 @@ class TestWordleTrackerNewFeatures(unittest.TestCase):
             .stream.return_value = docs
 
     def _triple_where_mock(self, docs):
-        """Three chained .where() calls (e.g. player_stats, head_to_head)."""
-        self.mock_db.collection.return_value \
-            .where.return_value \
-            .where.return_value \
-            .where.return_value \
-            .stream.return_value = docs
+        """Three chained .where() calls (e.g. player_stats), with or without a projection."""
+        query = self.mock_db.collection.return_value.where.return_value.where.return_value.where.return_value
+        query.stream.return_value = docs
+        query.select.return_value.stream.return_value = docs
+
+    # The packed grid is written into the entry document as a small int list
+    # Data: new submission for puzzle 1738 with a 2-row grid
+    # Expected: created document holds grid [rows]
+    def test_insert_stores_packed_grid(self):
+        grid = parse_grid("⬛🟨⬛⬛⬛\n🟩🟩🟩🟩🟩")
+        self.tracker.insert_score((1738, "Terence", 2, 6, "2026-03-23", "March", "2026", grid))
+        document = self.mock_db.transaction.return_value.create.call_args[0][1]
+        self.assertEqual(document["grid"], [4, 682])
 
     # Feature 1: Score save — document is written to Firestore
     # Data: new submission for puzzle 1738
-    # Expected: Firestore set() is called with correct fields
+    # Expected: entry, month and day rollups and player state written in one transaction commit
     def test_save_writes_to_firestore(self):
         print(f"\n[Test data] Puzzle=1738, Terence=4/6 — expect Firestore doc written")
         parsed = (1738, "Terence", 4, 6, "2026-03-24", "March", "2026")
         self.tracker.save(parsed)
-        self.mock_db.collection.return_value.document.return_value.set.assert_called_once()
+        transaction = self.mock_db.transaction.return_value
+        self.assertEqual(transaction.create.call_args[0][1]["score"], 4)
+        self.assertEqual(transaction.set.call_count, 3)
+        monthly = transaction.set.call_args_list[0]
+        self.assertEqual(monthly[0][1]["players"]["Terence"]["points"].value, 3)
+        self.assertTrue(monthly[1]["merge"])
+        self.assertEqual(transaction.set.call_args_list[2][0][1]["current_streak"], 1)
+        transaction._commit.assert_called_once()
 
     # Feature 2: Player stats — normal case with mixed scores including X
     # Data: Alice has 3/6, 5/6, X/6 in March 2026
@@ -460,6 +877,63 @@ class TestWordleTrackerNewFeatures(unittest.TestCase):
         result = self.tracker.player_stats("Alice", "January", "2026")
         self.assertIn("No entries found", result)
 
+    # Yearly stats are summed from the year's monthly rollup documents once all are complete
+    # Data: rollups marked complete, for February (Alice 2/6) and March (Alice 4/6, X/6)
+    # Expected: one single-where query, 3 games, avg 3.0, 1 failure
+    def test_yearly_stats_from_monthly_rollups(self):
+        meta = self.mock_db.collection.return_value.document.return_value.get.return_value
+        meta.exists = True
+        meta.to_dict.return_value = {"complete": True}
+
+        def rollup(month, totals):
+            doc = MagicMock()
+            doc.to_dict.return_value = {"month": month, "year": "2026", "players": {"Alice": totals},
+                                        "complete": True}
+            return doc
+
+        self.mock_db.collection.return_value.where.return_value.select.return_value.stream.return_value = [
+            rollup("February", {"points": 5, "games": 1, "failures": 0, "score_sum": 2, "scores": {"2": 1}}),
+            rollup("March", {"points": 3, "games": 2, "failures": 1, "score_sum": 4, "scores": {"4": 1}}),
+        ]
+        print(f"\n[Test data] Alice: 2/6 in February, 4/6 and X/6 in March 2026")
+        result = self.tracker.yearly_stats("Alice", "2026")
+        self.assertIn("Games Played : 3", result)
+        self.assertIn("Average Score: 3.0", result)
+        self.assertIn("Best Score   : 2", result)
+        self.assertIn("Failures (X) : 1", result)
+        self.mock_db.collection.assert_any_call("wordle_monthly")
+
+    # A save increments the month's pairwise totals against players already on the puzzle
+    # Data: Bob has 4/6 on 1738, Alice posts 2/6
+    # Expected: monthly rollup carries pairs Alice→Bob with a win
+    def test_insert_increments_pairs(self):
+        where = self.mock_db.collection.return_value.where.return_value
+        where.select.return_value.stream.return_value = [make_firestore_doc("Bob", 4, 6, puzzle=1738)]
+        self.tracker.insert_score((1738, "Alice", 2, 6, "2026-03-23", "March", "2026"))
+
+        monthly = self.mock_db.transaction.return_value.set.call_args_list[0][0][1]
+        pair = monthly["pairs"]["Alice"]["Bob"]
+        self.assertEqual(pair["wins"].value, 1)
+        self.assertEqual(pair["losses"].value, 0)
+        self.assertEqual(pair["opponent_score_sum"].value, 4)
+
+    # Two-player common compare reads the pairwise rollup, not the entries
+    # Data: complete March rollup with Alice vs Bob over 3 shared puzzles
+    # Expected: 3 shared, averages from the pair's score sums, no entry query
+    def test_h2h_common_from_pairs(self):
+        snapshot = self.mock_db.collection.return_value.document.return_value.get.return_value
+        snapshot.exists = True
+        snapshot.to_dict.return_value = {"complete": True, "pairs": {"Alice": {"Bob": {
+            "shared": 3, "wins": 2, "losses": 1, "ties": 0,
+            "score_sum": 9, "solved": 3, "opponent_score_sum": 8, "opponent_solved": 2,
+        }}}}
+        print(f"\n[Test data] Rollup pairs: Alice vs Bob, 3 shared puzzles")
+        result = self.tracker.head_to_head(["Bob", "Alice"], "March", "2026", True)
+        self.assertIn("3 shared", result)
+        self.assertIn("Bob  : 3 games | avg 4.0", result)
+        self.assertIn("Alice: 3 games | avg 3.0", result)
+        self.mock_db.collection.return_value.where.assert_not_called()
+
     # Feature 3: Current month leaderboard — multiple players, sorted by points
     # Data: Alice=2/6 (5pts), Bob=4/6 (3pts), this month
     # Expected: Alice first
@@ -500,28 +974,52 @@ class TestWordleTrackerNewFeatures(unittest.TestCase):
             make_firestore_doc("Bob", 4, 6, puzzle=1738),
             make_firestore_doc("Bob", 5, 6, puzzle=1739),
         ]
-        self.mock_db.collection.return_value \
-            .where.return_value \
-            .where.return_value \
-            .where.return_value \
-            .stream.side_effect = [alice_docs, bob_docs]
+        self._query_mock(alice_docs + bob_docs)
         print(f"\n[Test data] Alice: 2/6, 3/6 (avg 2.5) | Bob: 4/6, 5/6 (avg 4.5) — Alice ranked first")
         result = self.tracker.head_to_head(["Alice", "Bob"], "March", "2026", False)
         lines = result.split("\n")
         self.assertIn("Alice", lines[1])
         self.assertNotIn("wins", result)
 
+    # Feature 4: Head-to-head — the month is fetched once, not once per player
+    # Data: Alice, Bob and Carol entries for March (no rollup), comparing Alice vs Bob
+    # Expected: one month summary scan streamed, Carol ignored
+    def test_h2h_single_query_for_all_players(self):
+        self._query_mock([
+            make_firestore_doc("Alice", 2, 6, puzzle=1738),
+            make_firestore_doc("Bob", 4, 6, puzzle=1738),
+            make_firestore_doc("Carol", 1, 6, puzzle=1738),
+        ])
+        print(f"\n[Test data] Alice, Bob, Carol in March — compare Alice vs Bob")
+        result = self.tracker.head_to_head(["Alice", "Bob"], "March", "2026", False)
+        query = self.mock_db.collection.return_value.where.return_value.where.return_value
+        query.select.assert_called_once_with(["player", "score", "max_tries"])
+        query.select.return_value.stream.assert_called_once()
+        self.assertNotIn("Carol", result)
+
+    # Compare All — reuses the month it already fetched to list players
+    # Data: Alice and Bob entries for March
+    # Expected: one query in total, both players compared
+    def test_compare_all_single_query(self):
+        self._query_mock([
+            make_firestore_doc("Alice", 2, 6, puzzle=1738),
+            make_firestore_doc("Bob", 4, 6, puzzle=1738),
+        ])
+        print(f"\n[Test data] Alice, Bob in March — Compare All")
+        result = self.tracker.compare_all("March", "2026", True)
+        query = self.mock_db.collection.return_value.where.return_value.where.return_value
+        query.select.assert_called_once_with(["player", "puzzle", "score", "max_tries"])
+        query.select.return_value.stream.assert_called_once()
+        self.assertIn("Alice vs Bob", result)
+        self.assertIn("1 shared", result)
+
     # Feature 4: Head-to-head — no shared puzzles
     # Data: Alice and Bob submitted different puzzles
     # Expected: result notes no shared puzzles
     def test_h2h_no_shared_puzzles(self):
         alice_docs = [make_firestore_doc("Alice", 2, 6, puzzle=1738)]
         bob_docs = [make_firestore_doc("Bob", 3, 6, puzzle=1739)]
-        self.mock_db.collection.return_value \
-            .where.return_value \
-            .where.return_value \
-            .where.return_value \
-            .stream.side_effect = [alice_docs, bob_docs]
+        self._query_mock(alice_docs + bob_docs)
         print(f"\n[Test data] Alice: puzzle 1738 | Bob: puzzle 1739 — no shared puzzles")
         result = self.tracker.head_to_head(["Alice", "Bob"], "March", "2026", False)
         self.assertIn("Alice", result)
@@ -538,11 +1036,7 @@ class TestWordleTrackerNewFeatures(unittest.TestCase):
         bob_docs = [
             make_firestore_doc("Bob", 4, 6, puzzle=1738),
         ]
-        self.mock_db.collection.return_value \
-            .where.return_value \
-            .where.return_value \
-            .where.return_value \
-            .stream.side_effect = [alice_docs, bob_docs]
+        self._query_mock(alice_docs + bob_docs)
         print(f"\n[Test data] Alice: 1738+1739 | Bob: 1738 only — common mode = 1 shared puzzle")
         result = self.tracker.head_to_head(["Alice", "Bob"], "March", "2026", True)
         self.assertIn("1 shared", result)
@@ -550,5 +1044,1427 @@ class TestWordleTrackerNewFeatures(unittest.TestCase):
         self.assertIn("1 games", result)
 
 
+# ──────────────────────────────────────────────
+#  SQLite backend  (real in-memory database)
+# ──────────────────────────────────────────────
+
+class TestSQLiteStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = WordleTracker(store=SQLiteStore(":memory:"))
+        for parsed in [
+            (1738, "Alice", 2, 6, "2026-03-23", "March", "2026"),
+            (1739, "Alice", 7, 6, "2026-03-24", "March", "2026"),
+            (1740, "Alice", 4, 6, "2026-03-25", "March", "2026"),
+            (1738, "Bob",   4, 6, "2026-03-23", "March", "2026"),
+            (1708, "Bob",   1, 6, "2026-02-21", "February", "2026"),
+        ]:
+            self.tracker.insert_score(parsed)
+
+    # Insert-if-absent returns the stored score for a resubmission
+    # Data: Alice already has 2/6 on puzzle 1738
+    # Expected: not created, existing score 2
+    def test_insert_duplicate_returns_existing_score(self):
+        created, existing_score = self.tracker.insert_score((1738, "Alice", 5, 6, "2026-03-23", "March", "2026"))
+        self.assertFalse(created)
+        self.assertEqual(existing_score, 2)
+
+    # Monthly leaderboard aggregated with GROUP BY
+    # Data: Alice 5+0+3=8pts, Bob 3pts in March (Bob's February ignored)
+    # Expected: Alice first with 8 pts, Bob second with 3 pts
+    def test_monthly_totals(self):
+        lines = self.tracker.monthly_totals("March", "2026").split("\n")
+        self.assertIn("Alice — 8 pts", lines[1])
+        self.assertIn("Bob — 3 pts", lines[2])
+
+    # Player stats exclude failures from the average and best score
+    # Data: Alice 2/6, X/6, 4/6 in March
+    # Expected: 3 games, avg 3.0, best 2, 1 failure
+    def test_player_stats(self):
+        result = self.tracker.player_stats("Alice", "March", "2026")
+        self.assertIn("Games Played : 3", result)
+        self.assertIn("Average Score: 3.0", result)
+        self.assertIn("Best Score   : 2", result)
+        self.assertIn("Failures (X) : 1", result)
+
+    # Projected reads only fetch the requested columns into slim entries
+    # Data: Alice's March entries, fields=(player, score, max_tries)
+    # Expected: three entries with no date or puzzle, no per-instance dict
+    def test_projection_returns_slim_entries(self):
+        entries = self.tracker.store.entries_for_month("March", "2026", "Alice", fields=("player", "score", "max_tries"))
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(sorted(e.score for e in entries), [2, 4, 7])
+        self.assertIsNone(entries[0].date)
+        self.assertIsNone(entries[0].puzzle)
+        self.assertFalse(hasattr(entries[0], "__dict__"))
+
+    # Yearly and all-time stats add up the monthly summaries
+    # Data: Bob 4/6 in March 2026, 1/6 in February 2026, 3/6 in December 2025
+    # Expected: 2026 has 2 games avg 2.5; all time has 3 games best 1
+    def test_yearly_and_all_time_stats(self):
+        self.tracker.insert_score((1664, "Bob", 3, 6, "2025-12-31", "December", "2025"))
+
+        result = self.tracker.yearly_stats("Bob", "2026")
+        self.assertIn("Bob — 2026", result)
+        self.assertIn("Games Played : 2", result)
+        self.assertIn("Average Score: 2.5", result)
+
+        result = self.tracker.yearly_stats("Bob", None)
+        self.assertIn("Bob — All Time", result)
+        self.assertIn("Games Played : 3", result)
+        self.assertIn("Best Score   : 1", result)
+        self.assertIn("No entries found for Carol in 2026", self.tracker.yearly_stats("Carol", "2026"))
+
+    # Yearly leaderboard ranks points across every month of the year
+    # Data: Alice 8pts in March; Bob 3pts in March + 6pts in February
+    # Expected: Bob first with 9 pts, Alice second with 8 pts
+    def test_yearly_leaderboard(self):
+        lines = self.tracker.yearly_leaderboard("2026").split("\n")
+        self.assertIn("Yearly Leaderboard (2026)", lines[0])
+        self.assertIn("Bob — 9 pts", lines[1])
+        self.assertIn("Alice — 8 pts", lines[2])
+        self.assertIn("No entries found for 2024", self.tracker.yearly_leaderboard("2024"))
+
+    # A new score drops cached yearly and all-time replies for that player
+    # Data: Alice's 2026 and all-time stats cached, then a new April score
+    # Expected: both replies show the extra game
+    def test_new_score_invalidates_yearly_replies(self):
+        self.assertIn("Games Played : 3", self.tracker.yearly_stats("Alice", "2026"))
+        self.assertIn("Games Played : 3", self.tracker.yearly_stats("Alice", None))
+        self.tracker.insert_score((1750, "Alice", 3, 6, "2026-04-04", "April", "2026"))
+        self.assertIn("Games Played : 4", self.tracker.yearly_stats("Alice", "2026"))
+        self.assertIn("Games Played : 4", self.tracker.yearly_stats("Alice", None))
+
+    # Each save updates the streak and rating state of the players on that puzzle
+    # Data: Alice 2/6, X/6, 4/6 on 1738-1740; Bob 4/6 on 1738 after Alice
+    # Expected: Alice streak 1 (longest 1), beat Bob once: 1516 vs 1484
+    def test_streak_and_ratings_updated_on_save(self):
+        result = self.tracker.streak("Alice")
+        self.assertIn("Current Streak : 1 (through Wordle 1740)", result)
+        self.assertIn("Longest Streak : 1", result)
+        self.assertIn("Rating         : 1516", result)
+
+        lines = self.tracker.ratings().split("\n")
+        self.assertIn("Alice — 1516 (3 games)", lines[1])
+        self.assertIn("Bob — 1484 (2 games)", lines[2])
+        self.assertIn("No entries found for Carol", self.tracker.streak("Carol"))
+
+    # A resubmission leaves the states alone
+    # Data: Bob posts 1738 again with a better score
+    # Expected: not created, ratings unchanged
+    def test_duplicate_does_not_touch_ratings(self):
+        before = self.tracker.ratings()
+        created, existing_score = self.tracker.insert_score((1738, "Bob", 1, 6, "2026-03-23", "March", "2026"))
+        self.assertFalse(created)
+        self.assertEqual(existing_score, 4)
+        self.assertEqual(self.tracker.ratings(), before)
+
+    # Rebuilding from all entries reproduces in-order live updates
+    # Data: same month plus a 3-day run for Alice
+    # Expected: identical states after --rebuild-ratings; longest streak 3
+    def test_rebuild_ratings_matches_incremental(self):
+        for puzzle in (1741, 1742):
+            self.tracker.insert_score((puzzle, "Alice", 3, 6, "2026-03-26", "March", "2026"))
+        live = {state["player"]: state for state in self.tracker.store.all_player_states()}
+
+        self.assertEqual(self.tracker.rebuild_ratings(), 2)
+        rebuilt = {state["player"]: state for state in self.tracker.store.all_player_states()}
+        self.assertEqual(rebuilt, live)
+        self.assertEqual(rebuilt["Alice"]["longest_streak"], 3)
+
+    # The SQL self-join agrees with the pairwise totals computed in Python
+    # Data: March entries plus Carol on 1738 and 1739
+    # Expected: identical pairs; Alice beat Bob on their one shared puzzle
+    def test_month_pairs_match_engine(self):
+        self.tracker.insert_score((1738, "Carol", 2, 6, "2026-03-23", "March", "2026"))
+        self.tracker.insert_score((1739, "Carol", 5, 6, "2026-03-24", "March", "2026"))
+        pairs = self.tracker.store.month_pairs("March", "2026")
+        self.assertEqual(pairs, pairs_from_entries(self.tracker.store.entries_for_month("March", "2026")))
+        self.assertEqual(pair_view(pairs, "Bob", "Alice")["losses"], 1)
+        self.assertEqual(pair_view(pairs, "Alice", "Carol")["ties"], 1)
+
+    # Matrix renders every pair from the row player's side
+    # Data: Alice 2/6 vs Bob 4/6 on 1738
+    # Expected: Alice row 1-0-0 against Bob, Bob row 0-1-0 against Alice
+    def test_matrix(self):
+        lines = self.tracker.matrix("March", "2026").split("\n")
+        self.assertIn("Matrix (March 2026)", lines[0])
+        self.assertEqual(lines[3].split(" | ")[2].strip(), "1-0-0")
+        self.assertEqual(lines[4].split(" | ")[1].strip(), "0-1-0")
+        self.assertIn("No shared puzzles", self.tracker.matrix("January", "2026"))
+
+    # Grids are stored packed and only read when asked for
+    # Data: Carol posts 1741 with a 3-row grid
+    # Expected: full read returns the grid, compare projection does not; greens reply built
+    def test_grid_stored_and_projected_away(self):
+        grid = parse_grid("⬛🟨⬛⬛⬛\n🟩🟩⬛🟨⬛\n🟩🟩🟩🟩🟩")
+        self.tracker.insert_score((1741, "Carol", 3, 6, "2026-03-26", "March", "2026", grid))
+
+        self.assertEqual(self.tracker.store.get_entry(1741, "Carol").grid, grid)
+        projected = self.tracker.store.entries_for_month("March", "2026", "Carol", fields=("player", "puzzle", "score", "max_tries"))
+        self.assertIsNone(projected[0].grid)
+
+        result = self.tracker.greens("March", "2026")
+        self.assertIn("Guess 1: 0.0 🟩 1.0 🟨 (1 rows)", result)
+        self.assertIn("Guess 3: 5.0 🟩 0.0 🟨 (1 rows)", result)
+        self.assertIn("1. Carol", self.tracker.openers("March", "2026"))
+        self.assertIn("No grids found", self.tracker.greens("February", "2026"))
+
+    # A database created before grids existed gains the column on open
+    # Data: wordle_entries table without a grid column holding one entry
+    # Expected: entry readable with grid None, new entries keep their grid
+    def test_adds_grid_column_to_old_database(self):
+        import sqlite3
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "old.db")
+            conn = sqlite3.connect(path)
+            conn.execute("""CREATE TABLE wordle_entries (puzzle INTEGER NOT NULL, player TEXT NOT NULL,
+                            score INTEGER NOT NULL, max_tries INTEGER NOT NULL, date TEXT NOT NULL,
+                            month TEXT NOT NULL, year TEXT NOT NULL, PRIMARY KEY (puzzle, player))""")
+            conn.execute("INSERT INTO wordle_entries VALUES (1738, 'Alice', 3, 6, '2026-03-23', 'March', '2026')")
+            conn.commit()
+            conn.close()
+
+            store = SQLiteStore(path)
+            self.assertIsNone(store.get_entry(1738, "Alice").grid)
+            store.save_entry(Entry(1739, "Alice", 2, 6, "2026-03-24", "March", "2026", (0, 682)))
+            self.assertEqual(store.get_entry(1739, "Alice").grid, (0, 682))
+            store.conn.close()
+
+    # Head-to-head in common mode only counts puzzles both players submitted
+    # Data: Alice 1738-1740, Bob 1738 only
+    # Expected: 1 shared puzzle
+    def test_head_to_head_common(self):
+        result = self.tracker.compare_all("March", "2026", True)
+        self.assertIn("1 shared", result)
+        self.assertIn("Alice vs Bob", result)
+
+
+# ──────────────────────────────────────────────
+#  Concurrent inserts
+# ──────────────────────────────────────────────
+
+class TestConcurrentInserts(unittest.TestCase):
+    """Two trackers (standing in for two processes) scoring the same puzzle at once."""
+
+    CAROL = (1738, "Carol", 4, 6, "2026-03-23", "March", "2026")
+    ALICE = (1738, "Alice", 2, 6, "2026-03-23", "March", "2026")
+    BOB = (1738, "Bob", 3, 6, "2026-03-23", "March", "2026")
+
+    def _race(self, first, second, blocking):
+        """Insert Alice on first; Bob on second lands while Alice's insert is mid-way.
+
+        A blocking backend holds Bob back until Alice commits, so his insert
+        runs in a thread; otherwise it completes inside Alice's transaction.
+        """
+        first.insert_score(self.CAROL)
+        racer = {}
+
+        def interleaved(states, entry, opponents):
+            if entry.player == "Alice" and not racer:
+                if blocking:
+                    racer["thread"] = threading.Thread(target=second.insert_score, args=(self.BOB,))
+                    racer["thread"].start()
+                    time.sleep(0.1)
+                else:
+                    racer["done"] = second.insert_score(self.BOB)
+            return apply_entry(states, entry, opponents)
+
+        with patch("wordle_firebase.apply_entry", side_effect=interleaved):
+            self.assertEqual(first.insert_score(self.ALICE), (True, None))
+            if blocking:
+                racer["thread"].join()
+
+    def _assert_ratings(self, raced, sequential, order):
+        """raced ends with the same states as sequential given the scores one at a time in order."""
+        for parsed in order:
+            sequential.insert_score(parsed)
+        expected = {state["player"]: state for state in sequential.store.all_player_states()}
+        stored = {state["player"]: state for state in raced.store.all_player_states()}
+        self.assertEqual(set(stored), {"Alice", "Bob", "Carol"})
+        for player, state in expected.items():
+            self.assertAlmostEqual(stored[player]["rating"], state["rating"])
+            self.assertEqual(stored[player]["games"], 1)
+
+    # Firestore re-runs the loser of a race against what the winner wrote
+    # Data: Carol 4/6 stored; Bob 3/6 commits from another process while Alice 2/6 is being inserted
+    # Expected: the states of Carol, Bob, Alice scored one after the other
+    def test_firestore_insert_retries_after_race(self):
+        db = MemoryFirestore()
+        first = WordleTracker(store=wordle_storage.FirestoreStore(db=db), cache_size=0)
+        second = WordleTracker(store=wordle_storage.FirestoreStore(db=db), cache_size=0)
+        self._race(first, second, blocking=False)
+        sequential = WordleTracker(store=wordle_storage.FirestoreStore(db=MemoryFirestore()), cache_size=0)
+        self._assert_ratings(first, sequential, [self.CAROL, self.BOB, self.ALICE])
+
+    # The pairwise totals are worked out in the same transaction as the ratings
+    # Data: the Firestore race above, then the month's pairs and matrix read
+    # Expected: the rollup's pairs equal ones summed from the entries, Alice beat Bob
+    def test_firestore_race_keeps_pairs(self):
+        db = MemoryFirestore()
+        first = WordleTracker(store=wordle_storage.FirestoreStore(db=db), cache_size=0)
+        second = WordleTracker(store=wordle_storage.FirestoreStore(db=db), cache_size=0)
+        self._race(first, second, blocking=False)
+
+        pairs = first.store.month_pairs("March", "2026")
+        self.assertEqual(pairs, pairs_from_entries(first.store.all_entries()))
+        self.assertEqual(pair_view(pairs, "Alice", "Bob")["wins"], 1)
+        sequential = WordleTracker(store=SQLiteStore(":memory:"), cache_size=0)
+        for parsed in (self.CAROL, self.BOB, self.ALICE):
+            sequential.insert_score(parsed)
+        self.assertEqual(first.matrix("March", "2026"), sequential.matrix("March", "2026"))
+        self.assertEqual(first.head_to_head(["Alice", "Bob"], "March", "2026", True),
+                         sequential.head_to_head(["Alice", "Bob"], "March", "2026", True))
+
+    # SQLite serialises the two inserts with BEGIN IMMEDIATE
+    # Data: same race with two connections to one database file
+    # Expected: Bob waits for Alice's commit: the states of Carol, Alice, Bob one after the other
+    def test_sqlite_insert_waits_for_race(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "wordle.db")
+            first = WordleTracker(store=SQLiteStore(path), cache_size=0)
+            second = WordleTracker(store=SQLiteStore(path), cache_size=0)
+            self._race(first, second, blocking=True)
+            sequential = WordleTracker(store=SQLiteStore(":memory:"), cache_size=0)
+            self._assert_ratings(first, sequential, [self.CAROL, self.ALICE, self.BOB])
+            first.close()
+            second.close()
+
+
+# ──────────────────────────────────────────────
+#  Chat export import
+# ──────────────────────────────────────────────
+
+ANDROID_EXPORT = """3/23/26, 9:00 AM - Messages and calls are end-to-end encrypted.
+3/23/26, 9:15 AM - Alice Smith: Wordle 1,738 3/6
+
+⬛⬛🟨🟨⬛
+🟩⬛🟨🟩⬛
+🟩🟩🟩🟩🟩
+3/23/26, 9:20 AM - Bob: Wordle was brutal today
+3/23/26, 9:21 AM - Bob: Wordle 1,738 X/6
+
+⬛⬛⬛⬛⬛
+3/23/26, 9:30 AM - Alice Smith: Wordle 1,738 2/6
+3/24/26, 8:05 AM - Carol joined using this group's invite link
+3/24/26, 8:10 AM - Alice Smith: Wordle 1,739 4/6
+"""
+
+IOS_EXPORT = """[23/03/2026, 09:15:02] Alice: Wordle 1,738 3/6
+⬛⬛🟨🟨⬛
+🟩🟩🟩🟩🟩
+\u200e[23/03/2026, 09:16:40] Bob: \u200eimage omitted
+"""
+
+
+class TestChatImport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "chat.txt")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(ANDROID_EXPORT)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    # Android export — multi-line posts are stitched together, system lines skipped
+    # Data: ANDROID_EXPORT
+    # Expected: 5 messages, first one includes its grid
+    def test_iter_android_export(self):
+        messages = list(wordle_firebase.iter_chat_export(ANDROID_EXPORT.splitlines()))
+        self.assertEqual(len(messages), 5)
+        sender, message = messages[0]
+        self.assertEqual(sender, "Alice Smith")
+        self.assertTrue(message.startswith("Wordle 1,738 3/6\n"))
+        self.assertIn("🟩🟩🟩🟩🟩", message)
+
+    # iOS export — bracketed timestamps and invisible direction marks
+    # Data: IOS_EXPORT
+    # Expected: 2 messages from Alice and Bob
+    def test_iter_ios_export(self):
+        messages = list(wordle_firebase.iter_chat_export(IOS_EXPORT.splitlines()))
+        self.assertEqual([sender for sender, _ in messages], ["Alice", "Bob"])
+        self.assertTrue(messages[0][1].startswith("Wordle 1,738 3/6"))
+
+    # Import keeps the first post per player and puzzle and skips stored ones
+    # Data: Alice posts 1738 twice (3/6 then 2/6), Bob X/6, Alice 1739; import run twice
+    # Expected: 3 created, Alice keeps 3/6, second run creates nothing
+    def test_import_into_sqlite(self):
+        tracker = WordleTracker(store=SQLiteStore(":memory:"))
+        found, created = wordle_firebase.import_chat_export(tracker, self.path)
+        self.assertEqual((found, created), (3, 3))
+        self.assertEqual(tracker.store.get_entry(1738, "Alice").score, 3)
+        self.assertEqual(tracker.store.get_entry(1738, "Bob").score, 7)
+
+        self.assertEqual(wordle_firebase.import_chat_export(tracker, self.path), (3, 0))
+
+    # A bogus puzzle number in the export is skipped without aborting the import
+    # Data: ANDROID_EXPORT plus a "Wordle 5,000,000 3/6" post
+    # Expected: the same 3 scores created
+    def test_import_skips_impossible_puzzle(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("3/24/26, 8:20 AM - Bob: Wordle 5,000,000 3/6\n")
+        tracker = WordleTracker(store=SQLiteStore(":memory:"))
+        self.assertEqual(wordle_firebase.import_chat_export(tracker, self.path), (3, 3))
+
+    # Firestore bulk insert commits in batches sized under the 500-write limit
+    # Data: 400 new entries over two months
+    # Expected: 3 commits, none over 500 writes
+    def test_firestore_bulk_insert_batches(self):
+        with patch("firebase_admin.initialize_app"), \
+             patch("firebase_admin.credentials.Certificate"), \
+             patch("firebase_admin.firestore.client") as mock_firestore:
+            mock_db = MagicMock()
+            mock_firestore.return_value = mock_db
+            store = wordle_storage.FirestoreStore()
+
+        refs = {}
+        def document(doc_id):
+            return refs.setdefault(doc_id, MagicMock(id=doc_id))
+        mock_db.collection.return_value.document.side_effect = document
+        mock_db.get_all.side_effect = lambda chunk: [MagicMock(exists=False, id=ref.id) for ref in chunk]
+
+        batches = []
+        def new_batch():
+            batch = MagicMock()
+            batches.append(batch)
+            return batch
+        mock_db.batch.side_effect = new_batch
+
+        entries = [
+            wordle_storage.Entry(1700 + i % 40, f"P{i}", 3, 6, f"2026-0{2 + i % 2}-{1 + i % 28:02d}",
+                                 ["February", "March"][i % 2], "2026")
+            for i in range(400)
+        ]
+        self.assertEqual(store.bulk_insert(entries), 400)
+        self.assertEqual(len(batches), 3)
+        for batch in batches:
+            writes = batch.create.call_count + batch.set.call_count
+            self.assertLessEqual(writes, wordle_storage.FIRESTORE_BATCH_LIMIT)
+            batch.commit.assert_called_once()
+
+
+# ──────────────────────────────────────────────
+#  Stats engine
+# ──────────────────────────────────────────────
+
+class TestStatsEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.entries = [
+            Entry(1738, "Alice", 3, 6), Entry(1739, "Alice", 7, 6), Entry(1740, "Alice", 2, 6),
+            Entry(1738, "Bob", 4, 6), Entry(1740, "Bob", 4, 6),
+            Entry(1739, "Carol", 7, 6),
+        ]
+        self.columns = ScoreColumns.from_entries(self.entries)
+
+    # Grouped totals match summing each entry's rollup one by one
+    # Data: Alice 3, X, 2; Bob 4, 4; Carol X
+    # Expected: identical totals, including an empty histogram for Carol
+    def test_aggregate_matches_per_entry_rollups(self):
+        expected = {}
+        for entry in self.entries:
+            totals = expected.setdefault(entry.player, {"points": 0, "games": 0, "failures": 0,
+                                                        "score_sum": 0, "scores": {}})
+            single = rollup_totals(entry.score, entry.max_tries)
+            for field in ("points", "games", "failures", "score_sum"):
+                totals[field] += single[field]
+            for score, count in single["scores"].items():
+                totals["scores"][score] = totals["scores"].get(score, 0) + count
+
+        self.assertEqual(aggregate(self.columns), expected)
+        self.assertEqual(ranking(expected), [("Alice", 9), ("Bob", 6), ("Carol", 0)])
+
+    # Averages and bests only count solved games
+    # Data: same month
+    # Expected: Alice avg 2.5 best 2, Carol (only an X) has neither
+    def test_average_and_best(self):
+        totals = aggregate(self.columns)
+        self.assertEqual(average(totals["Alice"]), 2.5)
+        self.assertEqual(best(totals["Alice"]), 2)
+        self.assertIsNone(average(totals["Carol"]))
+        self.assertIsNone(best(totals["Carol"]))
+
+    # Restricting to shared puzzles drops rows the other player lacks
+    # Data: Alice 1738-1740, Bob 1738 and 1740
+    # Expected: shared {1738, 1740}; Alice keeps 2 games, Carol is excluded
+    def test_restrict_to_players_and_shared_puzzles(self):
+        shared = self.columns.shared_puzzles(["Alice", "Bob"])
+        self.assertEqual(shared, {1738, 1740})
+
+        totals = aggregate(self.columns.restrict(players=["Alice", "Bob"], puzzles=shared))
+        self.assertEqual(set(totals), {"Alice", "Bob"})
+        self.assertEqual(totals["Alice"]["games"], 2)
+        self.assertEqual(totals["Alice"]["failures"], 0)
+        self.assertEqual(self.columns.shared_puzzles(["Alice", "Dave"]), set())
+
+
+# ──────────────────────────────────────────────
+#  Emoji grids
+# ──────────────────────────────────────────────
+
+class TestGrid(unittest.TestCase):
+
+    # Light, dark and high-contrast tiles (with variation selectors) pack the same way
+    # Data: the same row in each palette, then a trailing chat line
+    # Expected: identical codes; the grid stops at the first non-tile line
+    def test_parse_palettes(self):
+        dark = parse_grid("\n⬛🟨🟩⬛🟩\n🟩🟩🟩🟩🟩\nnice one")
+        light = parse_grid("⬜🟨🟩⬜🟩\n🟩🟩🟩🟩🟩")
+        contrast = parse_grid("⬛️🟦🟧⬛️🟧\n🟧🟧🟧🟧🟧")
+        self.assertEqual(dark, light)
+        self.assertEqual(dark, contrast)
+        self.assertEqual(render_row(dark[0]), "⬛🟨🟩⬛🟩")
+        self.assertIsNone(parse_grid("no tiles here"))
+        self.assertEqual(unpack_bytes(pack_bytes(dark)), dark)
+        self.assertEqual(len(pack_bytes(dark)), 4)
+
+    # Greens and yellows are counted per guess number from packed rows
+    # Data: two grids, one of 3 rows and one of 2
+    # Expected: guess 1 averages 0.5 greens and 1.5 yellows over 2 rows
+    def test_greens_by_guess(self):
+        grids = [parse_grid("🟩🟨🟨⬛⬛\n🟩🟩🟨🟨⬛\n🟩🟩🟩🟩🟩"), parse_grid("⬛🟨⬛⬛⬛\n🟩🟩🟩🟩🟩")]
+        result = greens_by_guess(grids)
+        self.assertEqual(result[0], (1, 2, 0.5, 1.5))
+        self.assertEqual(result[1], (2, 2, 3.5, 1.0))
+        self.assertEqual(result[2], (3, 1, 5.0, 0.0))
+
+    # Luckiest opener ranks average opening greens, then yellows
+    # Data: Alice opens with 1 green, Bob with 0 greens and 4 yellows, Carol 1 green 1 yellow
+    # Expected: Carol, Alice, Bob
+    def test_opener_luck(self):
+        ranking = opener_luck({
+            "Alice": [parse_grid("🟩⬛⬛⬛⬛")],
+            "Bob": [parse_grid("🟨🟨🟨🟨⬛")],
+            "Carol": [parse_grid("🟩🟨⬛⬛⬛")],
+        })
+        self.assertEqual([player for player, *_ in ranking], ["Carol", "Alice", "Bob"])
+
+
+# ──────────────────────────────────────────────
+#  Streaks and ratings
+# ──────────────────────────────────────────────
+
+class TestRatings(unittest.TestCase):
+
+    # Streaks count consecutive solved puzzles; an X or a gap starts again
+    # Data: Alice solves 1-3, fails 4, solves 5, skips 6, solves 7-8
+    # Expected: current 2, longest 3
+    def test_streaks(self):
+        states = {}
+        for puzzle, score in [(1, 3), (2, 4), (3, 2), (4, 7), (5, 3), (7, 4), (8, 5)]:
+            apply_entry(states, Entry(puzzle, "Alice", score, 6), [])
+        self.assertEqual(states["Alice"]["current_streak"], 2)
+        self.assertEqual(states["Alice"]["longest_streak"], 3)
+        self.assertEqual(states["Alice"]["last_puzzle"], 8)
+        self.assertEqual(states["Alice"]["games"], 7)
+
+    # A lower score wins the pairing and ratings move by equal amounts
+    # Data: Bob 4/6 then Alice 3/6 then Carol 3/6 on one puzzle
+    # Expected: Alice and Carol up, Bob down, the total unchanged
+    def test_ratings_zero_sum(self):
+        states = {}
+        bob, alice, carol = Entry(1, "Bob", 4, 6), Entry(1, "Alice", 3, 6), Entry(1, "Carol", 3, 6)
+        apply_entry(states, bob, [])
+        self.assertEqual(apply_entry(states, alice, [bob]), ["Alice", "Bob"])
+        apply_entry(states, carol, [bob, alice])
+
+        self.assertGreater(states["Alice"]["rating"], INITIAL_RATING)
+        self.assertGreater(states["Carol"]["rating"], INITIAL_RATING)
+        self.assertLess(states["Bob"]["rating"], INITIAL_RATING)
+        self.assertAlmostEqual(sum(state["rating"] for state in states.values()), 3 * INITIAL_RATING)
+
+    # Replay does not depend on the order entries are fetched in
+    # Data: the same entries forwards and reversed
+    # Expected: identical states
+    def test_replay_is_deterministic(self):
+        entries = [Entry(p, name, (p * len(name)) % 7 + 1, 6) for p in range(1, 20) for name in ("Al", "Bea", "Cy")]
+        self.assertEqual(replay(entries), replay(list(reversed(entries))))
+
+
+# ──────────────────────────────────────────────
+#  Reply cache
+# ──────────────────────────────────────────────
+
+class TestResultCache(unittest.TestCase):
+
+    # Least recently used reply is evicted once the size bound is reached
+    # Data: maxsize=2, three keys with the first one re-read
+    # Expected: second key evicted, hit/miss counters updated
+    def test_lru_eviction_and_counters(self):
+        cache = ResultCache(maxsize=2)
+        cache.get_or_compute("a", "March", "2026", None, lambda: 1)
+        cache.get_or_compute("b", "March", "2026", None, lambda: 2)
+        cache.get_or_compute("a", "March", "2026", None, lambda: 99)
+        cache.get_or_compute("c", "March", "2026", None, lambda: 3)
+
+        self.assertEqual(cache.get_or_compute("a", "March", "2026", None, lambda: 99), 1)
+        self.assertEqual(cache.get_or_compute("b", "March", "2026", None, lambda: 22), 22)
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 4)
+
+    # Invalidation only drops replies for that month that include the player
+    # Data: Alice stats, Bob stats, March board, February board
+    # Expected: saving Alice in March drops Alice stats and the March board only
+    def test_invalidate_by_month_and_player(self):
+        cache = ResultCache()
+        cache.get_or_compute("alice", "March", "2026", frozenset(["Alice"]), lambda: 1)
+        cache.get_or_compute("bob", "March", "2026", frozenset(["Bob"]), lambda: 2)
+        cache.get_or_compute("board", "March", "2026", None, lambda: 3)
+        cache.get_or_compute("feb", "February", "2026", None, lambda: 4)
+
+        self.assertEqual(cache.invalidate("March", "2026", "Alice"), 2)
+        self.assertEqual(len(cache), 2)
+
+    # A reply computed across an invalidation of its month is not cached
+    # Data: March board and 2026 yearly board computed while a March save invalidates; February board too
+    # Expected: the first two are returned but recomputed next time; February is cached
+    def test_invalidate_during_compute_skips_insert(self):
+        cache = ResultCache()
+
+        def saving(value):
+            def compute():
+                cache.invalidate("March", "2026", "Alice")
+                return value
+            return compute
+
+        self.assertEqual(cache.get_or_compute("board", "March", "2026", None, saving(1)), 1)
+        self.assertEqual(cache.get_or_compute("year", None, "2026", None, saving(2)), 2)
+        self.assertEqual(cache.get_or_compute("feb", "February", "2026", None, saving(3)), 3)
+        self.assertEqual(cache.get_or_compute("board", "March", "2026", None, lambda: 11), 11)
+        self.assertEqual(cache.get_or_compute("year", None, "2026", None, lambda: 22), 22)
+        self.assertEqual(cache.get_or_compute("feb", "February", "2026", None, lambda: 33), 3)
+
+
+class TestWordleTrackerCache(unittest.TestCase):
+
+    def setUp(self):
+        with patch("firebase_admin.initialize_app"), \
+             patch("firebase_admin.credentials.Certificate"), \
+             patch("firebase_admin.firestore.client") as mock_firestore:
+            self.mock_db = MagicMock()
+            mock_firestore.return_value = self.mock_db
+            self.tracker = WordleTracker()
+        self.mock_db.collection.return_value.document.return_value.get.return_value.exists = False
+        self.tracker.store._complete.update({("February", "2026"), ("March", "2026")})
+        self.stream = self.mock_db.collection.return_value.where.return_value.where.return_value \
+            .select.return_value.stream
+        self.stream.return_value = [make_firestore_doc("Alice", 2, 6)]
+
+    # Repeated leaderboard request is answered from the cache
+    # Data: Alice 2/6 in March, leaderboard requested twice
+    # Expected: one entry scan, one hit
+    def test_repeat_request_served_from_cache(self):
+        first = self.tracker.monthly_totals("March", "2026")
+        second = self.tracker.monthly_totals("March", "2026")
+        self.assertEqual(first, second)
+        self.stream.assert_called_once()
+        self.assertEqual(self.tracker.cache.hits, 1)
+
+    # Saving a score for the month invalidates the cached leaderboard
+    # Data: leaderboard cached, then Bob saves a March score
+    # Expected: next request recomputes
+    def test_save_invalidates_month(self):
+        self.tracker.monthly_totals("March", "2026")
+        self.tracker.save((1739, "Bob", 3, 6, "2026-03-24", "March", "2026"))
+        self.tracker.monthly_totals("March", "2026")
+        self.assertEqual(self.stream.call_count, 2)
+
+    # Saving a score for another month leaves the cached reply alone
+    # Data: March leaderboard cached, then a February save
+    # Expected: still one scan
+    def test_save_for_other_month_keeps_cache(self):
+        self.tracker.monthly_totals("March", "2026")
+        self.tracker.save((1708, "Bob", 3, 6, "2026-02-21", "February", "2026"))
+        self.tracker.monthly_totals("March", "2026")
+        self.stream.assert_called_once()
+
+    # A write from another process drops the cache; this process's own writes do not
+    # Data: daemon and CLI trackers on one store and change file; daemon caches March and February boards
+    # Expected: daemon's March save keeps February cached; CLI's Bob score shows on the daemon's next board
+    def test_write_from_other_process_drops_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            changes = os.path.join(tmp, "changes")
+            open(changes, "a").close()
+            store = SQLiteStore(":memory:")
+            daemon = WordleTracker(store=store, changes_path=changes)
+            cli = WordleTracker(store=store, changes_path=changes)
+
+            daemon.insert_score((1738, "Alice", 2, 6, "2026-03-23", "March", "2026"))
+            daemon.monthly_totals("February", "2026")
+            daemon.monthly_totals("March", "2026")
+            daemon.insert_score((1739, "Alice", 3, 6, "2026-03-24", "March", "2026"))
+            daemon.monthly_totals("February", "2026")
+            self.assertEqual(daemon.cache.hits, 1)
+
+            daemon.monthly_totals("March", "2026")
+            cli.insert_score((1739, "Bob", 4, 6, "2026-03-24", "March", "2026"))
+            self.assertIn("Bob", daemon.monthly_totals("March", "2026"))
+            self.assertEqual(len(daemon.cache), 1)
+
+
+# ──────────────────────────────────────────────
+#  Message handling and resident daemon
+# ──────────────────────────────────────────────
+
+class TestMessageHandling(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = MagicMock()
+        self.tracker.insert_score.return_value = (True, None)
+        self.tracker.monthly_totals.return_value = "🏆 board"
+
+    # New score produces the reaction block bot.js looks for
+    # Message: "Wordle 1,738 4/6\n..."
+    # Expected: ✅ reaction and the score inserted
+    def test_new_score_returns_reaction(self):
+        output = wordle_firebase.handle_message(self.tracker, "Terence", "Wordle 1,738 4/6" + SAMPLE_GRID)
+        self.assertEqual(output, "\n---Reaction---\n✅\n---End Reaction---")
+        self.tracker.insert_score.assert_called_once()
+
+    # Resubmitted score gets the duplicate message built from the existing score
+    # Message: "Wordle 1,738 4/6\n..." with 3/6 already stored
+    # Expected: message block mentioning the original 3/6
+    def test_duplicate_score_returns_message(self):
+        self.tracker.insert_score.return_value = (False, 3)
+        self.tracker.duplicate_message = WordleTracker.duplicate_message
+        output = wordle_firebase.handle_message(self.tracker, "Terence", "Wordle 1,738 4/6" + SAMPLE_GRID)
+        self.assertIn("---Message Start---", output)
+        self.assertIn("3/6", output)
+
+    # Leaderboard replies are wrapped in message markers
+    # Message: "Wordle Leaderboard March 2026"
+    # Expected: tracker output inside ---Message Start--- / ---Message End---
+    def test_leaderboard_returns_message_block(self):
+        output = wordle_firebase.handle_message(self.tracker, "Bot", "Wordle Leaderboard March 2026")
+        self.assertEqual(output, "\n---Message Start---\n 🏆 board \n---Message End---")
+
+    # Unrelated messages produce no output at all
+    # Message: "Wordle is hard today"
+    # Expected: empty string
+    def test_unmatched_message_returns_nothing(self):
+        self.assertEqual(wordle_firebase.handle_message(self.tracker, "Bot", "Wordle is hard today"), "")
+
+    # Daemon answers over its Unix socket using the tracker it was started with
+    # Message: "Wordle Leaderboard March 2026" sent through send_to_daemon
+    # Expected: same output as handling in-process, one tracker shared
+    def test_daemon_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            socket_path = os.path.join(tmp, "wordle.sock")
+            server = wordle_firebase.WordleServer(socket_path, self.tracker)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                first = wordle_firebase.send_to_daemon("Bot", "Wordle Leaderboard March 2026", socket_path)
+                second = wordle_firebase.send_to_daemon("Bot", "Wordle Leaderboard March 2026", socket_path)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        self.assertEqual(first, "\n---Message Start---\n 🏆 board \n---Message End---")
+        self.assertEqual(first, second)
+        self.assertEqual(self.tracker.monthly_totals.call_count, 2)
+
+    # Batch mode answers JSONL requests in order on one shared tracker
+    # Data: score, duplicate, leaderboard, list, chatter and a malformed line
+    # Expected: one JSON response per request, leaderboard sees the earlier score
+    def test_batch_mode_responses(self):
+        tracker = WordleTracker(store=SQLiteStore(":memory:"))
+        requests_in = [
+            json.dumps({"id": "a", "sender": "Alice Smith", "message": "Wordle 1,738 3/6" + SAMPLE_GRID}),
+            json.dumps({"id": "b", "sender": "Alice", "message": "Wordle 1,738 2/6"}),
+            json.dumps({"id": "c", "sender": "Bot", "message": "Wordle Leaderboard March 2026"}),
+            json.dumps({"sender": "Bot", "message": "Wordle List"}),
+            "",
+            json.dumps({"id": "e", "sender": "Bob", "message": "Wordle was brutal"}),
+            "{not json",
+        ]
+        out = io.StringIO()
+        wordle_firebase.run_batch(requests_in, out, tracker=tracker)
+        responses = [json.loads(line) for line in out.getvalue().splitlines()]
+
+        self.assertEqual([r["id"] for r in responses], ["a", "b", "c", 4, "e", 7])
+        self.assertEqual(responses[0]["reaction"], "✅")
+        self.assertIn("3/6", responses[1]["message"])
+        self.assertIn("Alice — 4 pts", responses[2]["message"])
+        self.assertIn("Wordle Bot Commands", responses[3]["plain"])
+        self.assertEqual(responses[4], {"id": "e"})
+        self.assertIn("error", responses[5])
+
+    # Without a daemon the CLI falls back to handling the message itself
+    # Data: socket path that does not exist
+    # Expected: send_to_daemon returns None
+    def test_send_to_daemon_without_server(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(wordle_firebase.send_to_daemon("Bot", "Wordle List", os.path.join(tmp, "missing.sock")))
+
+    # A daemon that takes the message but never answers is not sent it again
+    # Data: listening socket that never replies, DAEMON_TIMEOUT of 0.1 s
+    # Expected: an error logged and "" (not None), so the CLI does not handle the message a second time
+    def test_send_to_daemon_times_out(self):
+        with tempfile.TemporaryDirectory() as tmp, socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            socket_path = os.path.join(tmp, "hung.sock")
+            server.bind(socket_path)
+            server.listen()
+            with patch("wordle_firebase.DAEMON_TIMEOUT", 0.1), self.assertLogs(level="ERROR"):
+                self.assertEqual(wordle_firebase.send_to_daemon("Bot", "Wordle List", socket_path), "")
+
+    # A socket the CLI may not connect to falls back to handling the message itself
+    # Data: connect() raising PermissionError
+    # Expected: a warning and None
+    def test_send_to_daemon_permission_denied(self):
+        with patch("socket.socket.connect", side_effect=PermissionError(13, "Permission denied")), \
+             self.assertLogs(level="WARNING"):
+            self.assertIsNone(wordle_firebase.send_to_daemon("Bot", "Wordle List", "wordle.sock"))
+
+
+# ──────────────────────────────────────────────
+#  In-memory Firestore stand-in and command benchmarks
+# ──────────────────────────────────────────────
+
+class TestMemoryFirestore(unittest.TestCase):
+
+    def setUp(self):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+        self.FieldFilter = FieldFilter
+        self.db = MemoryFirestore()
+        batch = self.db.batch()
+        for puzzle, player, date in ((1737, "Alice", "2026-03-22"), (1738, "Alice", "2026-03-23"),
+                                     (1738, "Bob", "2026-03-23"), (1707, "Bob", "2026-02-20")):
+            batch.set(self.db.collection("wordle_entries").document(f"{puzzle}_{player}"),
+                      {"puzzle": puzzle, "player": player, "date": date, "year": "2026"})
+        batch.commit()
+        self.db.reset_counters()
+
+    def _ids(self, query):
+        return [doc.id for doc in query.stream()]
+
+    # Equality and range filters are evaluated, not ignored
+    # Data: four entries across two months
+    # Expected: only matching ids, in id order; type mismatches never match
+    def test_filters(self):
+        entries = self.db.collection("wordle_entries")
+        self.assertEqual(self._ids(entries.where(filter=self.FieldFilter("player", "==", "Alice"))),
+                         ["1737_Alice", "1738_Alice"])
+        march = (entries.where(filter=self.FieldFilter("date", ">=", "2026-03-01"))
+                 .where(filter=self.FieldFilter("date", "<=", "2026-03-31")))
+        self.assertEqual(self._ids(march), ["1737_Alice", "1738_Alice", "1738_Bob"])
+        self.assertEqual(self._ids(entries.where(filter=self.FieldFilter("year", "==", 2026))), [])
+        self.assertEqual(self._ids(entries.where(filter=self.FieldFilter("puzzle", ">", "1700"))), [])
+        self.assertEqual(self._ids(entries.where(filter=self.FieldFilter("month", "==", "March"))), [])
+
+    # Reads are counted like Firestore bills them; projections shrink the bytes
+    # Data: a 3-document query, a projected query, a missing document
+    # Expected: 3 reads, fewer bytes with select(), 1 read for the miss
+    def test_read_counters(self):
+        query = self.db.collection("wordle_entries").where(filter=self.FieldFilter("puzzle", "==", 1738))
+        query.get()
+        full = self.db.counters()
+        self.assertEqual((full["reads"], full["round_trips"]), (2, 1))
+
+        self.db.reset_counters()
+        docs = query.select(["player"]).get()
+        self.assertEqual([doc.to_dict() for doc in docs], [{"player": "Alice"}, {"player": "Bob"}])
+        self.assertLess(self.db.bytes_read, full["bytes_read"])
+
+        self.db.reset_counters()
+        self.assertFalse(self.db.collection("wordle_entries").document("1_Nobody").get().exists)
+        self.assertEqual(self.db.reads, 1)
+
+    # create() makes the whole batch fail; merges apply Increment
+    # Data: a batch creating an existing entry next to a rollup increment
+    # Expected: AlreadyExists and the rollup untouched; a later merge adds up
+    def test_batch_semantics(self):
+        from firebase_admin import firestore
+
+        rollup = self.db.collection("wordle_monthly").document("2026_March")
+        rollup.set({"players": {"Alice": {"games": 1}}})
+
+        batch = self.db.batch()
+        batch.create(self.db.collection("wordle_entries").document("1738_Alice"), {"score": 2})
+        batch.set(rollup, {"players": {"Alice": {"games": firestore.Increment(1)}}}, merge=True)
+        with self.assertRaises(AlreadyExists):
+            batch.commit()
+        self.assertEqual(rollup.get().to_dict(), {"players": {"Alice": {"games": 1}}})
+
+        rollup.set({"players": {"Alice": {"games": firestore.Increment(2)}, "Bob": {"games": firestore.Increment(1)}},
+                    "month": "March"}, merge=True)
+        self.assertEqual(rollup.get().to_dict(),
+                         {"players": {"Alice": {"games": 3}, "Bob": {"games": 1}}, "month": "March"})
+
+    # Index-backed queries see later writes
+    # Data: query by player, then delete one entry and move another to Bob
+    # Expected: results follow the writes
+    def test_index_follows_writes(self):
+        entries = self.db.collection("wordle_entries")
+        by_alice = entries.where(filter=self.FieldFilter("player", "==", "Alice"))
+        self.assertEqual(len(by_alice.get()), 2)
+        entries.document("1737_Alice").delete()
+        entries.document("1738_Alice").set({"player": "Bob"}, merge=True)
+        self.assertEqual(self._ids(by_alice), [])
+        self.assertEqual(len(entries.where(filter=self.FieldFilter("player", "==", "Bob")).get()), 3)
+
+    # FirestoreStore over the stand-in answers like SQLite
+    # Data: a synthetic 6-player, 2-month history imported into both
+    # Expected: identical leaderboard, common compare, matrix, ratings and streak replies
+    def test_firestore_store_matches_sqlite(self):
+        history = bench_wordle.make_history(6, 2, seed=3, end=datetime.date(2026, 3, 23))
+        firestore_tracker = WordleTracker(store=wordle_storage.FirestoreStore(db=MemoryFirestore()), cache_size=0)
+        sqlite_tracker = WordleTracker(store=SQLiteStore(":memory:"), cache_size=0)
+        for tracker in (firestore_tracker, sqlite_tracker):
+            tracker.import_scores(history)
+
+        for reply in (lambda t: t.monthly_totals("March", "2026"),
+                      lambda t: t.compare_all("February", "2026", True),
+                      lambda t: t.head_to_head(["Alice", "Bob"], "March", "2026", True),
+                      lambda t: t.matrix("March", "2026"),
+                      lambda t: t.yearly_leaderboard("2026"),
+                      lambda t: t.ratings(),
+                      lambda t: t.streak("Carol")):
+            self.assertEqual(reply(firestore_tracker), reply(sqlite_tracker))
+
+
+class TestRollupCompleteness(unittest.TestCase):
+    """Firestore rollups against SQLite, which computes every total from the entries."""
+
+    def setUp(self):
+        self.db = MemoryFirestore()
+        self.firestore = WordleTracker(store=wordle_storage.FirestoreStore(db=self.db), cache_size=0)
+        self.sqlite = WordleTracker(store=SQLiteStore(":memory:"), cache_size=0)
+
+    def _legacy(self, *scores):
+        """Entries written before rollups existed: no monthly or daily documents."""
+        for parsed in scores:
+            entry = WordleTracker._entry_data(parsed)
+            self.db.collection("wordle_entries").document(f"{entry.puzzle}_{entry.player}").set(entry.to_dict())
+            self.sqlite.store.insert_entry(entry)
+
+    def _assert_same(self, *replies):
+        for reply in replies:
+            self.assertEqual(reply(self.firestore), reply(self.sqlite))
+
+    # The first save into a month without a complete rollup backfills it from the month's entries
+    # Data: Alice 3/6 and Bob 4/6 on 1737 stored without rollups, then Carol posts 2/6 on 1738
+    # Expected: leaderboard and matrix still count Alice and Bob; the rollup is marked complete
+    def test_first_save_backfills_month(self):
+        self._legacy((1737, "Alice", 3, 6, "2026-03-22", "March", "2026"),
+                     (1737, "Bob", 4, 6, "2026-03-22", "March", "2026"))
+        for tracker in (self.firestore, self.sqlite):
+            tracker.insert_score((1738, "Carol", 2, 6, "2026-03-23", "March", "2026"))
+
+        rollup = self.db.collection("wordle_monthly").document("2026_March").get().to_dict()
+        self.assertTrue(rollup["complete"])
+        self.assertEqual(set(rollup["players"]), {"Alice", "Bob", "Carol"})
+        self._assert_same(lambda t: t.monthly_totals("March", "2026"),
+                          lambda t: t.matrix("March", "2026"),
+                          lambda t: t.yearly_leaderboard("2026"))
+
+    # The complete marker is read with the player states, inside the write's transaction
+    # Data: a fresh store, Alice then Bob post 1738 (each process starts without knowing March)
+    # Expected: 4 round trips per insert once March is complete: begin, puzzle query, get_all, commit
+    def test_complete_marker_read_with_states(self):
+        self.firestore.insert_score((1738, "Alice", 2, 6, "2026-03-23", "March", "2026"))
+        store = wordle_storage.FirestoreStore(db=self.db)
+        self.db.reset_counters()
+        store.insert_entry(WordleTracker._entry_data((1738, "Bob", 3, 6, "2026-03-23", "March", "2026")),
+                           update_states=apply_entry)
+        self.assertEqual(self.db.round_trips, 4)
+        self.assertIn(("March", "2026"), store._complete)
+
+    # Saving over a stored entry replaces its totals instead of adding to them
+    # Data: Alice 2/6 and Bob 3/6 on 1738, then Alice's entry saved again as 4/6
+    # Expected: Alice 1 game and 3 pts, now behind Bob in the matrix, as SQLite has it
+    def test_save_overwrite_replaces_totals(self):
+        for tracker in (self.firestore, self.sqlite):
+            tracker.insert_score((1738, "Alice", 2, 6, "2026-03-23", "March", "2026"))
+            tracker.insert_score((1738, "Bob", 3, 6, "2026-03-23", "March", "2026"))
+            tracker.save((1738, "Alice", 4, 6, "2026-03-23", "March", "2026"))
+
+        totals = self.firestore.store.month_summary("March", "2026")["Alice"]
+        self.assertEqual((totals["games"], totals["points"]), (1, 3))
+        self.assertEqual(pair_view(self.firestore.store.month_pairs("March", "2026"), "Alice", "Bob")["losses"], 1)
+        self._assert_same(lambda t: t.monthly_totals("March", "2026"),
+                          lambda t: t.matrix("March", "2026"))
+
+    # Yearly replies scan the entries until every month has been rebuilt, then read the rollups
+    # Data: February stored without rollups, a March rollup written before the complete marker existed
+    # Expected: same yearly leaderboard before and after rebuild_all_rollups, which covers both months
+    def test_rebuild_all_rollups(self):
+        self._legacy((1708, "Alice", 2, 6, "2026-02-21", "February", "2026"),
+                     (1738, "Bob", 5, 6, "2026-03-23", "March", "2026"))
+        self.db.collection("wordle_monthly").document("2026_March").set(
+            {"month": "March", "year": "2026", "players": {"Bob": rollup_totals(5, 6)}})
+        self._assert_same(lambda t: t.yearly_leaderboard("2026"), lambda t: t.yearly_stats("Alice", "2026"))
+
+        mismatched = self.firestore.rebuild_all_rollups()
+        self.assertEqual(mismatched, {("February", "2026"): ["Alice"], ("March", "2026"): []})
+        self.assertTrue(self.db.collection("wordle_meta").document("rollups").get().to_dict()["complete"])
+        fresh = WordleTracker(store=wordle_storage.FirestoreStore(db=self.db), cache_size=0)
+        self.assertEqual(fresh.yearly_leaderboard("2026"), self.sqlite.yearly_leaderboard("2026"))
+        self.assertEqual(fresh.store.monthly_summaries("2026"), self.sqlite.store.monthly_summaries("2026"))
+
+
+class TestCommandBenchmarks(unittest.TestCase):
+
+    # The command suite runs end to end and its counts are exact
+    # Data: 4 players x 1 month, one timed pass
+    # Expected: every command measured, reads deterministic, an injected extra read flagged
+    def test_suite_and_compare(self):
+        first = bench_wordle.run_command_suite([(4, 1)], repeat=1)
+        second = bench_wordle.run_command_suite([(4, 1)], repeat=1)
+        commands = first["sizes"]["4x1"]["commands"]
+        self.assertIn("head_to_head.common", commands)
+        self.assertEqual(commands["monthly_totals"]["reads"], 1)
+        self.assertGreater(commands["insert_score"]["writes"], 0)
+        self.assertEqual(bench_wordle.compare_results(second, first, tolerance=100), [])
+
+        first["sizes"]["4x1"]["commands"]["monthly_totals"]["reads"] = 0
+        regressions = bench_wordle.compare_results(second, first, tolerance=100)
+        self.assertEqual(regressions, ["4x1 monthly_totals: reads 0 -> 1"])
+
+
+class TestLoadGenerator(unittest.TestCase):
+
+    # Resubmissions are scheduled right behind the post they race
+    # Data: rush of 5 players, every one resubmitting, 10 arrivals/s
+    # Expected: arrivals sorted, each duplicate within 50 ms of its original
+    def test_schedule_races_duplicates(self):
+        stream = load_wordle.make_rush(players=5, duplicates=1.0, commands=0)
+        arrivals = load_wordle.schedule(stream, rate=10)
+        self.assertEqual(len(arrivals), 10)
+        self.assertEqual(arrivals, sorted(arrivals, key=lambda a: a[0]))
+        first_seen = {}
+        for at, sender, message in arrivals:
+            if (sender, message) in first_seen:
+                self.assertLess(at - first_seen[(sender, message)], 0.05)
+            else:
+                first_seen[(sender, message)] = at
+
+    # A racing burst through main() accepts each score exactly once under both models
+    # Data: 3 players all resubmitting at once, 4 processes in flight
+    # Expected: 3 accepted, 3 duplicates, no race problems, stage timings collected
+    def test_burst_through_main(self):
+        arrivals = load_wordle.schedule(load_wordle.make_rush(players=3, duplicates=1.0, commands=0), rate=0)
+        with tempfile.TemporaryDirectory() as tmp:
+            for model in ("process", "resident"):
+                result = load_wordle.run_load(arrivals, model, concurrency=4, workdir=tmp)
+                print(f"\n[Load {model}] p95 {result['latency']['p95'] * 1000:.0f} ms, "
+                      f"start {result['start_cost'] * 1000:.0f} ms")
+                self.assertEqual(result["outcomes"], {"accepted": 3, "duplicate": 3})
+                self.assertEqual(result["races"]["resubmitted"], 3)
+                self.assertEqual(result["races"]["accepted_twice"] + result["races"]["never_accepted"]
+                                 + result["races"]["stored_wrong"], [])
+                self.assertEqual(result["stages"]["main"]["ms"]["count"], 6)
+
+    # With the write-behind queue every accepted score still lands in the store once
+    # Data: 3 players all resubmitting at once, WORDLE_QUEUE=1 with and without WORDLE_SEEN=1, both models
+    # Expected: 3 accepted, 3 duplicates, each key stored exactly once after shutdown
+    def test_burst_through_queue(self):
+        arrivals = load_wordle.schedule(load_wordle.make_rush(players=3, duplicates=1.0, commands=0), rate=0)
+        for seen in (False, True):
+            with tempfile.TemporaryDirectory() as tmp:
+                for model in ("process", "resident"):
+                    result = load_wordle.run_load(arrivals, model, concurrency=4, workdir=tmp, queue=True,
+                                                  seen=seen)
+                    self.assertEqual(result["outcomes"], {"accepted": 3, "duplicate": 3})
+                    self.assertEqual(result["races"]["accepted_twice"] + result["races"]["never_accepted"]
+                                     + result["races"]["stored_wrong"], [])
+
+
+# ──────────────────────────────────────────────
+#  Write-behind submission queue
+# ──────────────────────────────────────────────
+
+class TestSubmissionQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = os.path.join(self.tmp.name, "journal.jsonl")
+        self.store = SQLiteStore(":memory:")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _entry(self, player, score, puzzle=1738):
+        return Entry(puzzle, player, score, 6, "2026-03-23", "March", "2026")
+
+    # A score is acknowledged from the journal, before any store write
+    # Data: Alice 3/6 submitted, then flushed
+    # Expected: created with nothing stored and one journal line; stored after flush, journal empty
+    def test_ack_before_store_write(self):
+        queue = SubmissionQueue(self.store, self.journal).start(background=False)
+        self.assertEqual(queue.submit(self._entry("Alice", 3)), (True, None))
+        self.assertIsNone(self.store.get_entry(1738, "Alice"))
+        self.assertEqual([e.player for e in queue.pending()], ["Alice"])
+
+        self.assertEqual([e.player for e in queue.flush()], ["Alice"])
+        self.assertEqual(self.store.get_entry(1738, "Alice").score, 3)
+        self.assertEqual(queue.pending(), [])
+        queue.close()
+
+    # Duplicates are answered from the index, whether queued or already stored
+    # Data: Bob 4/6 stored, Alice 3/6 queued; both resubmit
+    # Expected: (False, 4) and (False, 3), and only Alice's first score journaled
+    def test_duplicates_from_index(self):
+        self.store.insert_entry(self._entry("Bob", 4))
+        queue = SubmissionQueue(self.store, self.journal).start(background=False)
+        queue.submit(self._entry("Alice", 3))
+        self.assertEqual(queue.submit(self._entry("Bob", 2)), (False, 4))
+        self.assertEqual(queue.submit(self._entry("Alice", 5)), (False, 3))
+        self.assertEqual(len(queue.pending()), 1)
+        queue.close()
+
+    # A journal left by a crashed process is replayed by the next one
+    # Data: one queue journals two scores and is never flushed; a second queue starts on the same file
+    # Expected: the second queue rejects a resubmission and commits both scores with their streaks
+    def test_replay_after_crash(self):
+        crashed = SubmissionQueue(self.store, self.journal)
+        crashed.submit(self._entry("Alice", 3))
+        crashed.submit(self._entry("Bob", 4))
+
+        queue = SubmissionQueue(self.store, self.journal).start(background=False)
+        self.assertEqual(queue.submit(self._entry("Alice", 1)), (False, 3))
+        queue.close()
+        self.assertEqual(sorted(e.player for e in self.store.entries_for_puzzle(1738)), ["Alice", "Bob"])
+        self.assertEqual(self.store.get_player_states(["Bob"])["Bob"]["games"], 1)
+        self.assertEqual(queue.pending(), [])
+
+    # A flush commits in batches and ends up where synchronous inserts do
+    # Data: a synthetic 5-player month queued on the Firestore stand-in, 50 entries per commit
+    # Expected: fewer commits than entries; same leaderboard, matrix, ratings and streak as SQLite
+    def test_batched_flush_matches_synchronous_inserts(self):
+        history = bench_wordle.make_history(5, 1, seed=4, end=datetime.date(2026, 3, 23))
+        db = MemoryFirestore()
+        queued = WordleTracker(store=wordle_storage.FirestoreStore(db=db), cache_size=0)
+        queued.queue = SubmissionQueue(queued.store, self.journal, batch_size=50,
+                                       lock=queued._ratings_lock).start(background=False)
+        direct = WordleTracker(store=SQLiteStore(":memory:"), cache_size=0)
+        for command in history:
+            queued.insert_score(command)
+            direct.insert_score(command)
+        self.assertEqual(db.writes, 0)
+
+        db.reset_counters()
+        created = queued.queue.flush()
+        self.assertEqual(len(created), len(history))
+        self.assertLessEqual(db.round_trips, 2 * len({c.puzzle for c in history}) + len(history) // 50 + 2)
+
+        for reply in (lambda t: t.monthly_totals("March", "2026"),
+                      lambda t: t.matrix("March", "2026"),
+                      lambda t: t.ratings(),
+                      lambda t: t.streak("Alice")):
+            self.assertEqual(reply(queued), reply(direct))
+        queued.close()
+
+    # A queued score that finds another already stored is dropped, the stored one kept
+    # Data: Alice queued 3/6, then Alice 5/6 written straight to the store before the flush
+    # Expected: a warning, the flush creates nothing, the stored 5/6 stays, the journal is emptied
+    def test_flush_keeps_score_stored_first(self):
+        queue = SubmissionQueue(self.store, self.journal).start(background=False)
+        queue.submit(self._entry("Alice", 3))
+        self.store.insert_entry(self._entry("Alice", 5))
+
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(queue.flush(), [])
+        self.assertEqual(self.store.get_entry(1738, "Alice").score, 5)
+        self.assertEqual(queue.pending(), [])
+        queue.close()
+
+    # Reads commit the queue first and the background flusher drains it on its own
+    # Data: tracker with a journal; Alice scores, then the leaderboard is read; Bob scores
+    # Expected: Alice on the leaderboard; Bob stored shortly after without any read
+    def test_tracker_reads_see_queued_scores(self):
+        tracker = WordleTracker(store=self.store, journal=self.journal)
+        tracker.insert_score((1738, "Alice", 2, 6, "2026-03-23", "March", "2026"))
+        self.assertIn("Alice — 5 pts", tracker.monthly_totals("March", "2026"))
+
+        tracker.insert_score((1738, "Bob", 4, 6, "2026-03-23", "March", "2026"))
+        deadline = time.time() + 5
+        while self.store.get_entry(1738, "Bob") is None and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertIsNotNone(self.store.get_entry(1738, "Bob"))
+        tracker.close()
+
+
+class TestSeenIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "seen.idx")
+        self.db = MemoryFirestore()
+        self.store = wordle_storage.FirestoreStore(db=self.db)
+        self.store.bulk_insert([Entry(puzzle, player, 3, 6, "2026-03-23", "March", "2026")
+                                for puzzle in (1700, 1737, 1738) for player in ("Alice", "Bob")])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    # The filter never forgets a key and rarely claims one it never saw
+    # Data: 1000 keys added to a filter sized for 1000 at 1%
+    # Expected: all found; under 3% of 10000 other keys reported
+    def test_bloom_filter_rates(self):
+        bloom = BloomFilter(capacity=1000, rate=0.01)
+        for i in range(1000):
+            bloom.add(f"{i}_Alice")
+        self.assertTrue(all(f"{i}_Alice" in bloom for i in range(1000)))
+        false_positives = sum(f"{i}_Bob" in bloom for i in range(10000))
+        print(f"\n[Bloom] {false_positives / 100:.2f}% false positives")
+        self.assertLess(false_positives, 300)
+
+    # Built from the store once, then loaded from the file
+    # Data: Alice and Bob on puzzles 1700, 1737 and 1738
+    # Expected: stored keys maybe, Carol on a recent puzzle definitely not; no store reads the
+    #           second time, within a minute of the first
+    def test_warm_then_load_from_file(self):
+        seen = SeenIndex(self.path).warm(self.store)
+        self.assertTrue(seen.might_contain(1738, "Alice"))
+        self.assertTrue(seen.might_contain(1700, "Bob"))
+        self.assertFalse(seen.might_contain(1738, "Carol"))
+        self.assertFalse(seen.might_contain(1739, "Alice"))
+
+        self.db.reset_counters()
+        loaded = SeenIndex(self.path).warm(self.store)
+        self.assertEqual(self.db.reads, 0)
+        self.assertEqual((loaded.count, sorted(loaded.hot)), (6, [1737, 1738]))
+
+    # A start after REFRESH_AGE picks up recent scores written without going through the index
+    # Data: index built, then Carol stored directly on 1738 and Dave on the newer 1740
+    # Expected: one range query over puzzles 1734-1740; both maybe afterwards, and in the file
+    def test_warm_refreshes_recent_puzzles(self):
+        SeenIndex(self.path).warm(self.store)
+        self.store.insert_entry(Entry(1738, "Carol", 4, 6, "2026-03-23", "March", "2026"))
+        self.store.insert_entry(Entry(1740, "Dave", 4, 6, "2026-03-25", "March", "2026"))
+
+        self.db.reset_counters()
+        with patch("wordle_seen.REFRESH_AGE", 0):
+            seen = SeenIndex(self.path).warm(self.store, latest=1740)
+        self.assertEqual((self.db.round_trips, self.db.reads), (1, 6))
+        self.assertTrue(seen.might_contain(1738, "Carol"))
+        self.assertTrue(seen.might_contain(1740, "Dave"))
+        self.assertEqual(SeenIndex(self.path).warm(self.store).count, 8)
+
+    # Adds from one process are seen by another through the file
+    # Data: two indexes on one file; Carol added to the first
+    # Expected: the second reports Carol as maybe
+    def test_adds_shared_through_file(self):
+        first = SeenIndex(self.path).warm(self.store)
+        second = SeenIndex(self.path).warm(self.store)
+        first.add(1738, "Carol")
+        self.assertTrue(second.might_contain(1738, "Carol"))
+
+    # An index past its capacity is rebuilt larger on the next start
+    # Data: index sized for 4 keys holding 6
+    # Expected: rebuilt from the store with room for twice the keys
+    def test_rebuilt_when_full(self):
+        SeenIndex(self.path, capacity=4).warm(self.store)
+        rebuilt = SeenIndex(self.path, capacity=4).warm(self.store)
+        self.assertEqual(rebuilt.capacity, 12)
+        self.assertTrue(rebuilt.might_contain(1737, "Bob"))
+
+    # New submissions skip the store; only possible duplicates are confirmed there
+    # Data: tracker with a queue and a seen index; Carol new on 1738, Alice resubmitting 1738
+    # Expected: no store read for Carol; Alice's duplicate message with her stored 3/6
+    def test_duplicate_check_skips_store_for_new_keys(self):
+        tracker = WordleTracker(store=self.store, seen_index=self.path,
+                                journal=os.path.join(self.tmp.name, "journal.jsonl"))
+        self.db.reset_counters()
+        self.assertEqual(tracker.duplicate_check((1738, "Carol", 4, 6, "2026-03-23", "March", "2026")), (False, ""))
+        self.assertEqual(self.db.reads, 0)
+
+        is_duplicate, message = tracker.duplicate_check((1738, "Alice", 4, 6, "2026-03-23", "March", "2026"))
+        self.assertTrue(is_duplicate)
+        self.assertIn("3/6", message)
+        self.assertEqual(self.db.reads, 1)
+        tracker.close()
+
+    # Without a queue the index would save no reads, so it is not used
+    # Data: tracker given a seen index path but no journal
+    # Expected: a warning and no index
+    def test_seen_index_needs_queue(self):
+        with self.assertLogs(level="WARNING"):
+            tracker = WordleTracker(store=self.store, seen_index=self.path)
+        self.assertIsNone(tracker.seen)
+
+    # Queued submissions use the index instead of reading the puzzle
+    # Data: queue and seen index; Carol new on 1738, then Alice and Carol resubmitting
+    # Expected: no store read for Carol; Alice confirmed from the store, Carol from the journal
+    def test_queue_uses_seen_index(self):
+        tracker = WordleTracker(store=self.store, seen_index=self.path,
+                                journal=os.path.join(self.tmp.name, "journal.jsonl"))
+        self.db.reset_counters()
+        self.assertEqual(tracker.insert_score((1738, "Carol", 4, 6, "2026-03-23", "March", "2026")), (True, None))
+        self.assertEqual(self.db.reads, 0)
+        self.assertEqual(tracker.insert_score((1738, "Alice", 5, 6, "2026-03-23", "March", "2026")), (False, 3))
+        self.assertEqual(tracker.insert_score((1738, "Carol", 2, 6, "2026-03-23", "March", "2026")), (False, 4))
+        tracker.close()
+
+
+# ──────────────────────────────────────────────
+#  Perf instrumentation
+# ──────────────────────────────────────────────
+
+class TestPerf(unittest.TestCase):
+
+    def setUp(self):
+        PERF.reset()
+
+    # Log-linear buckets keep quantiles within a bucket width
+    # Data: values 1..1000
+    # Expected: p50 ~500 and p99 ~990 within 19%, max exact, round trip through JSON
+    def test_histogram_quantiles(self):
+        histogram = Histogram()
+        for value in range(1, 1001):
+            histogram.add(value)
+        self.assertAlmostEqual(histogram.quantile(0.5), 500, delta=500 * 0.19)
+        self.assertAlmostEqual(histogram.quantile(0.99), 990, delta=990 * 0.19)
+        self.assertEqual(histogram.quantile(1.0), 1000)
+
+        restored = Histogram.from_dict(json.loads(json.dumps(histogram.to_dict())))
+        restored.merge(histogram)
+        self.assertEqual(restored.count, 2000)
+        self.assertEqual(restored.quantile(0.5), histogram.quantile(0.5))
+
+    # Tracker and store stages are recorded, reads count toward both
+    # Data: two entries in SQLite, then a monthly leaderboard
+    # Expected: store.month_summary rows also show up in tracker.monthly_totals
+    def test_spans_attribute_reads(self):
+        tracker = WordleTracker(store=SQLiteStore(":memory:"), cache_size=0)
+        for player, score in (("Alice", 3), ("Bob", 4)):
+            tracker.insert_score(WordleParser.parse(player, f"Wordle 1,738 {score}/6"))
+        PERF.reset()
+
+        tracker.monthly_totals("March", "2026")
+        report = PERF.report()
+        print(f"\n[Perf] {sorted(report)}")
+        self.assertEqual(set(report), {"tracker.monthly_totals", "store.month_summary"})
+        store_docs = report["store.month_summary"]["docs"]["max"]
+        self.assertGreaterEqual(store_docs, 2)
+        self.assertEqual(report["tracker.monthly_totals"]["docs"]["max"], store_docs)
+        self.assertGreater(report["tracker.monthly_totals"]["bytes"]["max"], 0)
+
+    # Each process flushes into the shared file; reports read file plus memory
+    # Data: two flushes of one parse each, then one more parse in memory
+    # Expected: 3 parse calls in the combined report and the Prometheus text
+    def test_flush_merges_processes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "perf.json")
+            for _ in range(2):
+                WordleParser.parse("Alice", "Wordle 1,738 3/6")
+                PERF.flush(path)
+                self.assertEqual(PERF.stages, {})
+            WordleParser.parse("Alice", "Wordle 1,738 3/6")
+
+            combined = PERF.combined(path)
+            self.assertEqual(combined.report()["parse"]["ms"]["count"], 3)
+            self.assertIn('wordle_stage_seconds_count{stage="parse"} 3', combined.prometheus())
+
+            output = wordle_firebase.perf_report(path)
+            self.assertIn("parse: n=3", output)
+
+    # Samples recorded while a flush is writing stay for the next flush; a failed write keeps its snapshot
+    # Data: one parse flushed while another is recorded mid-write; then a flush to a directory
+    # Expected: file holds 1 parse, memory holds 1; after the failed flush memory still holds 1
+    def test_flush_keeps_samples_recorded_during_write(self):
+        real_dump = json.dump
+
+        def dump_while_recording(*args, **kwargs):
+            PERF.record("parse", 0.001)
+            real_dump(*args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "perf.json")
+            WordleParser.parse("Alice", "Wordle 1,738 3/6")
+            with patch("wordle_perf.json.dump", side_effect=dump_while_recording):
+                PERF.flush(path)
+            self.assertEqual(PERF.report()["parse"]["ms"]["count"], 1)
+            self.assertEqual(PERF.combined(path).report()["parse"]["ms"]["count"], 2)
+
+            with self.assertRaises(OSError):
+                PERF.flush(tmp)
+            self.assertEqual(PERF.report()["parse"]["ms"]["count"], 1)
+
+    # "Wordle Perf" is answered without the database and is not advertised
+    # Message: "Wordle Perf" from Admin, listed in WORDLE_ADMINS
+    # Expected: plain block with stage timings, absent from Wordle List
+    @patch("wordle_firebase.ADMINS", {"Admin"})
+    @patch("wordle_firebase.WordleTracker", side_effect=AssertionError("tracker built"))
+    def test_perf_command(self, _):
+        self.assertIsInstance(WordleParser.parse("Admin", "Wordle Perf"), wordle_firebase.PerfCommand)
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch("wordle_firebase.PERF_PATH", os.path.join(tmp, "perf.json")):
+                output = wordle_firebase.handle_message(None, "Admin", "Wordle Perf")
+        self.assertIn("---Plain Start---", output)
+        self.assertIn("parse: n=", output)
+        self.assertNotIn("Perf", wordle_firebase.COMMAND_LIST)
+
+    # "Wordle Perf" from anyone not listed in WORDLE_ADMINS is ignored like any other chat
+    # Message: "Wordle Perf" from Alice, with only Admin listed
+    # Expected: no command and an empty reply
+    @patch("wordle_firebase.ADMINS", {"Admin"})
+    def test_perf_command_needs_admin(self):
+        self.assertIsNone(WordleParser.parse("Alice", "Wordle Perf"))
+        self.assertEqual(wordle_firebase.handle_message(None, "Alice", "Wordle Perf"), "")
+
+    # Recording can be switched off
+    # Data: PERF disabled while parsing and querying
+    # Expected: nothing recorded
+    def test_disabled(self):
+        with patch.object(PERF, "enabled", False):
+            WordleParser.parse("Alice", "Wordle 1,738 3/6")
+            WordleTracker(store=SQLiteStore(":memory:")).monthly_totals("March", "2026")
+        self.assertEqual(PERF.stages, {})
+
+        recorder = PerfRecorder(enabled=False)
+        with recorder.span("store.open"):
+            pass
+        self.assertEqual(recorder.stages, {})
+
+
+# ──────────────────────────────────────────────
+#  Start-up cost
+# ──────────────────────────────────────────────
+
+# Import budget for wordle_firebase in a fresh interpreter, in seconds
+IMPORT_TIME_BUDGET = 0.15
+
+IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import wordle_firebase
+import wordle_storage
+elapsed = time.perf_counter() - start
+print(elapsed, "firebase_admin" in sys.modules, "requests" in sys.modules)
+"""
+
+
+class TestStartupCost(unittest.TestCase):
+
+    # Importing the module must not pull in Firebase or requests
+    # Data: fresh interpreter importing wordle_firebase
+    # Expected: under IMPORT_TIME_BUDGET, heavy modules not loaded
+    def test_import_time_budget(self):
+        result = subprocess.run([sys.executable, "-c", IMPORT_PROBE], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        elapsed, firebase_loaded, requests_loaded = result.stdout.split()
+        print(f"\n[Import time] {float(elapsed) * 1000:.1f} ms")
+        self.assertLess(float(elapsed), IMPORT_TIME_BUDGET)
+        self.assertEqual(firebase_loaded, "False")
+        self.assertEqual(requests_loaded, "False")
+
+    # Static replies never construct a tracker
+    # Message: "Wordle List", "Wordle Leaderboard Octember 2026", "Wordle is hard"
+    # Expected: replies produced without connecting to the database
+    @patch("wordle_firebase.WordleTracker", side_effect=AssertionError("tracker built"))
+    def test_static_replies_skip_database(self, _):
+        start = time.perf_counter()
+        output = wordle_firebase.handle_message(None, "Bot", "Wordle List")
+        self.assertIn("---Plain Start---", output)
+        self.assertEqual(wordle_firebase.handle_message(None, "Bot", "Wordle Leaderboard Octember 2026"), "")
+        self.assertEqual(wordle_firebase.handle_message(None, "Bot", "Wordle is hard"), "")
+        self.assertLess(time.perf_counter() - start, 0.05)
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
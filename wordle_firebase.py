@@ -1,12 +1,27 @@
 import re
+import os
 import datetime
 import sys
+import json
 import base64
-import requests
+import socket
+import socketserver
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 import logging
-import firebase_admin
-from firebase_admin import credentials, firestore
-from google.cloud.firestore_v1.base_query import FieldFilter
+from typing import NamedTuple
+
+from wordle_nyt import NYTClient
+from wordle_perf import PERF, PERF_PATH, timed, instrument
+from wordle_queue import SubmissionQueue, JOURNAL_PATH
+from wordle_seen import SeenIndex, SEEN_PATH
+from wordle_grid import parse_grid, greens_by_guess, opener_luck
+from wordle_storage import Entry, COMPARE_FIELDS, GRID_FIELDS, open_store
+from wordle_ratings import apply_entry, replay
+from wordle_stats import ScoreColumns, aggregate, merge_totals, average, best, ranking, pair_view
 
 logging.basicConfig(level=logging.INFO,
                     format="%(asctime)s %(message)s",
@@ -17,101 +32,450 @@ VALID_MONTHS = [
     "July", "August", "September", "October", "November", "December"
 ]
 
-# 
-class WordleParser:
-    """Handles parsing of incoming WhatsApp messages. No database interaction."""
+# Wordle 0 was published on this date; puzzle N falls N days later
+WORDLE_LAUNCH_DATE = datetime.date(2021, 6, 19)
+
+# Known breaks in the one-puzzle-per-day calendar as (first_puzzle, day_shift).
+# The NYT has kept the numbering continuous so far; append here if that changes.
+PUZZLE_DATE_CORRECTIONS = []
+
+CALENDAR_PATH = os.environ.get("WORDLE_CALENDAR", "puzzle_calendar.dat")
+
+# Unix socket the resident daemon (--serve) listens on
+SOCKET_PATH = os.environ.get("WORDLE_SOCKET", "wordle.sock")
+DAEMON_TIMEOUT = 30
+
+# Count of store writes shared between processes; the daemon creates it and drops
+# its cached replies when another process (an import, a rebuild, a message the
+# daemon never saw) bumps it
+CHANGES_PATH = os.environ.get("WORDLE_CHANGES", "wordle_changes")
+
+# Reply to "Wordle List"
+COMMAND_LIST = (
+    "📋 Wordle Bot Commands\n"
+    "\n"
+    "Wordle Stats <Name> <Month> <Year>\n"
+    "  → Your scores, avg, best & failures for the month\n"
+    "\n"
+    "Wordle Stats <Name> <Year>\n"
+    "Wordle Stats <Name> All\n"
+    "  → The same for a whole year or all time\n"
+    "\n"
+    "Wordle Leaderboard Current\n"
+    "  → Rankings from 1st of this month to today\n"
+    "\n"
+    "Wordle Leaderboard <Month> <Year>\n"
+    "  → Full month rankings\n"
+    "\n"
+    "Wordle Leaderboard <Year>\n"
+    "  → Full year rankings\n"
+    "\n"
+    "Wordle Compare <p1> vs <p2> <Month> <Year>\n"
+    "  → Compare games played & avg score\n"
+    "\n"
+    "Wordle Compare <p1> vs <p2> <Month> <Year> Common\n"
+    "  → Compare on shared puzzles only\n"
+    "\n"
+    "Wordle Compare All <Month> <Year>\n"
+    "  → Compare all players for the month\n"
+    "\n"
+    "Wordle Compare All <Month> <Year> Common\n"
+    "  → Compare all players on shared puzzles only\n"
+    "\n"
+    "Wordle Matrix <Month> <Year>\n"
+    "  → Wins-losses-ties for every pair of players\n"
+    "\n"
+    "Wordle Greens <Month> <Year>\n"
+    "  → Average greens & yellows on each guess\n"
+    "\n"
+    "Wordle Openers <Month> <Year>\n"
+    "  → Luckiest opening guesses\n"
+    "\n"
+    "Wordle Streak <Name>\n"
+    "  → Current & longest solving streak\n"
+    "\n"
+    "Wordle Ratings\n"
+    "  → Elo ratings from head-to-head results"
+)
+
+# Senders (first names, comma-separated) allowed to send admin commands such as "Wordle Perf"
+ADMINS = {name.strip() for name in os.environ.get("WORDLE_ADMINS", "").split(",") if name.strip()}
+
+# Read-only commands answered in parallel by --batch
+BATCH_CONCURRENCY = 8
+
+# Maximum number of cached replies kept by WordleTracker (0 disables the cache)
+RESULT_CACHE_SIZE = 256
+
+# WORDLE_QUEUE=1 acknowledges scores from a local journal and writes them behind
+SUBMISSION_QUEUE = os.environ.get("WORDLE_QUEUE", "0") == "1"
+
+# WORDLE_SEEN=1 answers "definitely new" duplicate checks from a local index (with WORDLE_QUEUE=1 only)
+SEEN_INDEX = os.environ.get("WORDLE_SEEN", "0") == "1"
+
+
+class PuzzleCalendar:
+    """File-backed puzzle id -> date index of NYT-verified puzzles.
+
+    The file holds one fixed-width "YYYY-MM-DD\\n" record per puzzle id, so a
+    lookup is a slice at puzzle * RECORD_SIZE and loading is a single read.
+    Unknown puzzles are blank records.
+    """
+
+    RECORD_SIZE = 11
+    EMPTY_RECORD = b" " * 10 + b"\n"
+
+    _shared = None
+
+    def __init__(self, path=CALENDAR_PATH):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                self._data = bytearray(f.read())
+        except FileNotFoundError:
+            self._data = bytearray()
+
+    @classmethod
+    def shared(cls):
+        """Process-wide calendar backed by CALENDAR_PATH."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def __len__(self):
+        return sum(1 for i in range(0, len(self._data), self.RECORD_SIZE)
+                   if self._data[i] != 0x20)
+
+    def get(self, puzzle):
+        start = puzzle * self.RECORD_SIZE
+        record = self._data[start:start + 10]
+        if len(record) < 10 or record[0] == 0x20:
+            return None
+        return datetime.date.fromisoformat(record.decode("ascii"))
+
+    def lookup(self, puzzle):
+        """Return (date, month, year) strings for a known puzzle, else None."""
+        date = self.get(puzzle)
+        if date is None:
+            return None
+        return date.strftime("%Y-%m-%d"), VALID_MONTHS[date.month - 1], str(date.year)
+
+    def add(self, puzzle, date, save=True):
+        start = puzzle * self.RECORD_SIZE
+        if len(self._data) < start:
+            missing = (start - len(self._data)) // self.RECORD_SIZE
+            self._data += self.EMPTY_RECORD * missing
+        self._data[start:start + self.RECORD_SIZE] = f"{date:%Y-%m-%d}\n".encode("ascii")
+        if save:
+            self.save()
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._data)
+        os.replace(tmp_path, self.path)
+
+    def prefetch(self, start_date, end_date, client=None):
+        """Backfill every puzzle published between two dates (inclusive) from NYT.
+
+        Dates already in the calendar are skipped; the rest are fetched
+        concurrently over the client's pooled connections.
+        """
+        client = client or NYTClient.shared()
+
+        missing = []
+        date = start_date
+        while date <= end_date:
+            if self.get((date - WORDLE_LAUNCH_DATE).days) != date:
+                missing.append(date)
+            date += datetime.timedelta(days=1)
 
-    @staticmethod
-    def get_wordle_by_id(puzzle, start_date=None):
-        if start_date is None:
-            date = datetime.date.today()
-        else:
-            date = datetime.date.fromisoformat(start_date)
+        added = 0
+        for date, response in sorted(client.fetch_range(missing).items()):
+            if response and "days_since_launch" in response:
+                self.add(response["days_since_launch"], date, save=False)
+                added += 1
+            elif response is not None:
+                logging.info(f"No Wordle data available for {date}")
 
-        while True:
-            url = f"https://www.nytimes.com/svc/wordle/v2/{date:%Y-%m-%d}.json"
-            try:
-                response = requests.get(url).json()
-            except Exception as e:
-                raise RuntimeError(f"Failed fetching Wordle data: {e}")
+        self.save()
+        logging.info(f"Prefetched {added} puzzles between {start_date} and {end_date}")
+        return added
 
-            if "days_since_launch" not in response:
-                raise RuntimeError(f"No Wordle data available for {date}")
 
-            current_puzzle = response["days_since_launch"]
-            logging.info(f"Checking {date} -> ID {current_puzzle}")
+# ── Commands returned by WordleParser.parse ──
+# needs_db tells callers whether answering requires a WordleTracker.
+
+class ScoreCommand(NamedTuple):
+    """A "Wordle <puzzle> <score>/<max>" submission; unpacks like the stored entry.
+
+    grid is the packed emoji grid (wordle_grid), or None if the post had none.
+    """
+    puzzle: int
+    player: str
+    score: int
+    max_tries: int
+    date: str
+    month: str
+    year: str
+    grid: tuple = None
+    needs_db = True
+
+
+class StatsCommand(NamedTuple):
+    player: str
+    month: str
+    year: str
+    needs_db = True
+
+
+class YearlyStatsCommand(NamedTuple):
+    """Stats over a whole year, or all time when year is None."""
+    player: str
+    year: str
+    needs_db = True
+
+
+class CurrentLeaderboardCommand(NamedTuple):
+    needs_db = True
+
+
+class LeaderboardCommand(NamedTuple):
+    month: str
+    year: str
+    needs_db = True
+
+
+class YearlyLeaderboardCommand(NamedTuple):
+    year: str
+    needs_db = True
+
+
+class CompareAllCommand(NamedTuple):
+    month: str
+    year: str
+    common: bool
+    needs_db = True
+
+
+class CompareCommand(NamedTuple):
+    players: list
+    month: str
+    year: str
+    common: bool
+    needs_db = True
+
+
+class MatrixCommand(NamedTuple):
+    month: str
+    year: str
+    needs_db = True
+
+
+class GreensCommand(NamedTuple):
+    month: str
+    year: str
+    needs_db = True
+
+
+class OpenersCommand(NamedTuple):
+    month: str
+    year: str
+    needs_db = True
+
+
+class StreakCommand(NamedTuple):
+    player: str
+    needs_db = True
 
-            if current_puzzle == puzzle:
-                return date
-            elif current_puzzle > puzzle:
-                date -= datetime.timedelta(days=1)
-            else:
-                date += datetime.timedelta(days=1)
+
+class RatingsCommand(NamedTuple):
+    needs_db = True
+
+
+class ListCommand(NamedTuple):
+    needs_db = False
+
+
+class PerfCommand(NamedTuple):
+    """Admin-only timing report; deliberately left out of COMMAND_LIST."""
+    needs_db = False
+
+
+class WordleParser:
+    """Handles parsing of incoming WhatsApp messages. No database interaction."""
+
+    @staticmethod
+    @timed("nyt.lookup")
+    def get_wordle_by_id(puzzle, verify=False, calendar=None):
+        """Resolve a puzzle number to its date without walking the NYT calendar.
+
+        Puzzles already in the local calendar are returned straight away. Otherwise
+        the date is computed from the launch anchor plus any known corrections.
+        With verify=True the NYT endpoint for that date is fetched once, must
+        agree with the computed puzzle number, and the result is cached.
+        """
+        if calendar is None:
+            calendar = PuzzleCalendar.shared()
+
+        cached = calendar.get(puzzle)
+        if cached is not None:
+            return cached
+
+        offset = puzzle
+        for first_puzzle, shift in PUZZLE_DATE_CORRECTIONS:
+            if puzzle >= first_puzzle:
+                offset += shift
+
+        # NYT publishes one day ahead of some timezones, anything later is bogus
+        # (checked before the date arithmetic, which overflows for huge numbers)
+        latest = datetime.date.today() + datetime.timedelta(days=1)
+        if offset > (latest - WORDLE_LAUNCH_DATE).days:
+            raise RuntimeError(f"No Wordle data available for Wordle {puzzle}")
+        date = WORDLE_LAUNCH_DATE + datetime.timedelta(days=offset)
+
+        if verify:
+            response = NYTClient.shared().fetch(date)
+
+            if response.get("days_since_launch") != puzzle:
+                raise RuntimeError(f"NYT calendar mismatch for Wordle {puzzle} on {date}")
+
+            calendar.add(puzzle, date)
+
+        logging.debug(f"Resolved Wordle {puzzle} -> {date}")
+        return date
+
+    # One precompiled pattern per command; parse() picks it from the keyword
+    # after "Wordle" so a message is matched against at most two of them.
+    KEYWORD_RE = re.compile(r"Wordle ([\d,]+|[a-z]+)", re.IGNORECASE)
+    SCORE_RE = re.compile(r"Wordle ([\d,]+) ([X\d])/(\d+)\s*(?:\n|$)")
+    STATS_RE = re.compile(r"Wordle Stats (\w+)\s+(\w+)\s+(\d{4})\s*$", re.IGNORECASE)
+    YEARLY_STATS_RE = re.compile(r"Wordle Stats (\w+)\s+(\d{4}|All)\s*$", re.IGNORECASE)
+    CURRENT_LEADERBOARD_RE = re.compile(r"Wordle Leaderboard Current\s*$", re.IGNORECASE)
+    YEARLY_LEADERBOARD_RE = re.compile(r"Wordle Leaderboard (\d{4})\s*$", re.IGNORECASE)
+    LEADERBOARD_RE = re.compile(r"Wordle Leaderboard (\w+) (\d{4})", re.IGNORECASE)
+    COMPARE_ALL_RE = re.compile(r"Wordle Compare All\s+(\w+)\s+(\d{4})(\s+Common)?\s*$", re.IGNORECASE)
+    COMPARE_RE = re.compile(r"Wordle Compare (.+\s+vs\s+.+?)\s+(\w+)\s+(\d{4})(\s+Common)?\s*$", re.IGNORECASE)
+    VS_RE = re.compile(r"\s+vs\s+", re.IGNORECASE)
+    LIST_RE = re.compile(r"Wordle List\s*$", re.IGNORECASE)
+    MATRIX_RE = re.compile(r"Wordle Matrix (\w+)\s+(\d{4})\s*$", re.IGNORECASE)
+    GREENS_RE = re.compile(r"Wordle Greens (\w+)\s+(\d{4})\s*$", re.IGNORECASE)
+    OPENERS_RE = re.compile(r"Wordle Openers (\w+)\s+(\d{4})\s*$", re.IGNORECASE)
+    STREAK_RE = re.compile(r"Wordle Streak (\w+)\s*$", re.IGNORECASE)
+    RATINGS_RE = re.compile(r"Wordle Ratings\s*$", re.IGNORECASE)
+    PERF_RE = re.compile(r"Wordle Perf\s*$", re.IGNORECASE)
 
     @staticmethod
+    @timed("parse")
     def parse(player, message):
-        # Case #1: "Wordle <puzzle> <score>/<max_tries>"
-        match = re.match(r"Wordle ([\d,]+) ([X\d])/(\d+)\s*(?:\n|$)", message)
-        logging.info(f"Case #1 match: {match}")
+        """Turn a chat message into a command object, or None if it is not one."""
+        match = WordleParser.KEYWORD_RE.match(message)
+        if not match:
+            return None
+
+        keyword = match.group(1).lower()
+        handler = WordleParser._HANDLERS.get("score" if keyword[0].isdigit() else keyword)
+        if handler is None:
+            logging.debug(f"No command for keyword {keyword!r}")
+            return None
+        return handler(player, message)
 
-        if match:
-            puzzle = int(match.group(1).replace(',', ''))
-            score = match.group(2)
-            max_tries = int(match.group(3))
+    @staticmethod
+    def _parse_score(player, message):
+        # "Wordle <puzzle> <score>/<max_tries>"
+        match = WordleParser.SCORE_RE.match(message)
+        logging.debug(f"Score match: {match}")
+
+        if not match:
+            return None
+
+        puzzle = int(match.group(1).replace(',', ''))
+        score = match.group(2)
+        max_tries = int(match.group(3))
+
+        score_val = max_tries + 1 if score == "X" else int(score)
 
-            score_val = max_tries + 1 if score == "X" else int(score)
+        puzzle_date = WordleParser.get_wordle_by_id(puzzle)
+        puzzle_date_reformatted = puzzle_date.strftime("%Y-%m-%d")
+        month = VALID_MONTHS[puzzle_date.month - 1]
+        year = str(puzzle_date.year)
 
-            puzzle_date = WordleParser.get_wordle_by_id(puzzle)
-            puzzle_date_reformatted = puzzle_date.strftime("%Y-%m-%d")
-            month = puzzle_date.strftime("%B")
-            year = puzzle_date.strftime("%Y")
+        grid = parse_grid(message[match.end():])
 
-            print(f"Parsed: {puzzle}, {player}, {score_val}, {max_tries}, {puzzle_date_reformatted}, {month}, {year}")
-            return (puzzle, player, score_val, max_tries, puzzle_date_reformatted, month, year), "option_1"
+        logging.info(f"Parsed: {puzzle}, {player}, {score_val}, {max_tries}, {puzzle_date_reformatted}, {month}, {year}")
+        return ScoreCommand(puzzle, player, score_val, max_tries, puzzle_date_reformatted, month, year, grid)
 
-        # Case #2: "Wordle Stats <name> <month> <year>"
-        match = re.match(r"Wordle Stats (\w+)\s+(\w+)\s+(\d{4})\s*$", message, re.IGNORECASE)
-        logging.info(f"Case #2 match: {match}")
+    @staticmethod
+    def _parse_stats(player, message):
+        # "Wordle Stats <name> <year>" or "Wordle Stats <name> All"
+        match = WordleParser.YEARLY_STATS_RE.match(message)
+        logging.debug(f"Yearly stats match: {match}")
 
         if match:
             player_name = match.group(1).strip()
-            month_name = match.group(2).capitalize()
-            year_str = match.group(3)
+            year_str = None if match.group(2).lower() == "all" else match.group(2)
 
-            if month_name not in VALID_MONTHS:
-                logging.info(f"Invalid month detected: {month_name}")
-                return None, None
+            logging.info(f"Parsed stats request for {player_name} in {year_str or 'all time'}")
+            return YearlyStatsCommand(player_name, year_str)
+
+        # "Wordle Stats <name> <month> <year>"
+        match = WordleParser.STATS_RE.match(message)
+        logging.debug(f"Stats match: {match}")
 
-            logging.info(f"Parsed stats request for {player_name} in {month_name} {year_str}")
-            return (player_name, month_name, year_str), "option_2"
+        if not match:
+            return None
 
-        # Case #3: "Wordle Leaderboard Current" — must be before Case #4
-        match = re.match(r"Wordle Leaderboard Current\s*$", message, re.IGNORECASE)
-        logging.info(f"Case #3 match: {match}")
+        player_name = match.group(1).strip()
+        month_name = match.group(2).capitalize()
+        year_str = match.group(3)
+
+        if month_name not in VALID_MONTHS:
+            logging.info(f"Invalid month detected: {month_name}")
+            return None
+
+        logging.info(f"Parsed stats request for {player_name} in {month_name} {year_str}")
+        return StatsCommand(player_name, month_name, year_str)
+
+    @staticmethod
+    def _parse_leaderboard(player, message):
+        # "Wordle Leaderboard Current" — must be tried before "<Month> <Year>"
+        match = WordleParser.CURRENT_LEADERBOARD_RE.match(message)
+        logging.debug(f"Current leaderboard match: {match}")
 
         if match:
             logging.info("Parsed current month leaderboard request")
-            return None, "option_3"
+            return CurrentLeaderboardCommand()
 
-        # Case #4: "Wordle Leaderboard <Month> <Year>"
-        match = re.match(r"Wordle Leaderboard (\w+) (\d{4})", message, re.IGNORECASE)
-        logging.info(f"Case #4 match: {match}")
+        # "Wordle Leaderboard <Year>"
+        match = WordleParser.YEARLY_LEADERBOARD_RE.match(message)
+        logging.debug(f"Yearly leaderboard match: {match}")
 
         if match:
-            month_name = match.group(1).capitalize()
-            current_year = match.group(2)
+            logging.info(f"Parsed leaderboard request for {match.group(1)}")
+            return YearlyLeaderboardCommand(match.group(1))
 
-            if month_name not in VALID_MONTHS:
-                logging.info(f"Invalid month detected: {month_name}")
-                return None, None
+        # "Wordle Leaderboard <Month> <Year>"
+        match = WordleParser.LEADERBOARD_RE.match(message)
+        logging.debug(f"Leaderboard match: {match}")
+
+        if not match:
+            return None
 
-            month_year_key = f"{month_name} {current_year}"
-            logging.info(f"Parsed leaderboard request for {month_year_key}")
-            return month_year_key, "option_4"
+        month_name = match.group(1).capitalize()
+        year_str = match.group(2)
 
-        # Case #5: "Wordle Compare All <month> <year> [Common]"
-        match = re.match(r"Wordle Compare All\s+(\w+)\s+(\d{4})(\s+Common)?\s*$", message, re.IGNORECASE)
-        logging.info(f"Case #5 match: {match}")
+        if month_name not in VALID_MONTHS:
+            logging.info(f"Invalid month detected: {month_name}")
+            return None
+
+        logging.info(f"Parsed leaderboard request for {month_name} {year_str}")
+        return LeaderboardCommand(month_name, year_str)
+
+    @staticmethod
+    def _parse_compare(player, message):
+        # "Wordle Compare All <month> <year> [Common]"
+        match = WordleParser.COMPARE_ALL_RE.match(message)
+        logging.debug(f"Compare all match: {match}")
 
         if match:
             month_name = match.group(1).capitalize()
@@ -120,229 +484,766 @@ class WordleParser:
 
             if month_name not in VALID_MONTHS:
                 logging.info(f"Invalid month detected: {month_name}")
-                return None, None
+                return None
 
             logging.info(f"Parsed compare all: {month_name} {year_str}, common={common_mode}")
-            return (month_name, year_str, common_mode), "option_5"
+            return CompareAllCommand(month_name, year_str, common_mode)
 
-        # Case #6: "Wordle Compare <player1> vs <player2> [vs ...] <month> <year> [Common]"
-        match = re.match(r"Wordle Compare (.+\s+vs\s+.+?)\s+(\w+)\s+(\d{4})(\s+Common)?\s*$", message, re.IGNORECASE)
-        logging.info(f"Case #6 match: {match}")
+        # "Wordle Compare <player1> vs <player2> [vs ...] <month> <year> [Common]"
+        match = WordleParser.COMPARE_RE.match(message)
+        logging.debug(f"Compare match: {match}")
 
-        if match:
-            players = [p.strip().split()[0] for p in re.split(r'\s+vs\s+', match.group(1), flags=re.IGNORECASE)]
-            month_name = match.group(2).capitalize()
-            year_str = match.group(3)
-            common_mode = match.group(4) is not None
+        if not match:
+            return None
 
-            if month_name not in VALID_MONTHS:
-                logging.info(f"Invalid month detected: {month_name}")
-                return None, None
+        players = [p.strip().split()[0] for p in WordleParser.VS_RE.split(match.group(1))]
+        month_name = match.group(2).capitalize()
+        year_str = match.group(3)
+        common_mode = match.group(4) is not None
 
-            if len(players) < 2:
-                logging.info("Compare requires at least 2 players")
-                return None, None
+        if month_name not in VALID_MONTHS:
+            logging.info(f"Invalid month detected: {month_name}")
+            return None
 
-            logging.info(f"Parsed compare: {players}, {month_name} {year_str}, common={common_mode}")
-            return (players, month_name, year_str, common_mode), "option_6"
+        if len(players) < 2:
+            logging.info("Compare requires at least 2 players")
+            return None
 
-        # Case #7: "Wordle List"
-        match = re.match(r"Wordle List\s*$", message, re.IGNORECASE)
-        logging.info(f"Case #7 match: {match}")
+        # A player named twice is compared once
+        players = list(dict.fromkeys(players))
+        logging.info(f"Parsed compare: {players}, {month_name} {year_str}, common={common_mode}")
+        return CompareCommand(players, month_name, year_str, common_mode)
 
-        if match:
-            logging.info("Parsed list commands request")
-            return None, "option_7"
+    @staticmethod
+    def _parse_list(player, message):
+        # "Wordle List"
+        match = WordleParser.LIST_RE.match(message)
+        logging.debug(f"List match: {match}")
+
+        if not match:
+            return None
+
+        logging.info("Parsed list commands request")
+        return ListCommand()
+
+    @staticmethod
+    def _parse_matrix(player, message):
+        # "Wordle Matrix <month> <year>"
+        match = WordleParser.MATRIX_RE.match(message)
+        logging.debug(f"Matrix match: {match}")
+
+        if not match:
+            return None
+
+        month_name = match.group(1).capitalize()
+        year_str = match.group(2)
+
+        if month_name not in VALID_MONTHS:
+            logging.info(f"Invalid month detected: {month_name}")
+            return None
+
+        logging.info(f"Parsed matrix request for {month_name} {year_str}")
+        return MatrixCommand(month_name, year_str)
+
+    @staticmethod
+    def _parse_greens(player, message):
+        # "Wordle Greens <month> <year>"
+        match = WordleParser.GREENS_RE.match(message)
+        logging.debug(f"Greens match: {match}")
+
+        if not match:
+            return None
+
+        month_name = match.group(1).capitalize()
+        year_str = match.group(2)
+
+        if month_name not in VALID_MONTHS:
+            logging.info(f"Invalid month detected: {month_name}")
+            return None
+
+        logging.info(f"Parsed greens request for {month_name} {year_str}")
+        return GreensCommand(month_name, year_str)
+
+    @staticmethod
+    def _parse_openers(player, message):
+        # "Wordle Openers <month> <year>"
+        match = WordleParser.OPENERS_RE.match(message)
+        logging.debug(f"Openers match: {match}")
+
+        if not match:
+            return None
+
+        month_name = match.group(1).capitalize()
+        year_str = match.group(2)
+
+        if month_name not in VALID_MONTHS:
+            logging.info(f"Invalid month detected: {month_name}")
+            return None
+
+        logging.info(f"Parsed openers request for {month_name} {year_str}")
+        return OpenersCommand(month_name, year_str)
+
+    @staticmethod
+    def _parse_streak(player, message):
+        # "Wordle Streak <name>"
+        match = WordleParser.STREAK_RE.match(message)
+        logging.debug(f"Streak match: {match}")
+
+        if not match:
+            return None
+
+        logging.info(f"Parsed streak request for {match.group(1)}")
+        return StreakCommand(match.group(1))
+
+    @staticmethod
+    def _parse_ratings(player, message):
+        # "Wordle Ratings"
+        match = WordleParser.RATINGS_RE.match(message)
+        logging.debug(f"Ratings match: {match}")
+
+        if not match:
+            return None
+
+        logging.info("Parsed ratings request")
+        return RatingsCommand()
 
-        return None, None
+    @staticmethod
+    def _parse_perf(player, message):
+        # "Wordle Perf"
+        match = WordleParser.PERF_RE.match(message)
+        logging.debug(f"Perf match: {match}")
+
+        if not match:
+            return None
+
+        if player not in ADMINS:
+            logging.info(f"Ignoring perf request from {player}, who is not in WORDLE_ADMINS")
+            return None
+
+        logging.info("Parsed perf request")
+        return PerfCommand()
+
+
+WordleParser._HANDLERS = {
+    "score": WordleParser._parse_score,
+    "stats": WordleParser._parse_stats,
+    "leaderboard": WordleParser._parse_leaderboard,
+    "compare": WordleParser._parse_compare,
+    "list": WordleParser._parse_list,
+    "matrix": WordleParser._parse_matrix,
+    "greens": WordleParser._parse_greens,
+    "openers": WordleParser._parse_openers,
+    "streak": WordleParser._parse_streak,
+    "ratings": WordleParser._parse_ratings,
+    "perf": WordleParser._parse_perf,
+}
+
+
+class ResultCache:
+    """LRU cache of formatted replies, tagged with the month and players they cover.
+
+    Nothing expires on its own: finished months stay cached until pushed out by
+    newer entries, and a save only drops the replies for its month that include
+    the saving player. A reply whose month was invalidated while it was being
+    computed is returned but not cached, as it may predate the save.
+    """
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (month, year, players or None, value)
+        self._generations = {}  # (month, year) -> number of invalidations
+        self._cleared = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_compute(self, key, month, year, players, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][3]
+            self.misses += 1
+            generation = self._generation(month, year)
+
+        value = compute()
+
+        with self._lock:
+            if self._generation(month, year) != generation:
+                return value
+            self._entries[key] = (month, year, players, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, month, year, player=None):
+        """Drop replies covering the month (including yearly and all-time ones)
+        that cover all players or the given one."""
+        with self._lock:
+            self._generations[(month, year)] = self._generations.get((month, year), 0) + 1
+            stale = [
+                key for key, (m, y, players, _) in self._entries.items()
+                if m in (month, None) and y in (year, None)
+                and (player is None or players is None or player in players)
+            ]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        """Drop every reply, e.g. after another process wrote to the store."""
+        with self._lock:
+            self._cleared += 1
+            self._entries.clear()
+
+    def _generation(self, month, year):
+        """Invalidations so far of any month a reply tagged (month, year) covers (lock held)."""
+        return self._cleared + sum(count for (m, y), count in self._generations.items()
+                                   if month in (m, None) and year in (y, None))
+
+    def stats(self):
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class ChangeCounter:
+    """Number of store writes made by any process, kept in a small shared file.
+
+    Each process remembers the count it last saw, so a different count means
+    another process wrote since. Writes are only counted while the file exists,
+    which the daemon sees to: without one there is no cache to keep fresh.
+    """
+
+    def __init__(self, path=CHANGES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seen = self._read()
+
+    def _read(self):
+        import fcntl
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_SH)
+                return f.read().strip()
+        except FileNotFoundError:
+            return ""
+        except OSError as e:
+            logging.warning(f"Could not read {self.path}: {e}")
+            return self._seen
+
+    def changed(self):
+        """True if another process wrote since the last look."""
+        with self._lock:
+            current = self._read()
+            if current == self._seen:
+                return False
+            self._seen = current
+            return True
+
+    def bump(self):
+        """Count a write by this process; True if another process wrote since the last look."""
+        import fcntl
+
+        with self._lock:
+            try:
+                with open(self.path, "r+", encoding="utf-8") as f:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    current = f.read().strip()
+                    count = str(int(current) + 1 if current.isdigit() else 1)
+                    f.seek(0)
+                    f.truncate()
+                    f.write(count)
+            except FileNotFoundError:
+                return False
+            except OSError as e:
+                logging.warning(f"Could not count the write in {self.path}: {e}")
+                return False
+            others = current != self._seen
+            self._seen = count
+        return others
+
+
+def cached_reply(method):
+    """Serve a WordleTracker reply from tracker.cache, keyed by method and arguments.
+
+    The month, year and player(s) arguments tag the entry for invalidation.
+    Methods with a year but no month are tagged month None (any month of that
+    year; year None means any year), and methods with neither
+    (current_leaderboard) are tagged with today's month.
+    Calls that pass pre-loaded columns bypass the cache. Queued scores are
+    committed before a reply is computed, and the whole cache is dropped when
+    another process has written to the store.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        params = {name: value for name, value in bound.arguments.items() if name != "self"}
+
+        def compute():
+            self._drain()
+            return method(self, *args, **kwargs)
+
+        if self.cache is None or params.pop("columns", None) is not None:
+            return compute()
+
+        if "month" in params:
+            month, year = params["month"], params["year"]
+        elif "year" in params:
+            month, year = None, params["year"]
+        else:
+            today = datetime.date.today()
+            month, year = today.strftime("%B"), str(today.year)
+            params["today"] = today.isoformat()
+
+        if "player" in params:
+            players = frozenset([params["player"]])
+        elif "players" in params:
+            players = frozenset(params["players"])
+        else:
+            players = None
 
+        key = (method.__name__,) + tuple(
+            (name, tuple(value) if isinstance(value, list) else value) for name, value in params.items()
+        )
+        if self.changes is not None and self.changes.changed():
+            logging.info(f"Store written by another process, dropping {len(self.cache)} cached replies")
+            self.cache.clear()
+        return self.cache.get_or_compute(key, month, year, players, compute)
+
+    return wrapper
 
+
+@instrument("tracker")
 class WordleTracker:
-    """Handles all Firebase interactions: saving scores, duplicate checking, and leaderboards."""
+    """Handles scores, duplicate checking and leaderboards on top of a storage backend.
+
+    With a journal path (or WORDLE_QUEUE=1) new scores go through a
+    SubmissionQueue: they are acknowledged once journaled and committed in the
+    background, and every read commits the queue first.
+
+    With a seen index path (or WORDLE_SEEN=1) as well as a queue, queued
+    submissions and duplicate checks only ask the store about keys the index
+    cannot rule out.
+
+    Writes are counted in changes_path (see ChangeCounter) so that cached
+    replies in other processes are dropped; None leaves it out.
+    """
+
+    def __init__(self, store=None, cache_size=RESULT_CACHE_SIZE, journal=None, seen_index=None,
+                 changes_path=CHANGES_PATH):
+        if store is None:
+            with PERF.span("store.open"):
+                store = open_store()
+        self.store = store
+        self.cache = ResultCache(cache_size) if cache_size else None
+        self.changes = ChangeCounter(changes_path) if changes_path else None
+        # Serialises reading and writing player states between saves
+        self._ratings_lock = threading.Lock()
+        if journal is None and SUBMISSION_QUEUE:
+            journal = JOURNAL_PATH
+        if seen_index is None and SEEN_INDEX:
+            seen_index = SEEN_PATH
+        if seen_index and not journal:
+            # Synchronous inserts read the puzzle in their transaction anyway
+            logging.warning("The seen index only helps with the submission queue (WORDLE_QUEUE=1), ignoring it")
+            seen_index = None
+        # The NYT publishes a day ahead of some timezones
+        latest = (datetime.date.today() - WORDLE_LAUNCH_DATE).days + 1
+        self.seen = SeenIndex(seen_index).warm(store, latest) if seen_index else None
+        self.queue = (SubmissionQueue(store, journal, lock=self._ratings_lock, seen=self.seen).start()
+                      if journal else None)
+
+    def close(self):
+        if self.queue is not None:
+            self.queue.close()
+
+    def _drain(self):
+        """Commit queued scores so the store reads that follow include them."""
+        if self.queue is not None:
+            self.queue.flush()
+
+    def _mark_seen(self, entries):
+        if self.seen is not None:
+            self.seen.add_many((entry.puzzle, entry.player) for entry in entries)
+
+    def _invalidate(self, month, year, player=None):
+        others = self.changes is not None and self.changes.bump()
+        if self.cache is not None:
+            if others:
+                self.cache.clear()
+            self.cache.invalidate(month, year, player)
+
+    @staticmethod
+    def duplicate_message(parsed, existing_score):
+        puzzle, player, score_val, max_tries, date, month, year = parsed[:7]
 
-    def __init__(self):
-        cred = credentials.Certificate("firebase-key.json")
-        firebase_admin.initialize_app(cred)
-        self.db = firestore.client()
-        logging.info("Connected to Firebase Firestore.")
+        fail_message = " (or at least tried to). " if existing_score and existing_score > max_tries else ". "
 
-    def duplicate_check(self, parsed):
-        puzzle, player, score_val, max_tries, date, month, year = parsed
+        return (
+            f"{player}! You've solved Wordle {puzzle} already" + fail_message +
+            f"The score you got was {existing_score if existing_score and existing_score <= max_tries else 'X'}/{max_tries}."
+        )
 
-        results_ref = self.db.collection("wordle_entries")
-        query = results_ref.where(filter=FieldFilter("puzzle", "==", puzzle)).where(filter=FieldFilter("player", "==", player)).stream()
-        docs = list(query)
+    def duplicate_check(self, parsed):
+        puzzle, player, score_val, max_tries, date, month, year = parsed[:7]
 
-        if docs:
-            existing_score = docs[0].to_dict().get("score", None)
-            fail_message = " (or at least tried to). " if existing_score and existing_score > max_tries else ". "
+        self._drain()
+        if self.seen is not None and not self.seen.might_contain(puzzle, player):
+            return False, ""
+        existing = self.store.get_entry(puzzle, player)
 
-            message = (
-                f"{player}! You've solved Wordle {puzzle} already" + fail_message +
-                f"The score you got was {existing_score if existing_score and existing_score <= max_tries else 'X'}/{max_tries}."
-            )
+        if existing:
+            existing_score = existing.score
+            message = self.duplicate_message(parsed, existing_score)
 
             logging.info(f"Duplicate entry detected for player {player} on puzzle {puzzle}.")
             return True, message
 
         return False, ""
 
-    def monthly_totals(self, month, year):
-        results = (
-            self.db.collection("wordle_entries")
-            .where(filter=FieldFilter("month", "==", month))
-            .where(filter=FieldFilter("year", "==", year))
-            .stream()
-        )
+    def insert_score(self, parsed):
+        """Store the score only if the player has no entry for that puzzle yet.
+
+        The puzzle's other entries and the streak and rating states of everyone
+        on it are read, and the updated states and the month's pairwise totals
+        written, in the same store transaction, so concurrent processes cannot
+        lose each other's updates.
+        With a queue the entry is only journaled here and all of that happens
+        when the queue is flushed.
+        Returns (True, None) when created, else (False, existing_score).
+        """
+        puzzle, player, score_val, max_tries, date, month, year = parsed[:7]
+
+        entry = self._entry_data(parsed)
+        if self.queue is not None:
+            created, existing_score = self.queue.submit(entry)
+        else:
+            with self._ratings_lock:
+                created, existing_score = self.store.insert_entry(entry, update_states=apply_entry)
+        if not created:
+            logging.info(f"Duplicate entry detected for player {player} on puzzle {puzzle}.")
+            return False, existing_score
 
-        scores = {}
-        for doc in results:
-            data = doc.to_dict()
-            points = data["max_tries"] - data["score"] + 1
-            scores[data["player"]] = scores.get(data["player"], 0) + points
+        self._mark_seen([entry])
+        self._invalidate(month, year, player)
+        logging.info(f"Saved score for {player} on puzzle {puzzle}")
+        return True, None
 
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    @cached_reply
+    def monthly_totals(self, month, year):
+        summary = self.store.month_summary(month, year)
 
         board = [f" 🏆 Monthly Leaderboard ({month} {year})"]
-        for i, (player, pts) in enumerate(sorted_scores, start=1):
+        for i, (player, pts) in enumerate(ranking(summary), start=1):
             board.append(f"{i}. {player} — {pts} pts")
 
         logging.info(f"Generated monthly totals for {month} {year}")
         return "\n".join(board)
 
+    @staticmethod
+    def _entry_data(parsed):
+        puzzle, player, score_val, max_tries, date, month, year = parsed[:7]
+        grid = parsed[7] if len(parsed) > 7 else None
+        return Entry(puzzle, player, score_val, max_tries, date, month, year, grid)
+
     def save(self, parsed):
-        puzzle, player, score_val, max_tries, date, month, year = parsed
-
-        doc_ref = self.db.collection("wordle_entries").document(f"{puzzle}_{player}")
-        doc_ref.set({
-            "puzzle": puzzle,
-            "player": player,
-            "score": score_val,
-            "max_tries": max_tries,
-            "date": date,
-            "month": month,
-            "year": year
-        })
+        """Write an entry, replacing the player's stored one for that puzzle.
+
+        The month's summaries are corrected in the same transaction; replacing
+        an entry leaves the streak and rating states to --rebuild-ratings.
+        """
+        puzzle, player, score_val, max_tries, date, month, year = parsed[:7]
+
+        entry = self._entry_data(parsed)
+        self._drain()
+        with self._ratings_lock:
+            self.store.save_entry(entry, update_states=apply_entry)
+        self._mark_seen([entry])
+        self._invalidate(month, year, player)
         logging.info(f"Saved score for {player} on puzzle {puzzle}")
 
-    def player_stats(self, player, month, year):
-        results = list(
-            self.db.collection("wordle_entries")
-            .where(filter=FieldFilter("player", "==", player))
-            .where(filter=FieldFilter("month", "==", month))
-            .where(filter=FieldFilter("year", "==", year))
-            .stream()
-        )
+    def rebuild_rollups(self, month, year):
+        """Recompute a month's stored summaries from the raw entries.
+
+        Returns the players whose stored totals differed from the entries.
+        """
+        self._drain()
+        mismatched = self.store.rebuild_summaries(month, year)
+        self._invalidate(month, year)
+        return mismatched
+
+    def rebuild_all_rollups(self):
+        """rebuild_rollups for every month with entries.
+
+        Until this has run once, yearly and all-time replies are summed from
+        every entry, as months recorded before rollups existed may lack one.
+        Returns {(month, year): players whose stored totals differed}.
+        """
+        self._drain()
+        mismatched = self.store.rebuild_all_summaries()
+        for month, year in mismatched:
+            self._invalidate(month, year)
+        logging.info(f"Rebuilt rollups for {len(mismatched)} months")
+        return mismatched
+
+    def import_scores(self, commands):
+        """Store many ScoreCommands at once, skipping ones already recorded.
+
+        Returns the number of entries created.
+        """
+        entries = [self._entry_data(command) for command in commands]
+        self._drain()
+        created = self.store.bulk_insert(entries)
+        self._mark_seen(entries)
+        months = {(entry.month, entry.year) for entry in entries}
+        for month, year in months:
+            self._invalidate(month, year)
+        logging.info(f"Imported {created} of {len(entries)} scores")
+
+        # Imported history lands around existing scores: replay the ratings and
+        # the pairwise totals, which depend on every entry for a puzzle
+        if created:
+            self.rebuild_ratings()
+            for month, year in sorted(months):
+                self.rebuild_rollups(month, year)
+        return created
+
+    @cached_reply
+    def matrix(self, month, year):
+        """Grid of each row player's wins-losses-ties against each column player."""
+        pairs = self.store.month_pairs(month, year)
+        players = sorted(set(pairs).union(*pairs.values()))
+
+        if not players:
+            return f"No shared puzzles found for {month} {year}."
+
+        rows = [[player] for player in players]
+        for row, player in zip(rows, players):
+            for opponent in players:
+                pair = pair_view(pairs, player, opponent) if opponent != player else None
+                row.append(f"{pair['wins']}-{pair['losses']}-{pair['ties']}" if pair else "—")
+
+        widths = [max(len(name), *(len(row[i + 1]) for row in rows)) for i, name in enumerate(players)]
+        name_width = max(len(player) for player in players)
+
+        lines = [f"🧮 Head-to-Head Matrix ({month} {year})", "(row vs column: wins-losses-ties)"]
+        lines.append(" " * name_width + " | " + " | ".join(p.center(w) for p, w in zip(players, widths)).rstrip())
+        for row in rows:
+            cells = " | ".join(cell.center(width) for cell, width in zip(row[1:], widths))
+            lines.append(f"{row[0].ljust(name_width)} | {cells}".rstrip())
+
+        logging.info(f"Generated head-to-head matrix for {month} {year}")
+        return "\n".join(lines)
+
+    def _month_grids(self, month, year):
+        """{player: [packed grid, ...]} for the month's entries that came with a grid."""
+        grids = {}
+        for entry in self.store.entries_for_month(month, year, fields=GRID_FIELDS):
+            if entry.grid:
+                grids.setdefault(entry.player, []).append(entry.grid)
+        return grids
+
+    @cached_reply
+    def greens(self, month, year):
+        grids = self._month_grids(month, year)
+
+        if not grids:
+            return f"No grids found for {month} {year}."
 
-        if not results:
-            return f"No entries found for {player} in {month} {year}."
+        lines = [f"🟩 Greens by Guess ({month} {year})"]
+        for guess, rows, greens, yellows in greens_by_guess(g for player_grids in grids.values() for g in player_grids):
+            lines.append(f"Guess {guess}: {greens:.1f} 🟩 {yellows:.1f} 🟨 ({rows} rows)")
 
-        games_played = len(results)
-        scores = [doc.to_dict()["score"] for doc in results]
-        max_tries_vals = [doc.to_dict()["max_tries"] for doc in results]
+        logging.info(f"Generated greens by guess for {month} {year}")
+        return "\n".join(lines)
+
+    @cached_reply
+    def openers(self, month, year):
+        grids = self._month_grids(month, year)
+
+        if not grids:
+            return f"No grids found for {month} {year}."
+
+        lines = [f"🍀 Luckiest Openers ({month} {year})"]
+        for i, (player, openers, greens, yellows) in enumerate(opener_luck(grids), start=1):
+            lines.append(f"{i}. {player} — {greens:.2f} 🟩 {yellows:.2f} 🟨 ({openers} openers)")
+
+        logging.info(f"Generated luckiest openers for {month} {year}")
+        return "\n".join(lines)
+
+    def rebuild_ratings(self):
+        """Recompute every player's streak and rating state from all entries.
+
+        Returns the number of players rated.
+        """
+        self._drain()
+        with self._ratings_lock:
+            states = replay(self.store.all_entries(fields=COMPARE_FIELDS))
+            self.store.replace_player_states(states)
+        logging.info(f"Rebuilt streaks and ratings for {len(states)} players")
+        return len(states)
 
-        failures = sum(1 for s, m in zip(scores, max_tries_vals) if s > m)
-        valid_scores = [s for s, m in zip(scores, max_tries_vals) if s <= m]
+    def streak(self, player):
+        self._drain()
+        state = self.store.get_player_states([player]).get(player)
 
-        avg_score = round(sum(valid_scores) / len(valid_scores), 1) if valid_scores else "N/A"
-        best_score = min(valid_scores) if valid_scores else "N/A"
+        if not state:
+            return f"No entries found for {player}."
 
         lines = [
-            f"📊 Stats for {player} — {month} {year}",
-            f"Games Played : {games_played}",
-            f"Average Score: {avg_score}",
-            f"Best Score   : {best_score}",
-            f"Failures (X) : {failures}",
+            f"🔥 Streaks for {player}",
+            f"Current Streak : {state['current_streak']} (through Wordle {state['last_puzzle']})",
+            f"Longest Streak : {state['longest_streak']}",
+            f"Rating         : {round(state['rating'])}",
         ]
 
-        logging.info(f"Generated stats for {player} in {month} {year}")
+        logging.info(f"Generated streaks for {player}")
+        return "\n".join(lines)
+
+    def ratings(self):
+        self._drain()
+        states = sorted(self.store.all_player_states(), key=lambda state: state["rating"], reverse=True)
+
+        if not states:
+            return "No ratings yet."
+
+        board = ["📈 Ratings (head-to-head on shared puzzles)"]
+        for i, state in enumerate(states, start=1):
+            board.append(f"{i}. {state['player']} — {round(state['rating'])} ({state['games']} games)")
+
+        logging.info("Generated ratings")
+        return "\n".join(board)
+
+    @staticmethod
+    def _stats_reply(player, scope, totals):
+        if not totals:
+            return f"No entries found for {player} in {scope}."
+
+        avg_score = average(totals)
+        best_score = best(totals)
+
+        lines = [
+            f"📊 Stats for {player} — {scope}",
+            f"Games Played : {totals['games']}",
+            f"Average Score: {avg_score if avg_score is not None else 'N/A'}",
+            f"Best Score   : {best_score if best_score is not None else 'N/A'}",
+            f"Failures (X) : {totals['failures']}",
+        ]
         return "\n".join(lines)
 
+    @cached_reply
+    def player_stats(self, player, month, year):
+        totals = self.store.month_summary(month, year, player=player).get(player)
+
+        logging.info(f"Generated stats for {player} in {month} {year}")
+        return self._stats_reply(player, f"{month} {year}", totals)
+
+    @cached_reply
+    def yearly_stats(self, player, year):
+        """Stats over a year (or all time when year is None), summed from monthly summaries."""
+        totals = merge_totals(self.store.monthly_summaries(year).values()).get(player)
+
+        scope = year if year is not None else "All Time"
+        logging.info(f"Generated stats for {player} in {scope}")
+        return self._stats_reply(player, scope, totals)
+
+    @cached_reply
+    def yearly_leaderboard(self, year):
+        summary = merge_totals(self.store.monthly_summaries(year).values())
+
+        if not summary:
+            return f"No entries found for {year}."
+
+        board = [f" 🏆 Yearly Leaderboard ({year})"]
+        for i, (player, pts) in enumerate(ranking(summary), start=1):
+            board.append(f"{i}. {player} — {pts} pts")
+
+        logging.info(f"Generated yearly leaderboard for {year}")
+        return "\n".join(board)
+
+    @cached_reply
     def current_leaderboard(self):
         today = datetime.date.today()
         first_of_month = today.replace(day=1)
 
         first_str = first_of_month.strftime("%Y-%m-%d")
         today_str = today.strftime("%Y-%m-%d")
+        month_name = today.strftime("%B")
 
-        results = list(
-            self.db.collection("wordle_entries")
-            .where(filter=FieldFilter("date", ">=", first_str))
-            .where(filter=FieldFilter("date", "<=", today_str))
-            .stream()
-        )
+        summary = self.store.month_summary(month_name, str(today.year))
 
-        if not results:
+        if not summary:
             return f"No entries found for this month so far ({first_str} to {today_str})."
 
-        scores = {}
-        for doc in results:
-            data = doc.to_dict()
-            points = data["max_tries"] - data["score"] + 1
-            scores[data["player"]] = scores.get(data["player"], 0) + points
-
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-
-        month_name = today.strftime("%B")
         board = [f"📅 {month_name} Leaderboard ({first_str} to {today_str})"]
-        for i, (player, pts) in enumerate(sorted_scores, start=1):
+        for i, (player, pts) in enumerate(ranking(summary), start=1):
             board.append(f"{i}. {player} — {pts} pts")
 
         logging.info(f"Generated current month leaderboard for {first_str} to {today_str}")
         return "\n".join(board)
 
-    def compare_all(self, month, year, common_only):
-        results = list(
-            self.db.collection("wordle_entries")
-            .where(filter=FieldFilter("month", "==", month))
-            .where(filter=FieldFilter("year", "==", year))
-            .stream()
-        )
-        players = sorted(set(doc.to_dict()["player"] for doc in results))
-        if not players:
-            return f"No entries found for {month} {year}."
-        return self.head_to_head(players, month, year, common_only)
+    def month_columns(self, month, year, fields=COMPARE_FIELDS):
+        """A month of entries loaded into ScoreColumns for the stats engine."""
+        self._drain()
+        return ScoreColumns.from_entries(self.store.entries_for_month(month, year, fields=fields))
 
-    def head_to_head(self, players, month, year, common_only):
-        # Fetch each player's submissions for the month as {puzzle: {score, max_tries}}
-        player_data = {}
-        for player in players:
-            results = list(
-                self.db.collection("wordle_entries")
-                .where(filter=FieldFilter("player", "==", player))
-                .where(filter=FieldFilter("month", "==", month))
-                .where(filter=FieldFilter("year", "==", year))
-                .stream()
-            )
-            player_data[player] = {
-                doc.to_dict()["puzzle"]: {
-                    "score": doc.to_dict()["score"],
-                    "max_tries": doc.to_dict()["max_tries"]
-                }
-                for doc in results
-            }
-
-        # Shared puzzles = puzzles submitted by ALL players
-        all_puzzle_sets = [set(d.keys()) for d in player_data.values()]
-        shared_puzzles = set.intersection(*all_puzzle_sets) if all_puzzle_sets else set()
-
-        # In common_only mode, restrict active set to shared puzzles
+    @cached_reply
+    def compare_all(self, month, year, common_only):
         if common_only:
-            active_data = {
-                player: {p: s for p, s in data.items() if p in shared_puzzles}
-                for player, data in player_data.items()
-            }
+            columns = self.month_columns(month, year)
+            players = sorted(columns.players)
         else:
-            active_data = player_data
+            columns = None
+            players = sorted(self.store.month_summary(month, year))
+        if not players:
+            return f"No entries found for {month} {year}."
+        return self.head_to_head(players, month, year, common_only, columns=columns)
+
+    def _compare_totals(self, players, month, year, common_only, columns=None):
+        """({player: totals} for the compared games, number of shared puzzles).
+
+        Every game counts from the month summary; two players on common
+        puzzles come from the pairwise totals. More players on common puzzles
+        need the puzzles all of them share, so the month's entries are scanned.
+        """
+        if not common_only:
+            summary = self.store.month_summary(month, year)
+            return {player: summary[player] for player in players if player in summary}, None
+
+        if columns is None and len(players) == 2:
+            first, second = players
+            pair = pair_view(self.store.month_pairs(month, year), first, second)
+            if pair is None:
+                return {}, 0
+            return {
+                first: {"games": pair["shared"], "failures": pair["shared"] - pair["solved"],
+                        "score_sum": pair["score_sum"]},
+                second: {"games": pair["shared"], "failures": pair["shared"] - pair["opponent_solved"],
+                         "score_sum": pair["opponent_score_sum"]},
+            }, pair["shared"]
+
+        if columns is None:
+            columns = self.month_columns(month, year)
+        shared_puzzles = columns.shared_puzzles(players)
+        return aggregate(columns.restrict(players=players, puzzles=shared_puzzles)), len(shared_puzzles)
+
+    @cached_reply
+    def head_to_head(self, players, month, year, common_only, columns=None):
+        totals, shared_count = self._compare_totals(players, month, year, common_only, columns)
 
-        # Compute per-player stats from active set
         summaries = []
         for player in players:
-            active = active_data[player]
-            games = len(active)
-            valid_scores = [v["score"] for v in active.values() if v["score"] <= v["max_tries"]]
-            avg = round(sum(valid_scores) / len(valid_scores), 1) if valid_scores else "N/A"
-            summaries.append((player, games, avg))
+            player_totals = totals.get(player)
+            games = player_totals["games"] if player_totals else 0
+            avg = average(player_totals) if player_totals else None
+            summaries.append((player, games, avg if avg is not None else "N/A"))
 
         summaries.sort(key=lambda x: x[2] if isinstance(x[2], float) else float('inf'))
 
@@ -350,7 +1251,7 @@ class WordleTracker:
         lines = [header]
 
         if common_only:
-            lines.append(f"(Common puzzles only — {len(shared_puzzles)} shared)")
+            lines.append(f"(Common puzzles only — {shared_count} shared)")
 
         max_name_len = max(len(p) for p, _, _ in summaries)
         max_games_len = max(len(str(g)) for _, g, _ in summaries)
@@ -362,89 +1263,404 @@ class WordleTracker:
         return "\n".join(lines)
 
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python wordle.py <sender> <message>")
-        return
+def reaction_block(text):
+    return f"\n---Reaction---\n{text}\n---End Reaction---"
 
-    sender = sys.argv[1].split()[0]
-    message = base64.b64decode(sys.argv[2]).decode('utf-8')
-    logging.info(f"Decoded message: {message}")
 
-    tracker = WordleTracker()
-    parsed, options_list = WordleParser.parse(sender, message)
-    logging.info(f"Parsed message: {parsed}")
+def message_block(text):
+    return f"\n---Message Start---\n {text} \n---Message End---"
+
+
+def plain_block(text):
+    return f"\n---Plain Start---\n{text}\n---Plain End---"
 
-    match options_list:
-        case "option_1":
-            duplicate_wordle, output = tracker.duplicate_check(parsed)
-            if not duplicate_wordle:
-                tracker.save(parsed)
-                print("\n---Reaction---\n✅\n---End Reaction---")
-            else:
-                print("\n---Message Start---\n", output, "\n---Message End---")
 
-        case "option_2":
-            player_name, month, year = parsed
+REPLY_BLOCKS = {"reaction": reaction_block, "message": message_block, "plain": plain_block}
+
+
+def run_command(tracker, command):
+    """Answer a parsed command, returning a (kind, text) reply.
+
+    kind is "reaction", "message" or "plain", matching the blocks bot.js reads.
+    """
+    match command:
+        case ScoreCommand():
+            created, existing_score = tracker.insert_score(command)
+            if created:
+                return "reaction", "✅"
+            return "message", tracker.duplicate_message(command, existing_score)
+
+        case StatsCommand(player_name, month, year):
             output = tracker.player_stats(player_name, month, year)
 
-            print("\n---Message Start---\n", output, "\n---Message End---")
+            return "message", output
 
-        case "option_3":
+        case YearlyStatsCommand(player_name, year):
+            output = tracker.yearly_stats(player_name, year)
+
+            return "message", output
+
+        case CurrentLeaderboardCommand():
             output = tracker.current_leaderboard()
 
-            print("\n---Message Start---\n", output, "\n---Message End---")
+            return "message", output
 
-        case "option_4":
-            month, year = parsed.split()
+        case LeaderboardCommand(month, year):
             output = tracker.monthly_totals(month, year)
 
             if not output:
                 output = f"No entries found for {month} {year}."
 
-            print("\n---Message Start---\n", output, "\n---Message End---")
+            return "message", output
+
+        case YearlyLeaderboardCommand(year):
+            output = tracker.yearly_leaderboard(year)
+
+            return "message", output
 
-        case "option_5":
-            month, year, common_mode = parsed
+        case CompareAllCommand(month, year, common_mode):
             output = tracker.compare_all(month, year, common_mode)
 
-            print("\n---Message Start---\n", output, "\n---Message End---")
+            return "message", output
 
-        case "option_6":
-            players, month, year, common_mode = parsed
+        case CompareCommand(players, month, year, common_mode):
             output = tracker.head_to_head(players, month, year, common_mode)
 
-            print("\n---Message Start---\n", output, "\n---Message End---")
-
-        case "option_7":
-            output = (
-                "📋 Wordle Bot Commands\n"
-                "\n"
-                "Wordle Stats <Name> <Month> <Year>\n"
-                "  → Your scores, avg, best & failures for the month\n"
-                "\n"
-                "Wordle Leaderboard Current\n"
-                "  → Rankings from 1st of this month to today\n"
-                "\n"
-                "Wordle Leaderboard <Month> <Year>\n"
-                "  → Full month rankings\n"
-                "\n"
-                "Wordle Compare <p1> vs <p2> <Month> <Year>\n"
-                "  → Compare games played & avg score\n"
-                "\n"
-                "Wordle Compare <p1> vs <p2> <Month> <Year> Common\n"
-                "  → Compare on shared puzzles only\n"
-                "\n"
-                "Wordle Compare All <Month> <Year>\n"
-                "  → Compare all players for the month\n"
-                "\n"
-                "Wordle Compare All <Month> <Year> Common\n"
-                "  → Compare all players on shared puzzles only"
-            )
-            print("\n---Plain Start---\n" + output + "\n---Plain End---")
-
-        case _:
-            logging.info("No valid Wordle data found in the message.")
+            return "message", output
+
+        case MatrixCommand(month, year):
+            output = tracker.matrix(month, year)
+
+            return "message", output
+
+        case GreensCommand(month, year):
+            output = tracker.greens(month, year)
+
+            return "message", output
+
+        case OpenersCommand(month, year):
+            output = tracker.openers(month, year)
+
+            return "message", output
+
+        case StreakCommand(player_name):
+            output = tracker.streak(player_name)
+
+            return "message", output
+
+        case RatingsCommand():
+            output = tracker.ratings()
+
+            return "message", output
+
+        case ListCommand():
+            return "plain", COMMAND_LIST
+
+        case PerfCommand():
+            return "plain", perf_report()
+
+
+def perf_report(path=None):
+    """Reply to "Wordle Perf": p50/p95/p99 of every stage recorded so far."""
+    lines = PERF.combined(path or PERF_PATH).summary_lines()
+    if not lines:
+        return "No timings recorded yet."
+    return "\n".join(["⏱️ Stage timings (p50 / p95 / p99)"] + lines)
+
+
+def handle_message(tracker, sender, message):
+    """Run one chat message through the parser and tracker.
+
+    Pass tracker=None to connect only if the message turns out to need the
+    database. Returns the marker-delimited output bot.js scans for, or "" when
+    the message needs no reply.
+    """
+    command = WordleParser.parse(sender, message)
+    logging.info(f"Parsed message: {command}")
+
+    if command is None:
+        logging.info("No valid Wordle data found in the message.")
+        return ""
+
+    if tracker is None and command.needs_db:
+        tracker = WordleTracker()
+
+    with PERF.span(f"reply.{type(command).__name__}"):
+        kind, text = run_command(tracker, command)
+    return REPLY_BLOCKS[kind](text)
+
+
+def run_batch(lines, out, tracker=None, max_workers=BATCH_CONCURRENCY):
+    """Answer newline-delimited JSON requests, writing one JSON response per line.
+
+    Requests look like {"sender": ..., "message": ..., "id": optional} and
+    responses like {"id": ..., "reaction" | "message" | "plain": text}, with
+    {"id": ..., "error": ...} for bad requests and {"id": ...} when there is
+    nothing to say. Responses keep request order. Consecutive read-only
+    commands run concurrently on one shared tracker; a score submission waits
+    for the reads before it and runs alone, so reads see the writes before them.
+    """
+    pending = []
+
+    def flush():
+        for request_id, result in pending:
+            response = {"id": request_id}
+            if isinstance(result, Future):
+                try:
+                    result = result.result()
+                except Exception as e:
+                    logging.exception(f"Batch request {request_id} failed")
+                    result = ("error", str(e))
+            if result is not None:
+                response[result[0]] = result[1]
+            out.write(json.dumps(response, ensure_ascii=False) + "\n")
+        out.flush()
+        pending.clear()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+
+            request_id = number
+            try:
+                request = json.loads(line)
+                request_id = request.get("id", number)
+                command = WordleParser.parse(request["sender"].split()[0], request["message"])
+            except Exception as e:
+                pending.append((request_id, ("error", f"{type(e).__name__}: {e}")))
+                continue
+
+            if command is None:
+                pending.append((request_id, None))
+                continue
+
+            if tracker is None and command.needs_db:
+                tracker = WordleTracker()
+
+            if isinstance(command, ScoreCommand):
+                flush()
+                pending.append((request_id, pool.submit(run_command, tracker, command)))
+                flush()
+            else:
+                pending.append((request_id, pool.submit(run_command, tracker, command)))
+                if len(pending) >= max_workers * 4:
+                    flush()
+
+        flush()
+
+
+class WordleRequestHandler(socketserver.StreamRequestHandler):
+    """Reads one JSON request line and writes back the handle_message output."""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            logging.info(f"Daemon request from {request['sender']}")
+            output = handle_message(self.server.tracker, request["sender"], request["message"])
+            if self.server.tracker.cache is not None:
+                logging.info(f"Reply cache: {self.server.tracker.cache.stats()}")
+        except Exception:
+            logging.exception("Failed handling daemon request")
+            output = ""
+        self.wfile.write(output.encode("utf-8"))
+        if self.server.perf_path is not None:
+            flush_perf(self.server.perf_path)
+
+
+class WordleServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Resident process holding one WordleTracker for every incoming message."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, tracker, perf_path=None):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.tracker = tracker
+        # Timings are merged into this file after every request (None keeps them in memory)
+        self.perf_path = perf_path
+        super().__init__(socket_path, WordleRequestHandler)
+
+
+def serve(socket_path=SOCKET_PATH):
+    # Other processes count their writes from now on
+    open(CHANGES_PATH, "a").close()
+    server = WordleServer(socket_path, WordleTracker(), perf_path=PERF_PATH)
+    logging.info(f"Serving Wordle requests on {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+        server.tracker.close()
+
+
+# A WhatsApp export starts every message with a header line; following lines
+# without one (e.g. the emoji grid) continue the previous message.
+#   Android: "3/23/26, 9:15 AM - Alice: Wordle 1,738 4/6"
+#   iOS:     "[23/03/2026, 09:15:02] Alice: Wordle 1,738 4/6"
+# Headers without "<sender>: " are system notices such as "Alice joined".
+CHAT_HEADER_RE = re.compile(
+    r"(?:\[(\d{1,2}[./]\d{1,2}[./]\d{2,4}),? (\d{1,2}:\d{2}(?::\d{2})?)(?:\s?[APap]\.?[Mm]\.?)?\] "
+    r"|(\d{1,2}[./]\d{1,2}[./]\d{2,4}),? (\d{1,2}:\d{2}(?::\d{2})?)(?:\s?[APap]\.?[Mm]\.?)? - )"
+    r"(?:([^:]+): )?(.*)"
+)
+
+
+def iter_chat_export(lines):
+    """Yield (sender, message) pairs from the lines of a WhatsApp chat export."""
+    sender, message_lines = None, []
+    for line in lines:
+        line = line.rstrip("\r\n").lstrip("\u200e")
+        header = CHAT_HEADER_RE.match(line)
+        if header is None:
+            if message_lines:
+                message_lines.append(line)
+            continue
+
+        if sender is not None:
+            yield sender, "\n".join(message_lines)
+        sender = header.group(5)
+        message_lines = [header.group(6)] if sender is not None else []
+
+    if sender is not None:
+        yield sender, "\n".join(message_lines)
+
+
+def import_chat_export(tracker, path):
+    """Load every score post in a chat export; the first post per player and puzzle wins.
+
+    The file is streamed, dates are resolved offline, and the deduplicated
+    scores are written through WordleTracker.import_scores in batches.
+    Returns (scores found, entries created).
+    """
+    scores = {}
+    with open(path, encoding="utf-8-sig") as f:
+        for sender, message in iter_chat_export(f):
+            if not message.startswith("Wordle"):
+                continue
+            try:
+                command = WordleParser.parse(sender.split()[0], message)
+            except RuntimeError as e:
+                logging.info(f"Skipping post from {sender}: {e}")
+                continue
+            if isinstance(command, ScoreCommand):
+                scores.setdefault((command.puzzle, command.player), command)
+
+    created = tracker.import_scores(list(scores.values())) if scores else 0
+    return len(scores), created
+
+
+def send_to_daemon(sender, message, socket_path=SOCKET_PATH):
+    """Forward a message to a running daemon.
+
+    Returns None if no daemon could be reached, so the caller handles the
+    message itself. Once connected the message may already be handled, so a
+    later failure (a timeout waiting for the reply) is logged and answered
+    with "" rather than handled a second time.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(DAEMON_TIMEOUT)
+        try:
+            client.connect(socket_path)
+        except OSError as e:
+            # Missing socket, nothing listening, or no permission to connect
+            if not isinstance(e, (FileNotFoundError, ConnectionRefusedError)):
+                logging.warning(f"Could not reach daemon at {socket_path} ({e!r}), handling the message here")
+            return None
+
+        try:
+            request = json.dumps({"sender": sender, "message": message}) + "\n"
+            client.sendall(request.encode("utf-8"))
+            client.shutdown(socket.SHUT_WR)
+
+            chunks = []
+            while chunk := client.recv(65536):
+                chunks.append(chunk)
+        except OSError as e:
+            logging.error(f"Daemon at {socket_path} failed after the message was sent ({e!r}), not retrying it")
+            return ""
+    return b"".join(chunks).decode("utf-8")
+
+
+def flush_perf(path=PERF_PATH):
+    """Merge this process's timings into the shared perf file; never fails the reply."""
+    try:
+        PERF.flush(path)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not write timings to {path}: {e}")
+
+
+def main():
+    # The daemon records and flushes per request; its lifetime is not one call
+    if len(sys.argv) == 2 and sys.argv[1] == "--serve":
+        serve()
+        return
+
+    try:
+        with PERF.span("main"):
+            run_cli()
+    finally:
+        flush_perf()
+
+
+def run_cli():
+    if len(sys.argv) == 3 and sys.argv[1] == "--perf-report":
+        combined = PERF.combined()
+        if sys.argv[2] == "prometheus":
+            print(combined.prometheus(), end="")
+        else:
+            print(json.dumps(combined.report(), indent=2))
+        return
+
+    if len(sys.argv) == 4 and sys.argv[1] == "--prefetch-calendar":
+        start, end = (datetime.date.fromisoformat(d) for d in sys.argv[2:])
+        added = PuzzleCalendar.shared().prefetch(start, end)
+        print(f"Prefetched {added} puzzles into {CALENDAR_PATH}")
+        return
+
+    if len(sys.argv) == 4 and sys.argv[1] == "--rebuild-rollups":
+        month, year = sys.argv[2].capitalize(), sys.argv[3]
+        mismatched = WordleTracker().rebuild_rollups(month, year)
+        print(f"Rebuilt rollups for {month} {year}; out of date before rebuild: {', '.join(mismatched) or 'none'}")
+        return
+
+    if len(sys.argv) == 2 and sys.argv[1] == "--rebuild-rollups":
+        mismatched = WordleTracker().rebuild_all_rollups()
+        for (month, year), players in mismatched.items():
+            print(f"Rebuilt rollups for {month} {year}; out of date before rebuild: {', '.join(players) or 'none'}")
+        print(f"Rebuilt rollups for {len(mismatched)} months")
+        return
+
+    if len(sys.argv) == 2 and sys.argv[1] == "--rebuild-ratings":
+        players = WordleTracker().rebuild_ratings()
+        print(f"Rebuilt streaks and ratings for {players} players")
+        return
+
+    if len(sys.argv) == 3 and sys.argv[1] == "--import-chat":
+        logging.getLogger().setLevel(logging.WARNING)
+        found, created = import_chat_export(WordleTracker(), sys.argv[2])
+        print(f"Imported {created} new scores ({found - created} already recorded) from {sys.argv[2]}")
+        return
+
+    if len(sys.argv) == 2 and sys.argv[1] == "--batch":
+        run_batch(sys.stdin, sys.stdout)
+        return
+
+    if len(sys.argv) != 3:
+        print("Usage: python wordle.py <sender> <message>")
+        return
+
+    sender = sys.argv[1].split()[0]
+    message = base64.b64decode(sys.argv[2]).decode('utf-8')
+    logging.info(f"Decoded message: {message}")
+
+    output = send_to_daemon(sender, message)
+    if output is None:
+        output = handle_message(None, sender, message)
+
+    if output:
+        print(output)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,420 @@
+"""In-memory stand-in for the Firestore client, for benchmarks and tests.
+
+MemoryFirestore implements the part of the google-cloud-firestore API that
+FirestoreStore uses, and evaluates it for real instead of returning canned
+documents:
+
+    db.collection(name).document(id).get(field_paths=None)
+    db.collection(name).where(filter=FieldFilter(field, op, value)).select(fields).stream()
+    db.get_all(refs, field_paths=None)
+    db.batch() with create() / set(merge=...) / delete() / commit()
+    db.transaction(), run by firestore.transactional, with reads passing transaction=
+
+Filters support ==, !=, <, <=, >, >=, in, not-in and array-contains, with
+Firestore's rules that a document missing the field never matches and range
+filters only match values of the same type. Results come back in document id
+order. set(merge=True) merges nested maps and applies Increment transforms.
+A batch is atomic: a create() of an existing document raises AlreadyExists
+before anything is written.
+
+Transactions are optimistic: every document and query result read in one is
+remembered with the version it had, and the commit raises Aborted (which
+firestore.transactional retries) if any of them has changed since, including
+a query that would now match a different set of documents.
+
+Like Firestore, a query costs what it returns rather than the size of the
+collection: the first == filter on a top-level field is answered from an
+index (built on first use, then kept up to date by writes) and only those
+documents are checked against the other filters.
+
+Every document returned counts as one read (a query that matches nothing
+and a lookup of a missing document count one as well, as Firestore bills
+them), and reads, bytes, writes and round trips are tallied in counters().
+latency adds a sleep per round trip to model the network.
+
+The Firestore libraries are only imported for AlreadyExists, Aborted and
+Increment, when a batch is committed.
+"""
+
+import time
+import itertools
+import threading
+
+from wordle_perf import document_size
+
+# Type classes range filters compare within (bool is checked before numbers)
+_TYPE_CLASSES = ((bool, "bool"), ((int, float), "number"), (str, "string"), (bytes, "bytes"))
+
+
+def _copy(value):
+    """Copy of a JSON-like value, with tuples stored as arrays."""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _type_class(value):
+    for types, name in _TYPE_CLASSES:
+        if isinstance(value, types):
+            return name
+    return None
+
+
+def _index_key(value):
+    """Hashable index key for an equality value, or None if it can't be indexed."""
+    type_class = _type_class(value)
+    if type_class is None:
+        return None
+    return type_class, value
+
+
+def _lookup(data, path):
+    """(found, value) for a dotted field path."""
+    for part in path.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return False, None
+        data = data[part]
+    return True, data
+
+
+def _project(data, paths):
+    """Only the given (possibly dotted) field paths of data."""
+    projected = {}
+    for path in paths:
+        found, value = _lookup(data, path)
+        if not found:
+            continue
+        target = projected
+        *parents, last = path.split(".")
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[last] = _copy(value)
+    return projected
+
+
+def _matches(data, field, op, value):
+    found, actual = _lookup(data, field)
+    if not found:
+        return False
+    if op == "==":
+        return actual == value and _type_class(actual) == _type_class(value)
+    if op == "!=":
+        return actual != value
+    if op == "in":
+        return actual in value
+    if op == "not-in":
+        return actual not in value
+    if op == "array-contains":
+        return isinstance(actual, list) and value in actual
+    if _type_class(actual) is None or _type_class(actual) != _type_class(value):
+        return False
+    if op == "<":
+        return actual < value
+    if op == "<=":
+        return actual <= value
+    if op == ">":
+        return actual > value
+    if op == ">=":
+        return actual >= value
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+
+class DocumentReference:
+    def __init__(self, client, collection, document_id):
+        self._client = client
+        self.id = document_id
+        self.path = f"{collection}/{document_id}"
+        self.collection_id = collection
+
+    def get(self, field_paths=None, transaction=None):
+        return self._client._get([self], field_paths, transaction)[0]
+
+    def set(self, data, merge=False):
+        batch = self._client.batch()
+        batch.set(self, data, merge=merge)
+        batch.commit()
+
+    def create(self, data):
+        batch = self._client.batch()
+        batch.create(self, data)
+        batch.commit()
+
+    def delete(self):
+        batch = self._client.batch()
+        batch.delete(self)
+        batch.commit()
+
+
+class Query:
+    def __init__(self, client, collection, filters=(), fields=None):
+        self._client = client
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._fields = fields
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return Query(self._client, self._collection, self._filters + ((field_path, op_string, value),),
+                     self._fields)
+
+    def select(self, field_paths):
+        return Query(self._client, self._collection, self._filters, list(field_paths))
+
+    def stream(self, transaction=None):
+        return iter(self._client._run_query(self._collection, self._filters, self._fields, transaction))
+
+    def get(self):
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    def __init__(self, client, name):
+        super().__init__(client, name)
+        self.id = name
+
+    def document(self, document_id):
+        return DocumentReference(self._client, self._collection, document_id)
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []  # (op, reference, data, merge)
+
+    def create(self, reference, data):
+        self._writes.append(("create", reference, data, False))
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(("set", reference, data, merge))
+
+    def delete(self, reference):
+        self._writes.append(("delete", reference, None, False))
+
+    def commit(self):
+        self._client._commit(self._writes)
+        self._writes = []
+
+
+_TRANSACTION_IDS = itertools.count(1)
+
+
+class Transaction(WriteBatch):
+    """The private methods firestore.transactional drives, plus get() and get_all()."""
+
+    def __init__(self, client, max_attempts=5, read_only=False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._reads = []  # ("doc", collection, id, version) or ("query", collection, filters, matches)
+
+    def _clean_up(self):
+        self._writes = []
+        self._reads = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._client._round_trip()
+        self._id = next(_TRANSACTION_IDS)
+
+    def _rollback(self):
+        self._clean_up()
+
+    def _commit(self):
+        try:
+            self._client._commit(self._writes, self._reads)
+        finally:
+            self._clean_up()
+
+    def get(self, ref_or_query):
+        if isinstance(ref_or_query, DocumentReference):
+            return iter(self._client._get([ref_or_query], None, self))
+        return ref_or_query.stream(transaction=self)
+
+    def get_all(self, references):
+        return self._client.get_all(references, transaction=self)
+
+
+class MemoryFirestore:
+    """A Firestore client whose collections live in dicts: {collection: {id: data}}."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.collections = {}
+        # {(collection, id): number of writes}, checked when a transaction commits
+        self._versions = {}
+        # {collection: {field: {index key: set of document ids}}}
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.reads = 0
+        self.bytes_read = 0
+        self.writes = 0
+        self.round_trips = 0
+
+    def counters(self):
+        return {"reads": self.reads, "bytes_read": self.bytes_read, "writes": self.writes,
+                "round_trips": self.round_trips}
+
+    def collection(self, name):
+        return CollectionReference(self, name)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def transaction(self, max_attempts=5, read_only=False):
+        return Transaction(self, max_attempts, read_only)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        return self._get(list(references), field_paths, transaction)
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read(self, reference, data, fields):
+        if data is not None:
+            data = _project(data, fields) if fields is not None else _copy(data)
+            self.bytes_read += document_size(data)
+        self.reads += 1
+        return DocumentSnapshot(reference, data)
+
+    def _get(self, references, fields, transaction=None):
+        self._round_trip()
+        with self._lock:
+            if transaction is not None:
+                transaction._reads.extend(("doc", ref.collection_id, ref.id,
+                                           self._versions.get((ref.collection_id, ref.id), 0))
+                                          for ref in references)
+            return [self._read(ref, self.collections.get(ref.collection_id, {}).get(ref.id), fields)
+                    for ref in references]
+
+    def _index(self, collection, field):
+        indexes = self._indexes.setdefault(collection, {})
+        index = indexes.get(field)
+        if index is None:
+            index = indexes[field] = {}
+            for document_id, data in self.collections.get(collection, {}).items():
+                self._index_add(index, field, document_id, data)
+        return index
+
+    @staticmethod
+    def _index_add(index, field, document_id, data):
+        key = _index_key(data.get(field))
+        if key is not None:
+            index.setdefault(key, set()).add(document_id)
+
+    def _reindex(self, collection, document_id, old, new):
+        for field, index in self._indexes.get(collection, {}).items():
+            if old is not None:
+                key = _index_key(old.get(field))
+                if key is not None:
+                    index.get(key, set()).discard(document_id)
+            if new is not None:
+                self._index_add(index, field, document_id, new)
+
+    def _candidates(self, collection, filters):
+        """Document ids worth checking: from the first indexable == filter, else all."""
+        for field, op, value in filters:
+            if op == "==" and "." not in field and _index_key(value) is not None:
+                return sorted(self._index(collection, field).get(_index_key(value), ()))
+        return sorted(self.collections.get(collection, {}))
+
+    def _matching(self, collection, filters):
+        """Ids of the documents matching filters, with their versions (lock held)."""
+        documents = self.collections.get(collection, {})
+        return [(document_id, self._versions.get((collection, document_id), 0))
+                for document_id in self._candidates(collection, filters)
+                if all(_matches(documents[document_id], *condition) for condition in filters)]
+
+    def _run_query(self, collection, filters, fields, transaction=None):
+        self._round_trip()
+        with self._lock:
+            documents = self.collections.get(collection, {})
+            matches = self._matching(collection, filters)
+            if transaction is not None:
+                transaction._reads.append(("query", collection, filters, matches))
+            snapshots = [self._read(DocumentReference(self, collection, document_id), documents[document_id], fields)
+                         for document_id, _ in matches]
+            if not snapshots:
+                self.reads += 1
+        return snapshots
+
+    def _changed(self, reads):
+        """Whether anything a transaction read has been written since (lock held)."""
+        for kind, collection, key, seen in reads:
+            if kind == "doc":
+                if self._versions.get((collection, key), 0) != seen:
+                    return True
+            elif self._matching(collection, key) != seen:
+                return True
+        return False
+
+    def _commit(self, writes, reads=()):
+        from google.api_core.exceptions import AlreadyExists, Aborted
+
+        self._round_trip()
+        with self._lock:
+            if self._changed(reads):
+                raise Aborted("Transaction aborted: documents it read have changed")
+            for op, ref, _, _ in writes:
+                if op == "create" and ref.id in self.collections.get(ref.collection_id, {}):
+                    raise AlreadyExists(f"Document already exists: {ref.path}")
+
+            for op, ref, data, merge in writes:
+                documents = self.collections.setdefault(ref.collection_id, {})
+                old = documents.get(ref.id)
+                indexed = self._indexes.get(ref.collection_id)
+                if indexed and old is not None:
+                    # Merges change the document in place, so unindex a copy of its fields
+                    old = {field: old.get(field) for field in indexed}
+                if op == "delete":
+                    documents.pop(ref.id, None)
+                elif merge and ref.id in documents:
+                    _merge(documents[ref.id], data)
+                else:
+                    documents[ref.id] = _resolve(None, data)
+                if indexed:
+                    self._reindex(ref.collection_id, ref.id, old, documents.get(ref.id))
+                self._versions[(ref.collection_id, ref.id)] = self._versions.get((ref.collection_id, ref.id), 0) + 1
+                self.writes += 1
+
+
+def _is_increment(value):
+    from google.cloud.firestore_v1.transforms import Increment
+
+    return isinstance(value, Increment)
+
+
+def _resolve(current, value):
+    """value as written over current, with Increment transforms applied."""
+    if isinstance(value, dict):
+        return {key: _resolve(None, item) for key, item in value.items()}
+    if _is_increment(value):
+        return (current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0) + value.value
+    return _copy(value)
+
+
+def _merge(target, data):
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = _resolve(target.get(key), value)
@@ -0,0 +1,108 @@
+"""Packed emoji grids and the analytics built on them.
+
+Each guess row of a shared result is stored as one integer: five tiles of
+two bits each, tile i in bits 2i and 2i+1, with 0 for absent (⬛/⬜),
+1 for present (🟨, or 🟦 in high contrast) and 2 for correct (🟩/🟧). A
+row fits in 10 bits, so a grid is at most six small ints (two bytes a row
+in SQLite).
+
+Because present sets only the low bit of its pair and correct only the
+high bit, a row's greens are the set bits of row & GREEN_BITS and its
+yellows those of row & YELLOW_BITS. The analytics turn those counts into
+1024-entry lookup tables and sum them over arrays of packed rows, so no
+emoji strings are touched after parsing.
+"""
+
+import sys
+from array import array
+
+TILES_PER_ROW = 5
+ABSENT, PRESENT, CORRECT = 0, 1, 2
+
+GREEN_BITS = 0b1010101010
+YELLOW_BITS = 0b0101010101
+
+# Emoji -> base-4 digit; the variation selector some clients append is dropped
+_TILE_DIGITS = str.maketrans({"⬛": "0", "⬜": "0", "🟨": "1", "🟦": "1", "🟩": "2", "🟧": "2", "\ufe0f": None})
+
+# Tile counts for every possible row code
+GREEN_COUNTS = bytes((code & GREEN_BITS).bit_count() for code in range(1 << (2 * TILES_PER_ROW)))
+YELLOW_COUNTS = bytes((code & YELLOW_BITS).bit_count() for code in range(1 << (2 * TILES_PER_ROW)))
+
+SOLVED_ROW = int(str(CORRECT) * TILES_PER_ROW, 4)
+
+
+def parse_grid(text):
+    """Packed rows of the first block of tile lines in text, or None if there is none."""
+    rows = []
+    for line in text.split("\n"):
+        digits = line.strip().translate(_TILE_DIGITS)
+        if len(digits) == TILES_PER_ROW and not digits.strip("012"):
+            # Tile 0 is the least significant pair, so read the row backwards
+            rows.append(int(digits[::-1], 4))
+        elif rows:
+            break
+    return tuple(rows) if rows else None
+
+
+def render_row(row):
+    """Emoji string for a packed row (for replies and debugging)."""
+    return "".join("⬛🟨🟩"[(row >> (2 * i)) & 0b11] for i in range(TILES_PER_ROW))
+
+
+def pack_bytes(rows):
+    """Two little-endian bytes per row, for SQLite BLOB columns."""
+    if rows is None:
+        return None
+    packed = array("H", rows)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_bytes(blob):
+    if blob is None:
+        return None
+    rows = array("H")
+    rows.frombytes(blob)
+    if sys.byteorder == "big":
+        rows.byteswap()
+    return tuple(rows)
+
+
+def rows_by_guess(grids):
+    """Packed rows regrouped per guess number: [array of first guesses, second guesses, ...]."""
+    columns = []
+    for grid in grids:
+        for guess, row in enumerate(grid):
+            if guess == len(columns):
+                columns.append(array("H"))
+            columns[guess].append(row)
+    return columns
+
+
+def tile_averages(rows):
+    """(average greens, average yellows) over an array of packed rows."""
+    if not rows:
+        return 0.0, 0.0
+    return (sum(map(GREEN_COUNTS.__getitem__, rows)) / len(rows),
+            sum(map(YELLOW_COUNTS.__getitem__, rows)) / len(rows))
+
+
+def greens_by_guess(grids):
+    """[(guess number, rows, average greens, average yellows)] over many grids."""
+    return [(guess, len(rows), *tile_averages(rows))
+            for guess, rows in enumerate(rows_by_guess(grids), start=1)]
+
+
+def opener_luck(grids_by_player):
+    """[(player, openers, average greens, average yellows)] for first guesses, luckiest first.
+
+    Luck is the average number of greens on the opening guess, then yellows.
+    """
+    results = []
+    for player, grids in grids_by_player.items():
+        openers = array("H", (grid[0] for grid in grids if grid))
+        if openers:
+            results.append((player, len(openers), *tile_averages(openers)))
+    return sorted(results, key=lambda item: (item[2], item[3]), reverse=True)
@@ -0,0 +1,144 @@
+"""Client for the NYT Wordle puzzle endpoint ({base}/{YYYY-MM-DD}.json).
+
+One NYTClient keeps a pooled keep-alive requests.Session, so repeat lookups
+reuse the TCP/TLS connection. Every request has separate connect and read
+timeouts. Connection errors and 429/5xx responses are retried a bounded
+number of times with exponential backoff, honouring Retry-After. Responses
+that carried an ETag or Last-Modified are revalidated with If-None-Match /
+If-Modified-Since on the next fetch of the same day, and a 304 returns the
+remembered body.
+
+requests is imported when the first request is made, not with this module.
+Point WORDLE_NYT_URL at a local stub server to run without the network.
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from wordle_perf import timed, count_read
+
+NYT_BASE_URL = os.environ.get("WORDLE_NYT_URL", "https://www.nytimes.com/svc/wordle/v2")
+
+# (connect, read) seconds
+NYT_TIMEOUT = (3.05, 5)
+
+# Retries after the first attempt; sleeps are backoff * 2**n seconds, capped
+NYT_RETRIES = 3
+NYT_BACKOFF = 0.5
+NYT_BACKOFF_MAX = 4
+
+# Keep-alive connections kept open, and parallel fetches in fetch_range()
+NYT_POOL_SIZE = 8
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class NYTClient:
+    """Pooled, retrying, revalidating fetcher for daily puzzle data."""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, base_url=NYT_BASE_URL, timeout=NYT_TIMEOUT, retries=NYT_RETRIES,
+                 backoff=NYT_BACKOFF, pool_size=NYT_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+        self._validated = {}  # url -> (etag, last_modified, data)
+
+    @classmethod
+    def shared(cls):
+        """Process-wide client for NYT_BASE_URL."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                retry = Retry(
+                    total=self.retries,
+                    backoff_factor=self.backoff,
+                    backoff_max=NYT_BACKOFF_MAX,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=("GET",),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["Accept"] = "application/json"
+                self._session = session
+            return self._session
+
+    def url(self, date):
+        return f"{self.base_url}/{date:%Y-%m-%d}.json"
+
+    @timed("nyt.fetch")
+    def fetch(self, date):
+        """Puzzle data for a date as a dict ({} if NYT has none). Raises RuntimeError on failure."""
+        url = self.url(date)
+        headers = {}
+        validated = self._validated.get(url)
+        if validated is not None:
+            etag, last_modified, _ = validated
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        try:
+            response = self._get_session().get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and validated is not None:
+                logging.debug(f"NYT data for {date} not modified")
+                return validated[2]
+            if response.status_code == 404:
+                return {}
+            response.raise_for_status()
+            data = count_read(response.json(), len(response.content))
+        except Exception as e:
+            raise RuntimeError(f"Failed fetching Wordle data: {e}")
+
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._validated[url] = (etag, last_modified, data)
+        return data
+
+    def fetch_range(self, dates, max_workers=None):
+        """{date: data} for many dates, fetched concurrently over the pooled connections.
+
+        Dates whose fetch failed after retries map to None (and are logged).
+        """
+        dates = list(dates)
+        if not dates:
+            return {}
+
+        def fetch_or_none(date):
+            try:
+                return self.fetch(date)
+            except RuntimeError as e:
+                logging.warning(f"Skipping {date}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.pool_size,
+                                thread_name_prefix="nyt-fetch") as pool:
+            return dict(zip(dates, pool.map(fetch_or_none, dates)))
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
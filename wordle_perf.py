@@ -0,0 +1,334 @@
+"""Per-stage latency, document and byte histograms for the bot's hot paths.
+
+Instrumented code opens a span per stage (parse, nyt.lookup, tracker.<method>,
+store.<method>, ...):
+
+    with PERF.span("store.open"):
+        ...
+
+    @timed("parse")
+    def parse(...): ...
+
+Each finished span records its wall time and the documents and bytes read
+while it was open (count_read() adds to every open span of the current
+context, so a tracker method includes the reads of its store calls).
+
+Values land in log-linear histograms: four buckets per doubling, sparse, so a
+stage costs a few hundred bytes and a recording is one dict increment.
+Quantiles are read back from the bucket bounds (within about 19%).
+
+Every bot invocation is its own process, so flush() merges this process's
+histograms into a JSON file (WORDLE_PERF_FILE) under a file lock and starts
+over; report(), prometheus() and summary_lines() read that file plus whatever
+is still in memory. WORDLE_PERF=0 switches recording off entirely.
+"""
+
+import os
+import json
+import math
+import time
+import functools
+import threading
+import contextvars
+
+PERF_ENABLED = os.environ.get("WORDLE_PERF", "1") != "0"
+PERF_PATH = os.environ.get("WORDLE_PERF_FILE", "wordle_perf.json")
+
+BUCKETS_PER_DOUBLING = 4
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Metrics kept per stage; time is recorded in microseconds
+METRICS = ("micros", "docs", "bytes")
+
+# (docs, bytes) accumulators of the spans open in the current context
+_open_spans = contextvars.ContextVar("wordle_perf_spans", default=())
+
+
+class Histogram:
+    """Sparse log-linear histogram of non-negative values.
+
+    Bucket 0 holds values below 1; bucket i >= 1 holds values up to
+    2 ** (i / BUCKETS_PER_DOUBLING).
+    """
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def bucket(value):
+        if value < 1:
+            return 0
+        return max(1, math.ceil(math.log2(value) * BUCKETS_PER_DOUBLING))
+
+    @staticmethod
+    def upper_bound(bucket):
+        return 2 ** (bucket / BUCKETS_PER_DOUBLING) if bucket else 1
+
+    def add(self, value):
+        bucket = self.bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th value (capped at the maximum seen)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.upper_bound(bucket), self.max)
+        return self.max
+
+    def merge(self, other):
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {"buckets": {str(b): n for b, n in self.buckets.items()},
+                "count": self.count, "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.buckets = {int(b): n for b, n in data["buckets"].items()}
+        histogram.count, histogram.total, histogram.max = data["count"], data["total"], data["max"]
+        return histogram
+
+
+class _Span:
+    __slots__ = ("recorder", "stage", "start", "reads", "token")
+
+    def __init__(self, recorder, stage):
+        self.recorder = recorder
+        self.stage = stage
+
+    def __enter__(self):
+        self.reads = [0, 0]
+        self.token = _open_spans.set(_open_spans.get() + (self.reads,))
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _open_spans.reset(self.token)
+        self.recorder.record(self.stage, elapsed, *self.reads)
+        return False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class PerfRecorder:
+    """Histograms of {stage: {metric: Histogram}} for one process."""
+
+    def __init__(self, enabled=PERF_ENABLED):
+        self.enabled = enabled
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage):
+        return _Span(self, stage) if self.enabled else _NULL_SPAN
+
+    def record(self, stage, seconds, docs=0, nbytes=0):
+        with self._lock:
+            histograms = self.stages.get(stage)
+            if histograms is None:
+                histograms = self.stages[stage] = {metric: Histogram() for metric in METRICS}
+            histograms["micros"].add(seconds * 1e6)
+            histograms["docs"].add(docs)
+            histograms["bytes"].add(nbytes)
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+
+    def merge(self, stages):
+        """Add serialised {stage: {metric: histogram dict}} into this recorder."""
+        with self._lock:
+            for stage, metrics in stages.items():
+                histograms = self.stages.setdefault(stage, {metric: Histogram() for metric in METRICS})
+                for metric, data in metrics.items():
+                    histograms[metric].merge(Histogram.from_dict(data))
+
+    def to_dict(self):
+        with self._lock:
+            return {stage: {metric: histogram.to_dict() for metric, histogram in histograms.items()}
+                    for stage, histograms in self.stages.items()}
+
+    def flush(self, path=PERF_PATH):
+        """Merge this process's histograms into the file at path and start over."""
+        import fcntl
+
+        if not self.enabled:
+            return
+        with self._lock:
+            taken, self.stages = self.stages, {}
+        if not taken:
+            return
+        snapshot = {stage: {metric: histogram.to_dict() for metric, histogram in histograms.items()}
+                    for stage, histograms in taken.items()}
+        try:
+            with open(path, "a+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                text = f.read()
+                combined = PerfRecorder(enabled=True)
+                if text:
+                    combined.merge(json.loads(text))
+                combined.merge(snapshot)
+                f.seek(0)
+                f.truncate()
+                json.dump(combined.to_dict(), f)
+        except BaseException:
+            # Samples recorded while the file was being written stay put; the snapshot rejoins them.
+            self.merge(snapshot)
+            raise
+
+    def combined(self, path=PERF_PATH):
+        """A recorder holding the file at path plus what this process has not flushed."""
+        combined = PerfRecorder(enabled=True)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            text = ""
+        if text:
+            combined.merge(json.loads(text))
+        combined.merge(self.to_dict())
+        return combined
+
+    def report(self):
+        """{stage: {metric: {count, mean, max, p50, p95, p99}}}, time in milliseconds."""
+        report = {}
+        with self._lock:
+            for stage, histograms in sorted(self.stages.items()):
+                report[stage] = {}
+                for metric, histogram in histograms.items():
+                    scale = 1e-3 if metric == "micros" else 1
+                    name = "ms" if metric == "micros" else metric
+                    report[stage][name] = {
+                        "count": histogram.count,
+                        "mean": histogram.total / histogram.count * scale if histogram.count else None,
+                        "max": histogram.max * scale,
+                        **{f"p{round(q * 100)}": histogram.quantile(q) * scale if histogram.count else None
+                           for q in QUANTILES},
+                    }
+        return report
+
+    def prometheus(self):
+        """Prometheus text exposition: one summary per metric, labelled by stage."""
+        families = (("micros", "wordle_stage_seconds", 1e-6, "Wall time per call"),
+                    ("docs", "wordle_stage_documents", 1, "Documents read per call"),
+                    ("bytes", "wordle_stage_bytes", 1, "Bytes read per call"))
+        lines = []
+        with self._lock:
+            for metric, family, scale, help_text in families:
+                lines.append(f"# HELP {family} {help_text}")
+                lines.append(f"# TYPE {family} summary")
+                for stage, histograms in sorted(self.stages.items()):
+                    histogram = histograms[metric]
+                    for q in QUANTILES:
+                        value = histogram.quantile(q)
+                        if value is not None:
+                            lines.append(f'{family}{{stage="{stage}",quantile="{q}"}} {value * scale:.6g}')
+                    lines.append(f'{family}_sum{{stage="{stage}"}} {histogram.total * scale:.6g}')
+                    lines.append(f'{family}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def summary_lines(self):
+        """One line per stage with p50/p95/p99 latency and p95 reads, slowest total first."""
+        report = self.report()
+        totals = {stage: self.stages[stage]["micros"].total for stage in report}
+        lines = []
+        for stage in sorted(report, key=totals.get, reverse=True):
+            ms, docs, nbytes = report[stage]["ms"], report[stage]["docs"], report[stage]["bytes"]
+            line = f"{stage}: n={ms['count']} p50 {ms['p50']:.1f} / p95 {ms['p95']:.1f} / p99 {ms['p99']:.1f} ms"
+            if docs["max"]:
+                line += f" | docs p95 {docs['p95']:.0f} | {nbytes['p95'] / 1024:.1f} KB p95"
+            lines.append(line)
+        return lines
+
+
+PERF = PerfRecorder()
+
+
+def timed(stage):
+    """Decorator recording each call of the function as a span of stage."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not PERF.enabled:
+                return function(*args, **kwargs)
+            with PERF.span(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def instrument(prefix):
+    """Class decorator timing every public method as stage "<prefix>.<name>"."""
+    def decorate(cls):
+        for name, attribute in list(vars(cls).items()):
+            if name.startswith("_"):
+                continue
+            if isinstance(attribute, staticmethod):
+                setattr(cls, name, staticmethod(timed(f"{prefix}.{name}")(attribute.__func__)))
+            elif isinstance(attribute, classmethod):
+                setattr(cls, name, classmethod(timed(f"{prefix}.{name}")(attribute.__func__)))
+            elif callable(attribute):
+                setattr(cls, name, timed(f"{prefix}.{name}")(attribute))
+        return cls
+    return decorate
+
+
+def document_size(value):
+    """Approximate Firestore storage size of a decoded value, in bytes.
+
+    Strings are their UTF-8 length plus one, numbers eight bytes, booleans and
+    nulls one, maps the sizes of their keys and values, and arrays their values.
+    """
+    if isinstance(value, dict):
+        return sum(len(key.encode()) + 1 + document_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(document_size(item) for item in value)
+    if isinstance(value, str):
+        return len(value.encode()) + 1
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if value is None or isinstance(value, bool):
+        return 1
+    return 8
+
+
+def count_read(data, nbytes=None):
+    """Count one document read (data as decoded) against every open span; returns data."""
+    spans = _open_spans.get()
+    if spans:
+        if nbytes is None:
+            nbytes = document_size(data)
+        for reads in spans:
+            reads[0] += 1
+            reads[1] += nbytes
+    return data
@@ -0,0 +1,243 @@
+"""Write-behind queue for score submissions.
+
+SubmissionQueue acknowledges a score once it has passed the local dedupe
+index and been appended (and fsynced) to a journal file, and commits the
+journal to the store later, in batches:
+
+    queue = SubmissionQueue(store).start()
+    created, existing_score = queue.submit(entry)   # no store write here
+    queue.flush()                                   # before reading the store
+
+The dedupe index maps (puzzle, player) to the score for every puzzle
+submitted to since start: it is loaded from the store once per puzzle and
+then kept up to date by the journal. With a SeenIndex the store is only
+asked about the one key, and only when the index cannot rule it out. A flush
+reads the journal and hands up to FLUSH_BATCH entries at a time to
+store.insert_entries(), which works out opponents, pairwise totals and
+player states in the same transaction as the writes. Entry
+ids are "{puzzle}_{player}", so committing the same journal twice (after a
+crash, or two processes flushing at once) finds the entries already stored
+and only drops them from the journal.
+
+The journal is shared by every process using the same path: appends,
+catch-up reads and compaction happen under a lock file next to it, and start()
+replays whatever an earlier process left behind. In the resident daemon a
+background thread flushes FLUSH_INTERVAL after the first queued score;
+one-shot processes flush at exit.
+"""
+
+import os
+import json
+import atexit
+import logging
+import threading
+import contextlib
+
+from wordle_storage import Entry
+from wordle_ratings import apply_entry
+
+JOURNAL_PATH = os.environ.get("WORDLE_JOURNAL", "wordle_journal.jsonl")
+
+# Seconds the flusher waits after a submission so a burst shares one commit
+FLUSH_INTERVAL = 0.2
+
+# Entries per commit: their creates, a write per month and day touched and the
+# changed player states stay well under FIRESTORE_BATCH_LIMIT
+FLUSH_BATCH = 100
+
+# Puzzles kept in the dedupe index (oldest dropped first)
+KNOWN_PUZZLES = 7
+
+
+class SubmissionQueue:
+    """Journaled score submissions in front of a storage backend."""
+
+    def __init__(self, store, path=JOURNAL_PATH, flush_interval=FLUSH_INTERVAL, batch_size=FLUSH_BATCH,
+                 lock=None, seen=None):
+        self.store = store
+        self.seen = seen
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        # Held while states are read and written, shared with the tracker's synchronous saves
+        self.lock = lock or threading.Lock()
+        self._known = {}    # puzzle -> {player: score}
+        self._warmed = set()  # puzzles whose stored scores are in _known
+        self._journal = (None, 0)  # (file identity, offset) read up to
+        self._index_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+
+    def start(self, background=True):
+        """Replay the journal into the index, flush it in the background and at exit."""
+        with self._locked():
+            pending = self._catch_up()
+        if pending:
+            logging.info(f"Replaying {len(pending)} queued scores from {self.path}")
+            if self.seen is not None:
+                self.seen.add_many((entry.puzzle, entry.player) for entry in pending)
+            self._wakeup.set()
+        if background:
+            self._thread = threading.Thread(target=self._run, name="wordle-flush", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    @contextlib.contextmanager
+    def _locked(self):
+        import fcntl
+
+        with self._index_lock, open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _identity(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None, 0
+        return (stat.st_dev, stat.st_ino), stat.st_size
+
+    def _read_journal(self, offset=0):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                f.seek(offset)
+                return [Entry.from_dict(json.loads(line)) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _catch_up(self):
+        """Add journal lines written since the last read to the index (lock held)."""
+        identity, size = self._identity()
+        seen, offset = self._journal
+        # Compaction replaces the file, so a new identity means reading it again from the top
+        if identity != seen or size < offset:
+            offset = 0
+        entries = self._read_journal(offset)
+        for entry in entries:
+            self._known.setdefault(entry.puzzle, {}).setdefault(entry.player, entry.score)
+        self._journal = (identity, size)
+        return entries
+
+    def _warm(self, puzzle):
+        """Load a puzzle's stored and journaled scores into the index the first time it is seen."""
+        with self._index_lock:
+            if puzzle in self._warmed:
+                return
+        stored = self.store.entries_for_puzzle(puzzle, fields=("player", "score"))
+        with self._locked():
+            players = self._known.setdefault(puzzle, {})
+            for entry in list(stored) + [e for e in self._read_journal() if e.puzzle == puzzle]:
+                players.setdefault(entry.player, entry.score)
+            self._warmed.add(puzzle)
+            self._trim(puzzle)
+
+    def _trim(self, keep):
+        """Drop the oldest puzzles other than keep from the index (lock held)."""
+        while len(self._known) > KNOWN_PUZZLES:
+            oldest = min(puzzle for puzzle in self._known if puzzle != keep)
+            del self._known[oldest]
+            self._warmed.discard(oldest)
+
+    def submit(self, entry):
+        """Journal the entry unless the player already has a score for the puzzle.
+
+        Returns (True, None) once the entry is durable in the journal, else
+        (False, existing_score).
+        """
+        stored = None
+        if self.seen is None:
+            self._warm(entry.puzzle)
+        elif self.seen.might_contain(entry.puzzle, entry.player):
+            stored = self.store.get_entry(entry.puzzle, entry.player)
+        line = json.dumps(entry.to_dict()) + "\n"
+        with self._locked():
+            self._catch_up()
+            players = self._known.setdefault(entry.puzzle, {})
+            if stored is not None:
+                players.setdefault(entry.player, stored.score)
+            if entry.player in players:
+                return False, players[entry.player]
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            players[entry.player] = entry.score
+            self._journal = self._identity()
+            self._trim(entry.puzzle)
+        self._wakeup.set()
+        return True, None
+
+    def pending(self):
+        """Entries journaled but not yet committed."""
+        with self._locked():
+            return self._read_journal()
+
+    def flush(self):
+        """Commit everything journaled so far; returns the entries created."""
+        with self._flush_lock:
+            pending = self.pending()
+            if not pending:
+                return []
+            created = self._commit(pending)
+            done = {(entry.puzzle, entry.player) for entry in pending}
+            with self._locked():
+                # Index what was appended meanwhile before the rewrite resets the read position
+                self._catch_up()
+                remaining = [entry for entry in self._read_journal() if (entry.puzzle, entry.player) not in done]
+                self._rewrite(remaining)
+        logging.info(f"Committed {len(created)} of {len(pending)} queued scores")
+        return created
+
+    def _rewrite(self, entries):
+        """Replace the journal with entries (lock held)."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry.to_dict()) + "\n" for entry in entries)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._journal = self._identity()
+
+    def _commit(self, pending):
+        """Write pending entries in journal order; returns the ones created."""
+        created = []
+        for i in range(0, len(pending), self.batch_size):
+            chunk = pending[i:i + self.batch_size]
+            with self.lock:
+                existing = self.store.insert_entries(chunk, update_states=apply_entry)
+            for entry in chunk:
+                stored = existing.get((entry.puzzle, entry.player))
+                if stored is None:
+                    created.append(entry)
+                elif stored != entry.score:
+                    logging.warning(f"Queued score for {entry.player} on puzzle {entry.puzzle} "
+                                    f"lost to one stored first ({stored})")
+        return created
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._closed.is_set():
+                return
+            self._closed.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Flushing queued scores failed, keeping them journaled")
+                self._closed.wait(self.flush_interval)
+                self._wakeup.set()
+
+    def close(self):
+        """Stop the flusher and commit what is left."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        atexit.unregister(self.close)
+        self.flush()
@@ -0,0 +1,80 @@
+"""Streaks and head-to-head ratings, kept as one state record per player.
+
+A state is {player, games, current_streak, longest_streak, last_puzzle,
+rating}. A streak counts consecutive puzzle numbers solved; an X or a
+skipped puzzle starts it again. Ratings are Elo: every pair of players on
+the same puzzle is one game, won by the lower score (equal scores draw).
+
+apply_entry() folds a single new entry into the states of the players
+involved, so a save only touches the players already on that puzzle.
+replay() rebuilds every state from scratch in (puzzle, player) order. Live
+updates follow posting order instead, so ratings after a rebuild can differ
+slightly from the live ones, and a puzzle posted after a later one only
+reaches the streaks on rebuild.
+"""
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 32
+
+
+def new_state(player):
+    return {"player": player, "games": 0, "current_streak": 0, "longest_streak": 0,
+            "last_puzzle": None, "rating": INITIAL_RATING}
+
+
+def expected_score(rating, opponent_rating):
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def apply_entry(states, entry, opponents):
+    """Update states (player -> state, filled in as needed) for a new entry.
+
+    opponents are the other players' entries on the same puzzle, already
+    applied. Returns the players whose state changed.
+    """
+    state = states.get(entry.player)
+    if state is None:
+        state = states[entry.player] = new_state(entry.player)
+
+    # A puzzle older than the player's last one can't extend or break the
+    # streak incrementally; the next rebuild places it
+    if state["last_puzzle"] is None or entry.puzzle > state["last_puzzle"]:
+        if entry.score > entry.max_tries:
+            state["current_streak"] = 0
+        elif state["last_puzzle"] == entry.puzzle - 1 and state["current_streak"]:
+            state["current_streak"] += 1
+        else:
+            state["current_streak"] = 1
+        state["longest_streak"] = max(state["longest_streak"], state["current_streak"])
+        state["last_puzzle"] = entry.puzzle
+    state["games"] += 1
+
+    changed = [entry.player]
+    for opponent in opponents:
+        other = states.get(opponent.player)
+        if other is None:
+            other = states[opponent.player] = new_state(opponent.player)
+
+        if entry.score < opponent.score:
+            actual = 1.0
+        elif entry.score == opponent.score:
+            actual = 0.5
+        else:
+            actual = 0.0
+        delta = K_FACTOR * (actual - expected_score(state["rating"], other["rating"]))
+        state["rating"] += delta
+        other["rating"] -= delta
+        changed.append(opponent.player)
+    return changed
+
+
+def replay(entries):
+    """Every player's state rebuilt from their whole history, deterministically."""
+    states = {}
+    current_puzzle, on_puzzle = None, []
+    for entry in sorted(entries, key=lambda e: (e.puzzle, e.player)):
+        if entry.puzzle != current_puzzle:
+            current_puzzle, on_puzzle = entry.puzzle, []
+        apply_entry(states, entry, on_puzzle)
+        on_puzzle.append(entry)
+    return states
@@ -0,0 +1,202 @@
+"""Local index of which (puzzle, player) keys have a stored score.
+
+Nearly every submission is new, and duplicates only happen for the last
+few puzzles, so most duplicate checks can be answered without the store:
+
+    seen = SeenIndex("wordle_seen.idx").warm(store)
+    if not seen.might_contain(1738, "Alice"):
+        ...  # definitely new
+    else:
+        ...  # confirm with store.get_entry() to get the existing score
+
+The index holds an exact set of players for the HOT_PUZZLES most recent
+puzzles and a Bloom filter of every key, so answers for recent puzzles are
+exact and older ones are wrong ("maybe") about 1% of the time. "No" is
+always right as long as every write goes through add().
+
+The index lives in a file shared by every process: a JSON header line (with
+the hot set) followed by the filter's bits. It is reloaded whenever another
+process has replaced it, and rewritten under a lock file on every add. If
+the file is missing, or has outgrown its capacity, warm() rebuilds it from
+all stored keys. Otherwise, if it has not been refreshed for REFRESH_AGE
+seconds, one range query re-reads the HOT_PUZZLES most recent puzzles from
+the store, so scores written around the index (by hand, or from another
+host) are picked up within a minute without every start paying for it.
+"""
+
+import os
+import json
+import math
+import time
+import hashlib
+import logging
+import threading
+import contextlib
+
+from wordle_perf import instrument
+
+SEEN_PATH = os.environ.get("WORDLE_SEEN_FILE", "wordle_seen.idx")
+
+# Most recent puzzles kept as exact sets (players resubmit within a few days)
+HOT_PUZZLES = 7
+
+# Seconds between re-reads of the recent puzzles from the store
+REFRESH_AGE = 60
+
+# Keys the filter is sized for at FALSE_POSITIVE_RATE (about 120 KB)
+SEEN_CAPACITY = 100_000
+FALSE_POSITIVE_RATE = 0.01
+
+
+class BloomFilter:
+    """Bloom filter over strings, with positions from a stable hash (blake2b)."""
+
+    __slots__ = ("bits", "hashes", "array")
+
+    def __init__(self, capacity=SEEN_CAPACITY, rate=FALSE_POSITIVE_RATE, bits=None, hashes=None, array=None):
+        self.bits = bits or math.ceil(-capacity * math.log(rate) / math.log(2) ** 2)
+        self.hashes = hashes or max(1, round(self.bits / capacity * math.log(2)))
+        self.array = array if array is not None else bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.bits for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _key(puzzle, player):
+    return f"{puzzle}_{player}"
+
+
+@instrument("seen")
+class SeenIndex:
+    """Exact recent-puzzle sets plus a Bloom filter of every stored key, kept in a file."""
+
+    def __init__(self, path=SEEN_PATH, capacity=SEEN_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self.count = 0
+        self.hot = {}  # puzzle -> set of players, for the HOT_PUZZLES newest puzzles
+        self.bloom = BloomFilter(capacity)
+        self._version = None  # (inode, mtime, size) of the file last loaded or written
+        self.refreshed = 0.0  # when the recent puzzles were last read from the store
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        import fcntl
+
+        with self._lock, open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _file_version(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _reload(self):
+        """Load the file if another process replaced it since (lock held); False if there is none."""
+        version = self._file_version()
+        if version is None:
+            return False
+        if version == self._version:
+            return True
+        with open(self.path, "rb") as f:
+            header = json.loads(f.readline())
+            array = bytearray(f.read())
+        self.capacity, self.count = header["capacity"], header["count"]
+        self.refreshed = header.get("refreshed", 0.0)
+        self.hot = {int(puzzle): set(players) for puzzle, players in header["hot"].items()}
+        self.bloom = BloomFilter(bits=header["bits"], hashes=header["hashes"], array=array)
+        self._version = version
+        return True
+
+    def _write(self):
+        header = {"capacity": self.capacity, "count": self.count, "bits": self.bloom.bits,
+                  "hashes": self.bloom.hashes, "refreshed": self.refreshed,
+                  "hot": {str(puzzle): sorted(players) for puzzle, players in self.hot.items()}}
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            f.write(self.bloom.array)
+        os.replace(temp_path, self.path)
+        self._version = self._file_version()
+
+    def _add(self, puzzle, player):
+        key = _key(puzzle, player)
+        if key not in self.bloom:
+            self.count += 1
+        self.bloom.add(key)
+        if self.hot and puzzle < self._window_start():
+            return
+        self.hot.setdefault(puzzle, set()).add(player)
+        for old in [p for p in self.hot if p < self._window_start()]:
+            del self.hot[old]
+
+    def _window_start(self):
+        """Oldest puzzle the hot set answers for exactly."""
+        return max(self.hot) - HOT_PUZZLES + 1
+
+    def warm(self, store, latest=None):
+        """Load the index file, or build it from every stored key if it is missing or full.
+
+        A loaded file has its recent puzzles (up to latest, if given) refreshed
+        from the store if that was last done over REFRESH_AGE seconds ago.
+        """
+        with self._locked():
+            if self._reload() and self.count <= self.capacity:
+                if time.time() - self.refreshed >= REFRESH_AGE:
+                    self._refresh(store, latest)
+                return self
+            entries = store.all_entries(fields=("puzzle", "player"))
+            self.capacity = max(self.capacity, 2 * len(entries))
+            self.count = 0
+            self.hot = {}
+            self.bloom = BloomFilter(self.capacity)
+            for entry in sorted(entries, key=lambda e: e.puzzle):
+                self._add(entry.puzzle, entry.player)
+            self.refreshed = time.time()
+            self._write()
+        logging.info(f"Built seen index of {self.count} scores in {self.path}")
+        return self
+
+    def _refresh(self, store, latest):
+        """Add the stored players of the HOT_PUZZLES most recent puzzles and rewrite the file (lock held)."""
+        newest = max(max(self.hot, default=0), latest or 0)
+        before = (self.count, {puzzle: len(players) for puzzle, players in self.hot.items()})
+        entries = store.entries_since_puzzle(newest - HOT_PUZZLES + 1, fields=("puzzle", "player"))
+        for entry in sorted(entries, key=lambda e: e.puzzle):
+            self._add(entry.puzzle, entry.player)
+        if (self.count, {puzzle: len(players) for puzzle, players in self.hot.items()}) != before:
+            logging.info(f"Seen index was missing recent scores, updated {self.path}")
+        self.refreshed = time.time()
+        self._write()
+
+    def might_contain(self, puzzle, player):
+        """False if the player definitely has no score for the puzzle."""
+        with self._locked():
+            self._reload()
+            if self.hot and puzzle >= self._window_start():
+                return player in self.hot.get(puzzle, ())
+            return _key(puzzle, player) in self.bloom
+
+    def add(self, puzzle, player):
+        self.add_many([(puzzle, player)])
+
+    def add_many(self, keys):
+        """Record (puzzle, player) keys as stored and rewrite the file."""
+        with self._locked():
+            self._reload()
+            for puzzle, player in keys:
+                self._add(puzzle, player)
+            self._write()
@@ -0,0 +1,212 @@
+"""Columnar statistics over stored Wordle entries.
+
+A month (or any date range) of entries is decoded once into parallel
+columns - player code, puzzle, score, max_tries - and every per-player
+aggregate comes from one grouped count over those columns:
+
+    columns = ScoreColumns.from_entries(entries)
+    totals = aggregate(columns)                   # {player: totals}
+    totals = aggregate(columns.restrict(players=..., puzzles=...))
+
+Totals have the same shape as the stored rollups, {points, games, failures,
+score_sum, scores}, so reply formatters treat computed and stored summaries
+alike; merge_totals() combines monthly summaries into longer periods.
+average(), best() and ranking() derive the figures the replies show.
+
+The columns are stdlib arrays and the grouping is a Counter over zipped
+columns, which keeps the per-entry work in C without adding a NumPy import
+to every bot invocation.
+"""
+
+from array import array
+from collections import Counter
+from itertools import compress
+
+
+def empty_totals():
+    return {"points": 0, "games": 0, "failures": 0, "score_sum": 0, "scores": {}}
+
+
+class ScoreColumns:
+    """Parallel arrays of (player code, puzzle, score, max_tries), one row per entry."""
+
+    __slots__ = ("players", "player", "puzzle", "score", "max_tries")
+
+    def __init__(self, players=(), player=None, puzzle=None, score=None, max_tries=None):
+        self.players = list(players)
+        self.player = player if player is not None else array("I")
+        self.puzzle = puzzle if puzzle is not None else array("I")
+        self.score = score if score is not None else array("H")
+        self.max_tries = max_tries if max_tries is not None else array("H")
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Columns for Entry objects; a projection without puzzle stores puzzle 0."""
+        codes = {}
+        columns = cls()
+        player, puzzle, score, max_tries = columns.player, columns.puzzle, columns.score, columns.max_tries
+        for entry in entries:
+            code = codes.get(entry.player)
+            if code is None:
+                code = codes[entry.player] = len(codes)
+            player.append(code)
+            puzzle.append(entry.puzzle or 0)
+            score.append(entry.score)
+            max_tries.append(entry.max_tries)
+        columns.players = list(codes)
+        return columns
+
+    def __len__(self):
+        return len(self.player)
+
+    def puzzles_by_player(self):
+        """{player: set of puzzles submitted}."""
+        puzzles = [set() for _ in self.players]
+        for code, puzzle in zip(self.player, self.puzzle):
+            puzzles[code].add(puzzle)
+        return {name: puzzles[code] for code, name in enumerate(self.players)}
+
+    def shared_puzzles(self, players):
+        """Puzzles every one of players submitted (empty if any has none)."""
+        by_player = self.puzzles_by_player()
+        sets = [by_player.get(player, set()) for player in players]
+        return set.intersection(*sets) if sets else set()
+
+    def restrict(self, players=None, puzzles=None):
+        """Rows limited to the given players and/or puzzles, sharing the player codes."""
+        mask = None
+        if players is not None:
+            players = set(players)
+            wanted = {code for code, name in enumerate(self.players) if name in players}
+            mask = list(map(wanted.__contains__, self.player))
+        if puzzles is not None:
+            in_puzzles = map(set(puzzles).__contains__, self.puzzle)
+            mask = list(in_puzzles) if mask is None else [a and b for a, b in zip(mask, in_puzzles)]
+        if mask is None:
+            return self
+
+        return ScoreColumns(
+            self.players,
+            array("I", compress(self.player, mask)),
+            array("I", compress(self.puzzle, mask)),
+            array("H", compress(self.score, mask)),
+            array("H", compress(self.max_tries, mask)),
+        )
+
+
+def aggregate(columns):
+    """Per-player totals for every player with at least one row."""
+    counts = Counter(zip(columns.player, columns.max_tries, columns.score))
+
+    names = columns.players
+    totals = {}
+    for (code, max_tries, score), count in counts.items():
+        player_totals = totals.get(names[code])
+        if player_totals is None:
+            player_totals = totals[names[code]] = empty_totals()
+        player_totals["games"] += count
+        player_totals["points"] += (max_tries - score + 1) * count
+        if score > max_tries:
+            player_totals["failures"] += count
+        else:
+            player_totals["score_sum"] += score * count
+            key = str(score)
+            player_totals["scores"][key] = player_totals["scores"].get(key, 0) + count
+    return totals
+
+
+def merge_totals(summaries):
+    """Add up {player: totals} summaries, e.g. the months of a year."""
+    merged = {}
+    for summary in summaries:
+        for player, totals in summary.items():
+            current = merged.get(player)
+            if current is None:
+                current = merged[player] = empty_totals()
+            for field in ("points", "games", "failures", "score_sum"):
+                current[field] += totals.get(field, 0)
+            for score, count in totals.get("scores", {}).items():
+                current["scores"][score] = current["scores"].get(score, 0) + count
+    return merged
+
+
+def average(totals):
+    """Mean score over solved games, to one decimal, or None if none were solved."""
+    solved = totals["games"] - totals["failures"]
+    return round(totals["score_sum"] / solved, 1) if solved else None
+
+
+def best(totals):
+    """Lowest solved score, or None if none were solved."""
+    scores = [int(score) for score, count in totals["scores"].items() if count]
+    return min(scores) if scores else None
+
+
+def ranking(summary):
+    """[(player, points)] sorted by points, highest first; ties by name, so every backend agrees."""
+    return sorted(((player, totals["points"]) for player, totals in summary.items()),
+                  key=lambda item: (-item[1], item[0]))
+
+
+# ── Pairwise head-to-head ──
+# Pairs are stored once, as {first: {second: totals}} with first < second and
+# totals from first's side: {shared, wins, losses, ties, score_sum, solved,
+# opponent_score_sum, opponent_solved}. The score sums cover solved games only.
+
+PAIR_FIELDS = ("shared", "wins", "losses", "ties", "score_sum", "solved", "opponent_score_sum", "opponent_solved")
+
+
+def pair_totals(entry, opponent):
+    """(first, second, totals) contributed by two entries on the same puzzle."""
+    if opponent.player < entry.player:
+        entry, opponent = opponent, entry
+    solved = entry.score <= entry.max_tries
+    opponent_solved = opponent.score <= opponent.max_tries
+    totals = {
+        "shared": 1,
+        "wins": int(entry.score < opponent.score),
+        "losses": int(entry.score > opponent.score),
+        "ties": int(entry.score == opponent.score),
+        "score_sum": entry.score if solved else 0,
+        "solved": int(solved),
+        "opponent_score_sum": opponent.score if opponent_solved else 0,
+        "opponent_solved": int(opponent_solved),
+    }
+    return entry.player, opponent.player, totals
+
+
+def add_pair(pairs, entry, opponent):
+    """Add the totals of two entries on the same puzzle into pairs, in place."""
+    first, second, totals = pair_totals(entry, opponent)
+    current = pairs.setdefault(first, {}).setdefault(second, dict.fromkeys(PAIR_FIELDS, 0))
+    for field, value in totals.items():
+        current[field] += value
+
+
+def pairs_from_entries(entries):
+    """{first: {second: totals}} for every pair of players sharing a puzzle."""
+    by_puzzle = {}
+    for entry in entries:
+        by_puzzle.setdefault(entry.puzzle, []).append(entry)
+
+    pairs = {}
+    for on_puzzle in by_puzzle.values():
+        for i, entry in enumerate(on_puzzle):
+            for opponent in on_puzzle[i + 1:]:
+                add_pair(pairs, entry, opponent)
+    return pairs
+
+
+def pair_view(pairs, player, opponent):
+    """Totals for player against opponent from player's side, or None if they never met."""
+    if player < opponent:
+        return pairs.get(player, {}).get(opponent)
+
+    totals = pairs.get(opponent, {}).get(player)
+    if totals is None:
+        return None
+    return {
+        "shared": totals["shared"], "wins": totals["losses"], "losses": totals["wins"], "ties": totals["ties"],
+        "score_sum": totals["opponent_score_sum"], "solved": totals["opponent_solved"],
+        "opponent_score_sum": totals["score_sum"], "opponent_solved": totals["solved"],
+    }
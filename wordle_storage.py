@@ -0,0 +1,815 @@
+"""Storage backends for WordleTracker.
+
+Every backend stores Entry records keyed by (puzzle, player) and provides
+the same operations:
+
+    insert_entry(entry, update_states=None) -> (created, existing_score)
+    insert_entries(entries, update_states=None) -> {(puzzle, player): existing_score}
+    save_entry(entry, update_states=None)
+    get_entry(puzzle, player)             -> Entry or None
+    entries_for_month(month, year, player=None, fields=None)
+    entries_between(start_date, end_date, fields=None)
+    entries_for_puzzle(puzzle, fields=None)
+    entries_since_puzzle(first_puzzle, fields=None)
+    all_entries(fields=None)
+    month_summary(month, year, player=None) -> {player: totals}
+    monthly_summaries(year=None)          -> {(month, year): {player: totals}}
+    month_pairs(month, year)              -> {first: {second: pair totals}}
+    rebuild_summaries(month, year)        -> players whose stored totals were stale
+    rebuild_all_summaries()               -> {(month, year): stale players}, every month
+    bulk_insert(entries)                  -> number of entries created
+    get_player_states(players)            -> {player: state}
+    all_player_states()                   -> [state]
+    replace_player_states(states)
+
+Player states are the streak and rating records from wordle_ratings.
+insert_entries reads each puzzle's stored entries and the players' states,
+calls update_states(states, entry, opponents) for every entry not stored
+yet (opponents being the other players' entries on the same puzzle), and
+writes the new entries, their rollups and pairwise totals (see
+wordle_stats.pair_totals) and the changed states, all in one transaction.
+Entries already stored are left alone and returned with their scores.
+save_entry writes one entry the same way but replaces a stored one, in
+which case states are left to a ratings rebuild.
+
+Reads that pass fields only fetch those columns (a Firestore projection or
+a narrower SELECT); the other attributes of the returned entries are None.
+
+Per-player totals are {points, games, failures, score_sum, scores}, where
+score_sum and the scores histogram only cover solved games.
+
+Both backends time every public method as a store.<name> stage and count
+the documents (rows) and bytes each read returns (see wordle_perf).
+
+Backend libraries (the Firebase SDK in particular, which takes hundreds of
+milliseconds to import) are only imported once a backend is constructed.
+"""
+
+import os
+import logging
+import threading
+
+from wordle_grid import pack_bytes, unpack_bytes
+from wordle_perf import instrument, count_read
+from wordle_stats import ScoreColumns, aggregate, add_pair, pairs_from_entries
+
+# Backend used when WordleTracker is not given one: "firestore", "sqlite:<path>" or "memory"
+STORE_SPEC = os.environ.get("WORDLE_STORE", "firestore")
+
+# Firestore caps a batched write at 500 operations and get_all() requests
+# should stay well below its 1000-document limit.
+FIRESTORE_BATCH_LIMIT = 500
+FIRESTORE_GET_ALL_LIMIT = 300
+
+
+class Entry:
+    """One stored score, decoded once from a document or row.
+
+    grid holds the packed emoji rows (see wordle_grid), or None if the
+    submission had no grid or the read did not fetch it.
+    """
+
+    __slots__ = ("puzzle", "player", "score", "max_tries", "date", "month", "year", "grid")
+
+    def __init__(self, puzzle=None, player=None, score=None, max_tries=None, date=None, month=None, year=None,
+                 grid=None):
+        self.puzzle = puzzle
+        self.player = player
+        self.score = score
+        self.max_tries = max_tries
+        self.date = date
+        self.month = month
+        self.year = year
+        self.grid = grid
+
+    @classmethod
+    def from_dict(cls, data):
+        grid = data.get("grid")
+        return cls(data.get("puzzle"), data.get("player"), data.get("score"), data.get("max_tries"),
+                   data.get("date"), data.get("month"), data.get("year"),
+                   tuple(grid) if grid is not None else None)
+
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in self.__slots__}
+        data["grid"] = list(self.grid) if self.grid is not None else None
+        return data
+
+    def __eq__(self, other):
+        return isinstance(other, Entry) and all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__
+        )
+
+    def __repr__(self):
+        return f"Entry({', '.join(f'{field}={getattr(self, field)!r}' for field in self.__slots__)})"
+
+
+# Projections used by the tracker's reads
+COMPARE_FIELDS = ("player", "puzzle", "score", "max_tries")
+SUMMARY_FIELDS = ("player", "score", "max_tries")
+GRID_FIELDS = ("player", "grid")
+
+
+def rollup_totals(score_val, max_tries, increment=lambda v: v):
+    """Totals contributed by a single entry, optionally wrapped (e.g. in Increment)."""
+    failed = score_val > max_tries
+    return {
+        "points": increment(max_tries - score_val + 1),
+        "games": increment(1),
+        "failures": increment(1 if failed else 0),
+        "score_sum": increment(0 if failed else score_val),
+        "scores": {} if failed else {str(score_val): increment(1)},
+    }
+
+
+def rollup_from_entries(entries):
+    return aggregate(ScoreColumns.from_entries(entries))
+
+
+def _as_increments(value, increment):
+    """Wrap every number in a nested totals dict with increment()."""
+    if isinstance(value, dict):
+        return {key: _as_increments(item, increment) for key, item in value.items()}
+    return increment(value)
+
+
+def _plan_inserts(entries, on_puzzle, states, update_states, overwrite=False):
+    """Work out which entries are new and what they change, in order.
+
+    on_puzzle holds each puzzle's stored entries. Each new entry's opponents
+    are those plus the new entries before it on the same puzzle; with
+    update_states(states, entry, opponents) it also updates states in place.
+    With overwrite, entries already stored replace the stored ones as
+    opponents of later entries (but are not new).
+    Returns ({(puzzle, player): existing score}, [(entry, opponents)], changed players).
+    """
+    by_puzzle = {puzzle: {e.player: e for e in stored} for puzzle, stored in on_puzzle.items()}
+    existing, items, changed = {}, [], set()
+    for entry in entries:
+        players = by_puzzle[entry.puzzle]
+        if entry.player in players:
+            existing[(entry.puzzle, entry.player)] = players[entry.player].score
+            if overwrite:
+                players[entry.player] = entry
+            continue
+        opponents = list(players.values())
+        if update_states is not None:
+            changed.update(update_states(states, entry, opponents))
+        players[entry.player] = entry
+        items.append((entry, opponents))
+    return existing, items, changed
+
+
+@instrument("store")
+class FirestoreStore:
+    """wordle_entries plus incrementally maintained rollup documents.
+
+    wordle_monthly/{year}_{month} and wordle_daily/{date} hold
+    {"players": {name: totals}} and are updated in the same batch as the entry.
+    The monthly document also holds {"pairs": {first: {second: totals}}}, and
+    "complete": True once it covers every entry of the month: it is written
+    in full from the month's entries by the first save into a month without
+    that marker (and by rebuild_summaries), and incremented after that.
+    Readers only trust complete documents and scan the entries otherwise.
+    wordle_meta/rollups is marked complete once every month has been rebuilt,
+    after which months without a document have no entries.
+    wordle_players/{player} holds each player's streak and rating state.
+
+    Pass db to use an existing client, e.g. wordle_firestore_memory.MemoryFirestore.
+    """
+
+    def __init__(self, key_path="firebase-key.json", db=None):
+        # Rollups seen complete, per (month, year) and for every month; the markers are never removed
+        self._complete = set()
+        self._all_complete = False
+        if db is not None:
+            self.db = db
+            return
+
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
+        cred = credentials.Certificate(key_path)
+        firebase_admin.initialize_app(cred)
+        self.db = firestore.client()
+        logging.info("Connected to Firebase Firestore.")
+
+    def _entry_ref(self, entry):
+        return self.db.collection("wordle_entries").document(f"{entry.puzzle}_{entry.player}")
+
+    def _player_ref(self, player):
+        return self.db.collection("wordle_players").document(player)
+
+    def _monthly_ref(self, month, year):
+        return self.db.collection("wordle_monthly").document(f"{year}_{month}")
+
+    def _add_state_writes(self, batch, player_states):
+        for player, state in (player_states or {}).items():
+            batch.set(self._player_ref(player), state)
+
+    def _add_month_writes(self, batch, month, year, entries):
+        """Overwrite a month's rollup and its days' rollups with totals over entries."""
+        by_date = {}
+        for entry in entries:
+            by_date.setdefault(entry.date, []).append(entry)
+
+        batch.set(self._monthly_ref(month, year),
+                  {"month": month, "year": year, "players": rollup_from_entries(entries),
+                   "pairs": pairs_from_entries(entries), "complete": True})
+        for date, day_entries in by_date.items():
+            batch.set(
+                self.db.collection("wordle_daily").document(date),
+                {"date": date, "puzzle": day_entries[0].puzzle, "month": month, "year": year,
+                 "players": rollup_from_entries(day_entries)},
+            )
+        return by_date
+
+    def _add_coalesced_rollup_writes(self, batch, items):
+        """One increment per month and day document for many (entry, opponents) items."""
+        from firebase_admin import firestore
+
+        by_month, by_date = {}, {}
+        for entry, opponents in items:
+            by_month.setdefault((entry.year, entry.month), []).append((entry, opponents))
+            by_date.setdefault(entry.date, []).append(entry)
+
+        for (year, month), month_items in by_month.items():
+            pairs = {}
+            for entry, opponents in month_items:
+                for opponent in opponents:
+                    add_pair(pairs, entry, opponent)
+            monthly = {"month": month, "year": year,
+                       "players": _as_increments(rollup_from_entries(e for e, _ in month_items), firestore.Increment)}
+            if pairs:
+                monthly["pairs"] = _as_increments(pairs, firestore.Increment)
+            batch.set(self.db.collection("wordle_monthly").document(f"{year}_{month}"), monthly, merge=True)
+        for date, day_entries in by_date.items():
+            first = day_entries[0]
+            batch.set(
+                self.db.collection("wordle_daily").document(date),
+                {"date": date, "puzzle": first.puzzle, "month": first.month, "year": first.year,
+                 "players": _as_increments(rollup_from_entries(day_entries), firestore.Increment)},
+                merge=True,
+            )
+
+    def _read_states(self, players, transaction=None, months=()):
+        """Player states by name, and the months among months lacking a complete rollup.
+
+        Both come from the same get_all, so a write reads them in one round trip.
+        """
+        month_refs = {self._monthly_ref(month, year).path: (month, year) for month, year in months}
+        refs = [self._player_ref(player) for player in players]
+        refs += [self._monthly_ref(month, year) for month, year in months]
+        states, incomplete = {}, set(months)
+        for i in range(0, len(refs), FIRESTORE_GET_ALL_LIMIT):
+            for snapshot in self.db.get_all(refs[i:i + FIRESTORE_GET_ALL_LIMIT], transaction=transaction):
+                data = count_read(snapshot.to_dict()) if snapshot.exists else count_read(None, 0)
+                month = month_refs.get(snapshot.reference.path)
+                if month is not None:
+                    if data and data.get("complete"):
+                        incomplete.discard(month)
+                elif data is not None:
+                    states[snapshot.id] = data
+        return states, incomplete
+
+    def insert_entry(self, entry, update_states=None):
+        existing = self.insert_entries([entry], update_states)
+        key = (entry.puzzle, entry.player)
+        return (False, existing[key]) if key in existing else (True, None)
+
+    def insert_entries(self, entries, update_states=None):
+        """Create the entries not stored yet, with their rollups and states, in one transaction.
+
+        Each puzzle's stored entries and their players' states are read inside
+        the transaction, so two processes inserting on the same puzzle at once
+        are serialised: Firestore retries the loser against what the winner
+        wrote, and neither rating update nor pairwise total is lost.
+        """
+        from google.api_core.exceptions import AlreadyExists
+
+        try:
+            return self._write_entries(entries, update_states)
+        except AlreadyExists:
+            # Created outside a transaction since the read; the retry sees it
+            return self._write_entries(entries, update_states)
+
+    def save_entry(self, entry, update_states=None):
+        """Write the entry, replacing a stored one for the same puzzle and player.
+
+        A new entry is added like insert_entry does. A replaced one leaves the
+        player states alone (see --rebuild-ratings); its month's rollups are
+        rewritten from the month's entries in the same transaction.
+        """
+        self._write_entries([entry], update_states, overwrite=True)
+
+    def _write_entries(self, entries, update_states, overwrite=False):
+        from firebase_admin import firestore
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        @firestore.transactional
+        def write(transaction):
+            # Every read comes before the first write, as Firestore transactions require
+            on_puzzle = {}
+            for puzzle in sorted({entry.puzzle for entry in entries}):
+                query = (self.db.collection("wordle_entries").where(filter=FieldFilter("puzzle", "==", puzzle))
+                         .select(list(COMPARE_FIELDS)))
+                on_puzzle[puzzle] = [Entry.from_dict(count_read(doc.to_dict()))
+                                     for doc in query.stream(transaction=transaction)]
+            players = []
+            if update_states is not None:
+                players = sorted({entry.player for entry in entries}.union(
+                    *({e.player for e in stored} for stored in on_puzzle.values())))
+            # Months whose rollup misses older entries are backfilled by this write
+            unknown = sorted({(entry.month, entry.year) for entry in entries} - self._complete)
+            states, incomplete = {}, set()
+            if players or unknown:
+                states, incomplete = self._read_states(players, transaction, unknown)
+            self._complete.update(set(unknown) - incomplete)
+            if update_states is None:
+                states = None
+
+            existing, items, changed = _plan_inserts(entries, on_puzzle, states, update_states, overwrite)
+            replaced = [entry for entry in entries if (entry.puzzle, entry.player) in existing] if overwrite else []
+            rewrite = {}
+            for month, year in sorted(incomplete | {(entry.month, entry.year) for entry in replaced}):
+                query = (self.db.collection("wordle_entries")
+                         .where(filter=FieldFilter("month", "==", month))
+                         .where(filter=FieldFilter("year", "==", year))
+                         .select(["puzzle", "player", "score", "max_tries", "date"]))
+                rewrite[(month, year)] = {(e.puzzle, e.player): e for e in
+                                          (Entry.from_dict(count_read(doc.to_dict()))
+                                           for doc in query.stream(transaction=transaction))}
+
+            for entry, _ in items:
+                transaction.create(self._entry_ref(entry), entry.to_dict())
+            for entry in replaced:
+                transaction.set(self._entry_ref(entry), entry.to_dict())
+            for entry in [entry for entry, _ in items] + replaced:
+                if (entry.month, entry.year) in rewrite:
+                    rewrite[(entry.month, entry.year)][(entry.puzzle, entry.player)] = entry
+            for (month, year), month_entries in rewrite.items():
+                self._add_month_writes(transaction, month, year, list(month_entries.values()))
+            increments = [(entry, opponents) for entry, opponents in items
+                          if (entry.month, entry.year) not in rewrite]
+            if increments:
+                self._add_coalesced_rollup_writes(transaction, increments)
+            if states is not None:
+                self._add_state_writes(transaction, {player: states[player] for player in changed})
+            return existing, incomplete
+
+        existing, incomplete = write(self.db.transaction())
+        self._complete.update(incomplete)
+        return existing
+
+    def get_entry(self, puzzle, player):
+        snapshot = self.db.collection("wordle_entries").document(f"{puzzle}_{player}").get()
+        # A lookup that finds nothing is still billed as a read
+        return Entry.from_dict(count_read(snapshot.to_dict())) if snapshot.exists else count_read(None, 0)
+
+    @staticmethod
+    def _stream(query, fields):
+        if fields is not None:
+            query = query.select(list(fields))
+        return [Entry.from_dict(count_read(doc.to_dict())) for doc in query.stream()]
+
+    def entries_for_month(self, month, year, player=None, fields=None):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = self.db.collection("wordle_entries")
+        if player is not None:
+            query = query.where(filter=FieldFilter("player", "==", player))
+        query = (
+            query.where(filter=FieldFilter("month", "==", month))
+            .where(filter=FieldFilter("year", "==", year))
+        )
+        return self._stream(query, fields)
+
+    def entries_between(self, start_date, end_date, fields=None):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = (
+            self.db.collection("wordle_entries")
+            .where(filter=FieldFilter("date", ">=", start_date))
+            .where(filter=FieldFilter("date", "<=", end_date))
+        )
+        return self._stream(query, fields)
+
+    def entries_for_puzzle(self, puzzle, fields=None):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = self.db.collection("wordle_entries").where(filter=FieldFilter("puzzle", "==", puzzle))
+        return self._stream(query, fields)
+
+    def entries_since_puzzle(self, first_puzzle, fields=None):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = self.db.collection("wordle_entries").where(filter=FieldFilter("puzzle", ">=", first_puzzle))
+        return self._stream(query, fields)
+
+    def all_entries(self, fields=None):
+        return self._stream(self.db.collection("wordle_entries"), fields)
+
+    def month_summary(self, month, year, player=None):
+        """Per-player totals for a month, read from its rollup document.
+
+        Months saved before rollups existed have no complete document and are
+        summed from the raw entries instead (run --rebuild-rollups to backfill them).
+        """
+        snapshot = self._monthly_ref(month, year).get(field_paths=["players", "complete"])
+        data = count_read(snapshot.to_dict()) if snapshot.exists else {}
+        if data.get("complete"):
+            players = data.get("players", {})
+            if player is not None:
+                return {player: players[player]} if player in players else {}
+            return players
+
+        logging.info(f"No complete rollup for {month} {year}, scanning entries")
+        return rollup_from_entries(self.entries_for_month(month, year, player, fields=SUMMARY_FIELDS))
+
+    def monthly_summaries(self, year=None):
+        """Per-player totals for every month (or one year's), keyed by (month, year).
+
+        Read from the rollup documents once every month has been rebuilt (see
+        rebuild_all_summaries); until then summed from the raw entries. A
+        month whose document is not complete is summed from its entries.
+        """
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        if not self._rollups_complete():
+            logging.info("Rollups not rebuilt for every month yet, scanning entries")
+            query = self.db.collection("wordle_entries")
+            if year is not None:
+                query = query.where(filter=FieldFilter("year", "==", year))
+            by_month = {}
+            for entry in self._stream(query, ("month", "year") + SUMMARY_FIELDS):
+                by_month.setdefault((entry.month, entry.year), []).append(entry)
+            return {key: rollup_from_entries(month_entries) for key, month_entries in by_month.items()}
+
+        query = self.db.collection("wordle_monthly")
+        if year is not None:
+            query = query.where(filter=FieldFilter("year", "==", year))
+
+        summaries = {}
+        for doc in query.select(["month", "year", "players", "complete"]).stream():
+            data = count_read(doc.to_dict())
+            key = (data["month"], data["year"])
+            summaries[key] = data.get("players", {}) if data.get("complete") else self.month_summary(*key)
+        return summaries
+
+    def _rollups_complete(self):
+        if not self._all_complete:
+            snapshot = self.db.collection("wordle_meta").document("rollups").get()
+            data = count_read(snapshot.to_dict()) if snapshot.exists else count_read(None, 0)
+            self._all_complete = bool(data and data.get("complete"))
+        return self._all_complete
+
+    def month_pairs(self, month, year):
+        """Pairwise totals for a month, read from its complete rollup document (or summed from entries)."""
+        snapshot = self._monthly_ref(month, year).get(field_paths=["pairs", "complete"])
+        data = count_read(snapshot.to_dict()) if snapshot.exists else {}
+        if data.get("complete"):
+            return data.get("pairs", {})
+
+        logging.info(f"No complete rollup for {month} {year}, scanning entries")
+        return pairs_from_entries(self.entries_for_month(month, year, fields=COMPARE_FIELDS))
+
+    def bulk_insert(self, entries):
+        """Insert many entries, skipping ones already stored, in batched commits.
+
+        Pairwise totals depend on the entries already stored for each puzzle, so
+        they are not incremented here; rebuild_summaries the months touched.
+
+        Existing documents are found with get_all() in chunks. Each commit holds
+        up to a third of the batch limit in entries, so that the month and day
+        rollup increments for those entries fit in the same atomic batch.
+        """
+        refs = [self._entry_ref(entry) for entry in entries]
+        existing = set()
+        for i in range(0, len(refs), FIRESTORE_GET_ALL_LIMIT):
+            for snapshot in self.db.get_all(refs[i:i + FIRESTORE_GET_ALL_LIMIT]):
+                count_read(None, 0)
+                if snapshot.exists:
+                    existing.add(snapshot.id)
+
+        new = [(ref, entry) for ref, entry in zip(refs, entries) if ref.id not in existing]
+
+        per_batch = FIRESTORE_BATCH_LIMIT // 3
+        for i in range(0, len(new), per_batch):
+            chunk = new[i:i + per_batch]
+            batch = self.db.batch()
+            for ref, entry in chunk:
+                batch.create(ref, entry.to_dict())
+            self._add_coalesced_rollup_writes(batch, [(entry, ()) for _, entry in chunk])
+            batch.commit()
+            logging.info(f"Imported batch of {len(chunk)} entries")
+
+        return len(new)
+
+    def rebuild_summaries(self, month, year):
+        """Recompute a month's rollups from wordle_entries and overwrite them."""
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        entries = self.entries_for_month(month, year, fields=("puzzle", "player", "score", "max_tries", "date"))
+        expected = rollup_from_entries(entries)
+
+        snapshot = self._monthly_ref(month, year).get(field_paths=["players"])
+        stored = count_read(snapshot.to_dict()).get("players", {}) if snapshot.exists else {}
+        mismatched = sorted(p for p in set(stored) | set(expected) if stored.get(p) != expected.get(p))
+
+        batch = self.db.batch()
+        by_date = self._add_month_writes(batch, month, year, entries)
+
+        stale_days = (
+            self.db.collection("wordle_daily")
+            .where(filter=FieldFilter("month", "==", month))
+            .where(filter=FieldFilter("year", "==", year))
+            .stream()
+        )
+        for doc in stale_days:
+            count_read(None, 0)
+            if doc.id not in by_date:
+                batch.delete(doc.reference)
+        batch.commit()
+        self._complete.add((month, year))
+
+        logging.info(f"Rebuilt rollups for {month} {year}: {len(expected)} players, {len(by_date)} days")
+        return mismatched
+
+    def rebuild_all_summaries(self):
+        """rebuild_summaries for every month with entries, then mark the rollups complete.
+
+        Returns {(month, year): players whose stored totals were stale}.
+        """
+        months = {(entry.month, entry.year) for entry in self.all_entries(fields=("month", "year"))}
+        mismatched = {(month, year): self.rebuild_summaries(month, year) for month, year in sorted(months)}
+        self.db.collection("wordle_meta").document("rollups").set({"complete": True})
+        self._all_complete = True
+        return mismatched
+
+    def get_player_states(self, players):
+        return self._read_states(players)[0]
+
+    def all_player_states(self):
+        return [count_read(doc.to_dict()) for doc in self.db.collection("wordle_players").stream()]
+
+    def replace_player_states(self, states):
+        """Overwrite every player state, deleting players no longer present."""
+        writes = [(self._player_ref(player), state) for player, state in states.items()]
+        writes += [(doc.reference, None) for doc in self.db.collection("wordle_players").stream()
+                   if count_read(doc.id, 0) not in states]
+
+        for i in range(0, len(writes), FIRESTORE_BATCH_LIMIT):
+            batch = self.db.batch()
+            for ref, state in writes[i:i + FIRESTORE_BATCH_LIMIT]:
+                if state is None:
+                    batch.delete(ref)
+                else:
+                    batch.set(ref, state)
+            batch.commit()
+
+
+@instrument("store")
+class SQLiteStore:
+    """Local single-file store; aggregates are computed with GROUP BY queries."""
+
+    COLUMNS = ("puzzle", "player", "score", "max_tries", "date", "month", "year", "grid")
+    STATE_COLUMNS = ("player", "games", "current_streak", "longest_streak", "last_puzzle", "rating")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS wordle_entries (
+            puzzle    INTEGER NOT NULL,
+            player    TEXT    NOT NULL,
+            score     INTEGER NOT NULL,
+            max_tries INTEGER NOT NULL,
+            date      TEXT    NOT NULL,
+            month     TEXT    NOT NULL,
+            year      TEXT    NOT NULL,
+            grid      BLOB,
+            PRIMARY KEY (puzzle, player)
+        );
+        CREATE INDEX IF NOT EXISTS idx_entries_month ON wordle_entries (year, month, player);
+        CREATE INDEX IF NOT EXISTS idx_entries_date ON wordle_entries (date);
+        CREATE TABLE IF NOT EXISTS wordle_players (
+            player         TEXT    PRIMARY KEY,
+            games          INTEGER NOT NULL,
+            current_streak INTEGER NOT NULL,
+            longest_streak INTEGER NOT NULL,
+            last_puzzle    INTEGER,
+            rating         REAL    NOT NULL
+        );
+    """
+
+    def __init__(self, path="wordle.db"):
+        import sqlite3
+
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(self.SCHEMA)
+        # Databases created before grids were stored lack the column
+        if "grid" not in {row["name"] for row in self.conn.execute("PRAGMA table_info(wordle_entries)")}:
+            self.conn.execute("ALTER TABLE wordle_entries ADD COLUMN grid BLOB")
+        self._lock = threading.Lock()
+        logging.info(f"Opened SQLite store {path}")
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [count_read(dict(row)) for row in self.conn.execute(sql, params)]
+
+    def _select_entries(self, where, params, columns):
+        rows = self.conn.execute(f"SELECT {', '.join(columns)} FROM wordle_entries WHERE {where}", params)
+        return [Entry(**count_read(dict(zip(columns, row)))) for row in rows]
+
+    def _select_states(self, players):
+        players = list(players)
+        if not players:
+            return {}
+        rows = self.conn.execute(
+            f"SELECT * FROM wordle_players WHERE player IN ({', '.join('?' * len(players))})", players
+        )
+        return {row["player"]: count_read(dict(row)) for row in rows}
+
+    def _entries(self, where, params, fields):
+        columns = self.COLUMNS if fields is None else tuple(fields)
+        with self._lock:
+            entries = self._select_entries(where, params, columns)
+        if "grid" in columns:
+            for entry in entries:
+                entry.grid = unpack_bytes(entry.grid)
+        return entries
+
+    def _row(self, entry):
+        return tuple(getattr(entry, c) for c in self.COLUMNS[:-1]) + (pack_bytes(entry.grid),)
+
+    def _write_states(self, player_states):
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO wordle_players ({', '.join(self.STATE_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+            [tuple(state[c] for c in self.STATE_COLUMNS) for state in player_states.values()],
+        )
+
+    def insert_entry(self, entry, update_states=None):
+        existing = self.insert_entries([entry], update_states)
+        key = (entry.puzzle, entry.player)
+        return (False, existing[key]) if key in existing else (True, None)
+
+    def insert_entries(self, entries, update_states=None):
+        return self._write_entries(entries, update_states)
+
+    def save_entry(self, entry, update_states=None):
+        # A replaced entry leaves the states to --rebuild-ratings; totals are computed on read
+        self._write_entries([entry], update_states, overwrite=True)
+
+    def _write_entries(self, entries, update_states, overwrite=False):
+        # BEGIN IMMEDIATE takes the write lock before reading, so processes
+        # inserting on the same puzzle run one after the other
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                on_puzzle = {}
+                for puzzle in sorted({entry.puzzle for entry in entries}):
+                    on_puzzle[puzzle] = self._select_entries("puzzle = ?", (puzzle,), COMPARE_FIELDS)
+                states = None
+                if update_states is not None:
+                    players = {entry.player for entry in entries}.union(
+                        *({e.player for e in stored} for stored in on_puzzle.values()))
+                    states = self._select_states(sorted(players))
+
+                existing, items, changed = _plan_inserts(entries, on_puzzle, states, update_states, overwrite)
+                replaced = [entry for entry in entries if (entry.puzzle, entry.player) in existing] if overwrite else []
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO wordle_entries ({', '.join(self.COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [self._row(entry) for entry in [entry for entry, _ in items] + replaced],
+                )
+                if changed:
+                    self._write_states({player: states[player] for player in changed})
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return existing
+
+    def get_entry(self, puzzle, player):
+        entries = self._entries("puzzle = ? AND player = ?", (puzzle, player), None)
+        return entries[0] if entries else None
+
+    def entries_for_month(self, month, year, player=None, fields=None):
+        if player is None:
+            return self._entries("year = ? AND month = ?", (year, month), fields)
+        return self._entries("year = ? AND month = ? AND player = ?", (year, month, player), fields)
+
+    def entries_between(self, start_date, end_date, fields=None):
+        return self._entries("date BETWEEN ? AND ?", (start_date, end_date), fields)
+
+    def entries_for_puzzle(self, puzzle, fields=None):
+        return self._entries("puzzle = ?", (puzzle,), fields)
+
+    def entries_since_puzzle(self, first_puzzle, fields=None):
+        return self._entries("puzzle >= ?", (first_puzzle,), fields)
+
+    def all_entries(self, fields=None):
+        return self._entries("1", (), fields)
+
+    def _grouped_totals(self, where, params, group):
+        """{(group column values): {player: totals}} for the rows matching where."""
+        keys = ", ".join(group + ("player",))
+
+        summaries = {}
+        for row in self._query(
+            f"""SELECT {keys},
+                       SUM(max_tries - score + 1) AS points,
+                       COUNT(*) AS games,
+                       SUM(score > max_tries) AS failures,
+                       SUM(CASE WHEN score <= max_tries THEN score ELSE 0 END) AS score_sum
+                FROM wordle_entries WHERE {where} GROUP BY {keys}""",
+            params,
+        ):
+            key = tuple(row.pop(column) for column in group)
+            name = row.pop("player")
+            summaries.setdefault(key, {})[name] = dict(row, scores={})
+
+        for row in self._query(
+            f"""SELECT {keys}, score, COUNT(*) AS n FROM wordle_entries
+                WHERE {where} AND score <= max_tries GROUP BY {keys}, score""",
+            params,
+        ):
+            key = tuple(row[column] for column in group)
+            summaries[key][row["player"]]["scores"][str(row["score"])] = row["n"]
+        return summaries
+
+    def month_summary(self, month, year, player=None):
+        where = "year = ? AND month = ?" + (" AND player = ?" if player is not None else "")
+        params = (year, month) + ((player,) if player is not None else ())
+        return self._grouped_totals(where, params, ()).get((), {})
+
+    def monthly_summaries(self, year=None):
+        if year is None:
+            return self._grouped_totals("1", (), ("month", "year"))
+        return self._grouped_totals("year = ?", (year,), ("month", "year"))
+
+    def month_pairs(self, month, year):
+        # Computed on read by joining the month's entries on the puzzle
+        pairs = {}
+        for row in self._query(
+            """SELECT a.player AS first, b.player AS second,
+                      COUNT(*) AS shared,
+                      SUM(a.score < b.score) AS wins,
+                      SUM(a.score > b.score) AS losses,
+                      SUM(a.score = b.score) AS ties,
+                      SUM(CASE WHEN a.score <= a.max_tries THEN a.score ELSE 0 END) AS score_sum,
+                      SUM(a.score <= a.max_tries) AS solved,
+                      SUM(CASE WHEN b.score <= b.max_tries THEN b.score ELSE 0 END) AS opponent_score_sum,
+                      SUM(b.score <= b.max_tries) AS opponent_solved
+               FROM wordle_entries a
+               JOIN wordle_entries b ON b.puzzle = a.puzzle AND a.player < b.player
+               WHERE a.year = ? AND a.month = ?
+               GROUP BY a.player, b.player""",
+            (year, month),
+        ):
+            first, second = row.pop("first"), row.pop("second")
+            pairs.setdefault(first, {})[second] = row
+        return pairs
+
+    def bulk_insert(self, entries):
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO wordle_entries ({', '.join(self.COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._row(entry) for entry in entries],
+            )
+            return self.conn.total_changes - before
+
+    def rebuild_summaries(self, month, year):
+        # Aggregates are computed on read, so there is nothing to drift
+        return []
+
+    def rebuild_all_summaries(self):
+        return {}
+
+    def get_player_states(self, players):
+        with self._lock:
+            return self._select_states(players)
+
+    def all_player_states(self):
+        return self._query("SELECT * FROM wordle_players")
+
+    def replace_player_states(self, states):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM wordle_players")
+            self._write_states(states)
+
+
+def open_store(spec=None):
+    """Build the backend named by spec (default WORDLE_STORE).
+
+    "memory" is FirestoreStore over the in-memory stand-in, which lives only
+    as long as the process.
+    """
+    spec = spec or STORE_SPEC
+    if spec == "firestore":
+        return FirestoreStore()
+    if spec == "memory":
+        from wordle_firestore_memory import MemoryFirestore
+        return FirestoreStore(db=MemoryFirestore())
+    if spec.startswith("sqlite"):
+        _, _, path = spec.partition(":")
+        return SQLiteStore(path or "wordle.db")
+    raise ValueError(f"Unknown storage backend: {spec}")